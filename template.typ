@@ -2,6 +2,9 @@
 // Mountain QRP Club - Replica fedele del layout originale
 // Versione 2.0 - Migliorata
 
+// cmarker: rendering del Markdown degli articoli (usato da `geko-numero`)
+#import "@preview/cmarker:0.1.10"
+
 // ============================================
 // COLORI ESATTI DALLA RIVISTA
 // ============================================
@@ -347,9 +350,12 @@
 // ============================================
 // SOMMARIO (Pagina 3)
 // Titolo dorato + outline personalizzato
+// `voci`: lista precalcolata ((titolo: ..., pagina: ...), ...) usata dalla
+// build a shard (ogni articolo è un documento separato, quindi l'outline non
+// vede i titoli); con `none` si usa l'outline nativo.
 // ============================================
 
-#let sommario(numero: "66", mese: "Agosto", anno: "2025") = {
+#let sommario(numero: "66", mese: "Agosto", anno: "2025", voci: none) = {
   set page(
     paper: "a4",
     margin: (top: 2cm, bottom: 2cm, left: 2cm, right: 2cm),
@@ -371,11 +377,20 @@
     strong(it)
   }
 
-  outline(
-    title: none,
-    indent: auto,
-    depth: 1,
-  )
+  if voci == none {
+    outline(
+      title: none,
+      indent: auto,
+      depth: 1,
+    )
+  } else {
+    for voce in voci {
+      v(0.3em)
+      strong(block(width: 100%)[
+        #voce.titolo #box(width: 1fr, repeat[.#h(2pt)]) #voce.pagina
+      ])
+    }
+  }
 
   pagebreak()
 }
@@ -783,6 +798,101 @@
   image: (src, alt: none, ..args) => figura(src, didascalia: alt),
 )
 
+// ============================================
+// NUMERO DA DATI (build data-driven)
+// La webapp passa l'intero numero come JSON in sys.inputs ("geko-dati"):
+// il sorgente principale resta costante e nessun testo dell'utente viene
+// interpretato come codice Typst (niente escaping lato Python).
+// ============================================
+
+#let _larghezza(w) = {
+  if w == none { 100% }
+  else if w.ends-with("%") { float(w.slice(0, -1)) * 1% }
+  else { float(w) * 1pt }
+}
+
+#let _immagini(immagini) = {
+  if immagini.len() == 1 {
+    let img = immagini.first()
+    figura(img.percorso, didascalia: img.didascalia, larghezza: _larghezza(img.larghezza))
+  } else {
+    let celle = immagini.map(img => figure(
+      image(img.percorso, width: 100%),
+      caption: img.didascalia,
+    ))
+    if calc.odd(celle.len()) {
+      celle.last() = grid.cell(colspan: 2, celle.last())
+    }
+    grid(columns: (1fr, 1fr), column-gutter: 8pt, row-gutter: 8pt, ..celle)
+  }
+}
+
+#let geko-articolo(articolo) = {
+  heading(level: 1, articolo.titolo)
+  if articolo.sottotitolo != none {
+    sottotitolo-sezione(articolo.sottotitolo)
+  }
+  if articolo.autore != none {
+    autore(articolo.autore, nome: articolo.nome)
+  }
+  for (i, seg) in articolo.segmenti.enumerate() {
+    if seg.tipo == "prosa" {
+      cmarker.render(seg.testo, h1-level: 2, scope: geko-md-scope,
+        label-prefix: "seg" + str(i) + "-")
+    } else if seg.tipo == "box" {
+      box-evidenza(titolo: seg.titolo, tipo: seg.box)[
+        #cmarker.render(seg.testo, h1-level: 2, scope: geko-md-scope,
+          label-prefix: "box" + str(i) + "-")
+      ]
+    } else if seg.tipo == "immagini" {
+      _immagini(seg.immagini)
+    }
+  }
+  separatore()
+}
+
+#let geko-numero(dati) = {
+  let (numero, mese, anno) = (dati.numero, dati.mese, dati.anno)
+
+  if dati.copertina != none {
+    let cop = dati.copertina
+    copertina(
+      numero: numero, mese: mese, anno: anno,
+      immagine-principale: cop.immagine,
+      evidenze: cop.evidenze,
+      // Ogni riga dell'editoriale è un paragrafo (testo letterale)
+      editoriale-testo: cop.editoriale.split("\n").map(riga => [#riga]).join(parbreak()),
+      editoriale-autore: cop.editoriale_autore,
+    )
+  }
+
+  pagina-logo(
+    numero: numero, mese: mese, anno: anno,
+    logo-rivista: "/typst/assets/logo_rivista.jpg",
+  )
+  sommario(numero: numero, mese: mese, anno: anno)
+
+  show: geko-magazine.with(numero: numero, mese: mese, anno: anno)
+
+  for articolo in dati.articoli {
+    geko-articolo(articolo)
+  }
+
+  if dati.team != none {
+    pagebreak()
+    pagina-team(membri: dati.team.membri, link-iscrizione: dati.team.link_iscrizione)
+  }
+
+  pagebreak()
+  let fin = dati.finale
+  pagina-finale(
+    link-lista-distribuzione: fin.link_lista_distribuzione,
+    link-donazione: fin.link_donazione,
+    immagine-frequenze: fin.immagine_frequenze,
+    immagine-donazione: fin.immagine_donazione,
+  )
+}
+
 // ============================================
 // ESPORTAZIONI
 // Tutte le funzioni principali sono disponibili
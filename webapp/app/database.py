@@ -1,9 +1,10 @@
 """Database configuration and session management."""
 
+import asyncio
 from pathlib import Path
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy import text
-from app.models import Base
+from sqlalchemy import DateTime, bindparam, text
+from app.models import Base, utcnow
 
 # Database file path
 DATA_DIR = Path(__file__).parent.parent / "data"
@@ -31,6 +32,104 @@ def run_migrations(conn):
         except Exception as e:
             print(f"Migration warning: {e}")
 
+    # Image metadata columns (size, mime, pixel size, EXIF orientation, hash)
+    for column, ddl in _IMAGE_METADATA_COLUMNS:
+        if column not in existing_columns:
+            try:
+                conn.execute(text(f"ALTER TABLE images ADD COLUMN {column} {ddl}"))
+                print(f"Migration: added {column} column to images")
+            except Exception as e:
+                print(f"Migration warning: {e}")
+    # The values are filled by backfill_image_metadata, in the background
+
+    # Change watermark for images (ETag of responses that embed them)
+    if "updated_at" not in existing_columns:
+        try:
+            conn.execute(text("ALTER TABLE images ADD COLUMN updated_at DATETIME"))
+            conn.execute(text("UPDATE images SET updated_at = uploaded_at"))
+            print("Migration: added updated_at column to images")
+        except Exception as e:
+            print(f"Migration warning: {e}")
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_images_updated_at ON images (updated_at)"
+    ))
+
+    # Index behind the ETag watermark max(articles.updated_at)
+    if conn.execute(text("PRAGMA table_info(articles)")).fetchall():
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_articles_updated_at ON articles (updated_at)"
+        ))
+
+
+_IMAGE_METADATA_COLUMNS = (
+    ("size_bytes", "INTEGER"),
+    ("mime_type", "VARCHAR(100)"),
+    ("width", "INTEGER"),
+    ("height", "INTEGER"),
+    ("orientation", "INTEGER"),
+    ("sha256", "VARCHAR(64)"),
+)
+
+
+BACKFILL_BATCH = 100
+
+
+def _describe_rows(rows) -> list[dict]:
+    """Read metadata for a batch of (id, path) rows; missing files are skipped."""
+    from app.services.media_index import describe
+
+    params = []
+    for image_id, path in rows:
+        file = Path(path or "")
+        if not file.is_absolute():
+            file = DATA_DIR.parent / file
+        try:
+            entry = describe(file)
+        except OSError:
+            continue
+        params.append({"size": entry.byte, "mime": entry.mime, "w": entry.larghezza,
+                       "h": entry.altezza, "o": entry.orientamento, "sha": entry.sha256,
+                       "id": image_id})
+    return params
+
+
+async def backfill_image_metadata(batch_size: int = BACKFILL_BATCH, db_engine=None) -> int:
+    """Fill metadata for images uploaded before the columns existed.
+
+    Started in the background after init_db: rows are processed in batches
+    of `batch_size`, files are read in a thread and each batch is written in
+    its own short transaction, so startup and concurrent writers are not
+    held up. Rows whose file is missing stay NULL and are retried at the
+    next start. Returns the number of rows updated.
+    """
+    db_engine = db_engine or engine
+    last_id, updated = 0, 0
+    while True:
+        async with db_engine.connect() as conn:
+            rows = (await conn.execute(
+                text("SELECT id, path FROM images WHERE size_bytes IS NULL AND id > :last"
+                     " ORDER BY id LIMIT :n"),
+                {"last": last_id, "n": batch_size},
+            )).fetchall()
+        if not rows:
+            break
+        last_id = rows[-1][0]
+        params = await asyncio.to_thread(_describe_rows, rows)
+        if params:
+            async with db_engine.begin() as conn:
+                await conn.execute(
+                    text(
+                        "UPDATE images SET size_bytes = :size, mime_type = :mime, width = :w,"
+                        " height = :h, orientation = :o, sha256 = :sha, updated_at = :now"
+                        " WHERE id = :id"
+                    ).bindparams(bindparam("now", type_=DateTime)),
+                    [{**row, "now": utcnow()} for row in params],
+                )
+            updated += len(params)
+    if updated:
+        print(f"Migration: backfilled metadata for {updated} images")
+    return updated
+
 
 async def init_db():
     """Initialize database tables."""
@@ -33,15 +33,20 @@ Autore: GEKO Magazine Team
 Licenza: MIT
 """
 
+import asyncio
 from contextlib import asynccontextmanager
 from pathlib import Path
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import JSONResponse, Response
 
-from app.database import init_db
+from app.database import backfill_image_metadata, init_db
 from app.routes.api import router as api_router
+from app.services import build_jobs, fonts, media_index, response_cache, spa_index, warmup
+from app.services.compression import CompressionMiddleware, PrecompressedStaticFiles, precompress
+from app.services.file_delivery import SendfileStaticFiles
+from app.services.serialization import FastJSONResponse
 
 # NB: il server MCP NON è più montato qui. Gira come servizio standalone
 # dedicato (app/mcp/standalone.py, container "geko-mcp") per compatibilità
@@ -53,6 +58,11 @@ WEBAPP_DIR = APP_DIR.parent
 STATIC_DIR = WEBAPP_DIR / "static"
 FRONTEND_DIR = WEBAPP_DIR / "frontend" / "build"
 
+# Indici in memoria dei file serviti da serve_spa e favicon (spa_index)
+FAVICON_NAMES = ("favicon.png", "favicon.ico")
+SPA_FILES = spa_index.SpaIndex(FRONTEND_DIR)
+STATIC_FAVICONS = spa_index.SpaIndex(STATIC_DIR, nomi=FAVICON_NAMES)
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -61,10 +71,17 @@ async def lifespan(app: FastAPI):
 
     All'avvio:
         - Inizializza il database (crea tabelle se non esistono)
-        - Crea directory necessarie
+        - Avvia in background il backfill dei metadati delle immagini
+        - Crea directory necessarie (e svuota lo staging delle build interrotte)
+        - Indicizza la media library degli articoli (media_index)
+        - Precomprime (.br/.gz) gli asset della build Svelte non ancora compressi
+        - Indicizza in memoria i file della build Svelte (spa_index)
+        - Verifica i font contro typst/fonts/manifest.json
+        - Avvia in background il warm-up dei compilatori (GEKO_WARMUP)
 
     Alla chiusura:
-        - Cleanup risorse (se necessario)
+        - Interrompe backfill e warm-up ancora in corso
+        - Chiude i worker di compilazione (compile_pool)
     """
     # === STARTUP ===
     print("Inizializzazione GEKO Magazine Web App...")
@@ -72,19 +89,75 @@ async def lifespan(app: FastAPI):
     # Crea database e tabelle
     await init_db()
     print("Database inizializzato")
+    # Metadati delle immagini caricate prima delle colonne: a lotti, in
+    # background (legge e calcola l'hash di ogni file)
+    async def _backfill():
+        try:
+            await backfill_image_metadata()
+        except Exception as e:
+            print(f"Backfill metadati immagini fallito: {e}")
+
+    backfill_task = asyncio.create_task(_backfill())
 
     # Crea directory se non esistono
     (WEBAPP_DIR / "data" / "uploads").mkdir(parents=True, exist_ok=True)
     (WEBAPP_DIR / "data" / "output").mkdir(parents=True, exist_ok=True)
+    build_jobs.clear_staging(WEBAPP_DIR / "data" / "output")
     (WEBAPP_DIR / "typst" / "generated").mkdir(parents=True, exist_ok=True)
     print("Directory create")
 
+    # Indice in memoria della media library degli articoli (media_index)
+    indicizzati = await asyncio.to_thread(media_index.get_index().scan)
+    print(f"Indice media: {indicizzati} file")
+
+    # Varianti .br/.gz della build Svelte (già fatte nel Dockerfile: qui solo
+    # per le build locali, i file aggiornati vengono saltati)
+    compressi = await asyncio.to_thread(precompress, FRONTEND_DIR)
+    if compressi:
+        print(f"Asset precompressi: {compressi} file")
+    print(f"Indice SPA: {await asyncio.to_thread(SPA_FILES.scan)} file")
+
+    # Font: segnala file/famiglie mancanti e caratteri su font di ripiego
+    report = await asyncio.to_thread(fonts.check_fonts)
+    if report["ok"]:
+        print(f"Font verificati ({report['font_dir']})")
+    else:
+        for chiave in ("file_mancanti", "checksum_errati", "famiglie_mancanti"):
+            if report[chiave]:
+                print(f"Font {chiave.replace('_', ' ')}: {', '.join(report[chiave])}")
+        for r in report["ripieghi"]:
+            print(f"Font di ripiego per {r['carattere']!r} ({r['codice']}): {', '.join(r['font'])}")
+        if report.get("errore"):
+            print(f"Verifica font fallita: {report['errore']}")
+
+    # Warm-up in background: l'app accetta richieste subito, /health resta
+    # 503 finché i worker di compilazione non sono caldi.
+    warmup_task = None
+    if warmup.warmup_enabled():
+        from app.services.compile_pool import get_pool
+
+        async def _warm_up():
+            stato = await warmup.warm_up_pool(get_pool())
+            if stato["stato"] == "pronto":
+                print(f"Warm-up compilatori completato in {stato['secondi']:.2f}s "
+                      f"(canarino {stato['canarino']:.2f}s)")
+            else:
+                print(f"Warm-up compilatori fallito: {stato['errore']}")
+
+        warmup.begin()
+        warmup_task = asyncio.create_task(_warm_up())
+
     print("App pronta!")
 
     yield  # L'app è in esecuzione
 
     # === SHUTDOWN ===
     print("Chiusura GEKO Magazine Web App...")
+    for task in (backfill_task, warmup_task):
+        if task is not None and not task.done():
+            task.cancel()
+    from app.services.compile_pool import shutdown_pool
+    shutdown_pool()
 
 
 # Crea istanza FastAPI
@@ -93,28 +166,38 @@ app = FastAPI(
     description="Web app per generare il GEKO Radio Magazine",
     version="2.0.0",
     lifespan=lifespan,
+    default_response_class=FastJSONResponse,
 )
 
 # Monta file statici legacy (CSS, JS)
 STATIC_DIR.mkdir(exist_ok=True)
 app.mount("/static", StaticFiles(directory=str(STATIC_DIR)), name="static")
 
-# Monta directory immagini caricate per accesso diretto
+# Monta directory immagini caricate per accesso diretto (offload/zero-copy:
+# app/services/file_delivery.py)
 UPLOADS_DIR = WEBAPP_DIR / "data" / "uploads"
 UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
+app.mount("/uploads", SendfileStaticFiles(directory=str(UPLOADS_DIR)), name="uploads")
 
 # Monta immagini con path legacy /images
 IMAGES_DIR = WEBAPP_DIR / "data" / "images"
 if IMAGES_DIR.exists():
-    app.mount("/images", StaticFiles(directory=str(IMAGES_DIR)), name="images")
+    app.mount("/images", SendfileStaticFiles(directory=str(IMAGES_DIR)), name="images")
+
+# Compressione brotli/gzip delle risposte testuali (API JSON, index.html...)
+app.add_middleware(CompressionMiddleware)
+
+# Ogni scrittura via API invalida ETag e corpi in cache delle GET (response_cache)
+app.add_middleware(response_cache.InvalidateOnWriteMiddleware)
+
 
 # JSON API routes
 app.include_router(api_router)
 
-# Mount Svelte frontend build assets
+# Mount Svelte frontend build assets: varianti precompresse, immutable per
+# gli asset con hash nel nome (_app/immutable/)
 if FRONTEND_DIR.exists() and (FRONTEND_DIR / "_app").exists():
-    app.mount("/_app", StaticFiles(directory=str(FRONTEND_DIR / "_app")), name="svelte_app")
+    app.mount("/_app", PrecompressedStaticFiles(directory=str(FRONTEND_DIR / "_app")), name="svelte_app")
 
 
 # =============================================================================
@@ -127,15 +210,21 @@ async def health_check():
     Endpoint per health check.
 
     Usato da Docker/orchestratori per verificare che l'app sia attiva.
+    Durante il warm-up dei compilatori risponde 503 (status "warming"),
+    così il traffico arriva solo a istanze già calde.
 
     Returns:
-        JSON con status "ok" e versione
+        JSON con status "ok" (o "warming"), versione e stato del warm-up
     """
-    return {
-        "status": "ok",
+    body = {
+        "status": "ok" if warmup.is_ready() else "warming",
         "version": "2.0.0",
-        "app": "GEKO Magazine"
+        "app": "GEKO Magazine",
+        "warmup": warmup.status(),
     }
+    if not warmup.is_ready():
+        return JSONResponse(body, status_code=503)
+    return body
 
 
 # =============================================================================
@@ -144,41 +233,34 @@ async def health_check():
 
 @app.get("/favicon.png")
 @app.get("/favicon.ico")
-async def favicon():
-    """Serve favicon."""
-    # Try frontend build first
-    for name in ["favicon.png", "favicon.ico"]:
-        favicon_path = FRONTEND_DIR / name
-        if favicon_path.exists():
-            return FileResponse(favicon_path)
-    # Fallback to static dir
-    for name in ["favicon.png", "favicon.ico"]:
-        favicon_path = STATIC_DIR / name
-        if favicon_path.exists():
-            return FileResponse(favicon_path)
+async def favicon(request: Request):
+    """Serve favicon (frontend build first, then the legacy static dir)."""
+    for index in (SPA_FILES, STATIC_FAVICONS):
+        voce = await index.first(FAVICON_NAMES)
+        if voce is not None:
+            return spa_index.risposta(voce, request.headers)
     # No favicon found - return 204 No Content
-    from fastapi.responses import Response
     return Response(status_code=204)
 
 
 @app.get("/{full_path:path}")
-async def serve_spa(full_path: str):
+async def serve_spa(full_path: str, request: Request):
     """
     Serve la Single Page Application Svelte.
 
     Tutte le route vengono gestite dal router Svelte lato client.
     Questo catch-all deve essere l'ultimo route handler.
+    File e index.html vengono dall'indice in memoria (SPA_FILES), con
+    ETag/Last-Modified e 304.
     """
     # Serve static files from frontend build if they exist
-    if full_path:
-        static_file = FRONTEND_DIR / full_path
-        if static_file.exists() and static_file.is_file():
-            return FileResponse(static_file)
+    voce = await SPA_FILES.get(full_path) if full_path else None
 
     # Default: serve index.html for SPA routing
-    index_path = FRONTEND_DIR / "index.html"
-    if index_path.exists():
-        return FileResponse(index_path)
+    if voce is None:
+        voce = await SPA_FILES.get("index.html")
+    if voce is not None:
+        return spa_index.risposta(voce, request.headers)
 
     # Fallback if frontend not built
     return {"error": "Frontend not built. Run 'npm run build' in frontend/"}
@@ -5,6 +5,7 @@ from typing import Optional
 
 from ..services.article_ops import article_image_base
 from ..services.md_render import render_article_body
+from ..services.md_validate import validate_markdown
 
 CONVENZIONI = """\
 # Convenzioni Markdown del GEKO Radio Magazine
@@ -42,7 +43,11 @@ Scrivi gli articoli in Markdown. Il template li converte in Typst così:
   più piccola centrata; due o più immagini su righe consecutive → griglia 2 colonne.
 - URL: usare `[testo](url)` o `<url>` (gli URL nudi non vengono più auto-linkati).
 
-Usa il tool `anteprima_typst` per vedere il Typst generato prima di salvare.
+Usa il tool `anteprima_typst` per vedere il Typst generato prima di salvare:
+in testa riporta, come commenti `// [errore]` / `// [avviso]`, i problemi
+trovati senza compilare (immagini mancanti, attributi sconosciuti, tabelle
+troppo larghe...). Gli stessi problemi tornano in `validazione` quando crei o
+modifichi un articolo; con errori la compilazione del numero viene rifiutata.
 """
 
 _ESEMPIO = pathlib.Path(__file__).resolve().parent.parent / "services" / "esempio_convenzioni.md"
@@ -55,6 +60,17 @@ if _ESEMPIO.exists():
 
 
 def markdown_preview(md: str, articolo_id: Optional[int] = None) -> str:
-    """Renderizza il Markdown GEKO in Typst (via cmarker) e lo restituisce."""
+    """Renderizza il Markdown GEKO in Typst (via cmarker) e lo restituisce.
+
+    I problemi trovati dalla validazione statica (md_validate) precedono il
+    Typst come commenti `// [errore] riga N: ...`: il sorgente resta valido.
+    """
     image_base = article_image_base(articolo_id) if articolo_id is not None else None
-    return render_article_body(md, image_base=image_base)
+    typ = render_article_body(md, image_base=image_base)
+    problemi = validate_markdown(md, image_base)
+    if not problemi:
+        return typ
+    righe = [
+        f"// [{p['livello']}] riga {p['righe'][0]}: {p['messaggio']}" for p in problemi
+    ]
+    return "\n".join(righe) + "\n\n" + typ
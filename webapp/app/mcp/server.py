@@ -38,7 +38,9 @@ async def crea_articolo(
             sottotitolo=sottotitolo, autore=autore, nome_autore=nome_autore,
         )
         if numero_id is not None:
+            validazione = art["validazione"]
             art = await article_ops.assign_article(db, art["id"], [numero_id])
+            art["validazione"] = validazione
         return art
 
 
@@ -97,6 +99,37 @@ async def assegna_a_numero(id: int, numero_ids: list[int]) -> dict:
         return art
 
 
+@mcp.tool
+async def assegna_in_blocco(
+    articoli_ids: list[int],
+    aggiungi_numeri: Optional[list[int]] = None,
+    rimuovi_numeri: Optional[list[int]] = None,
+) -> dict:
+    """Aggiunge più articoli a più numeri e/o li toglie da altri, in una sola
+    transazione (es. spostare articoli da un numero all'altro).
+
+    Gli articoli aggiunti vanno in coda a ogni numero, nell'ordine dato.
+    Le altre assegnazioni degli articoli restano invariate.
+    """
+    async with async_session() as db:
+        return await article_ops.bulk_assign(
+            db, articoli_ids, aggiungi=aggiungi_numeri or [], rimuovi=rimuovi_numeri or [],
+        )
+
+
+@mcp.tool
+async def riordina_articoli(numero_id: int, articoli_ids: list[int]) -> dict:
+    """Imposta l'ordine degli articoli di un numero (id nell'ordine voluto).
+
+    Gli id non assegnati al numero sono ignorati.
+    """
+    async with async_session() as db:
+        aggiornati = await article_ops.reorder_articles(db, numero_id, articoli_ids)
+        if aggiornati is None:
+            raise ValueError(f"Numero {numero_id} non trovato")
+        return {"aggiornati": aggiornati}
+
+
 @mcp.tool
 async def crea_numero(numero: str, mese: str, anno: str, stato: str = "bozza") -> dict:
     """Crea un nuovo numero della rivista.
@@ -152,6 +185,30 @@ async def genera_sommario(id: int) -> dict:
         return art
 
 
+@mcp.tool
+async def report_peso_pdf(numero_id: int, limite: int = 10) -> dict:
+    """Dice perché il PDF di un numero pesa quanto pesa (il numero va compilato prima).
+
+    Per ogni articolo e per le immagini più pesanti (`limite`) riporta il
+    file sorgente, i byte, le dimensioni in pixel e i dpi effettivi nel
+    master di stampa e nei profili compressi (screen, mobile). Le immagini
+    con dpi molto oltre 300 o byte sproporzionati vanno ridotte prima di
+    pubblicare.
+    """
+    async with async_session() as db:
+        try:
+            report = await article_ops.pdf_size_report(db, numero_id)
+        except FileNotFoundError as exc:
+            raise ValueError(str(exc)) from exc
+        if report is None:
+            raise ValueError(f"Numero {numero_id} non trovato")
+        return {
+            **report,
+            "immagini": report["immagini"][:limite],
+            "non_attribuite": report["non_attribuite"][:limite],
+        }
+
+
 @mcp.tool
 async def anteprima_typst(contenuto_md: str, articolo_id: Optional[int] = None) -> str:
     """Converte il Markdown in Typst e lo restituisce, senza salvare nulla.
@@ -1,7 +1,7 @@
 """Database models for GEKO Magazine Web App."""
 
 from datetime import datetime, timezone
-from sqlalchemy import Column, Integer, String, Text, DateTime, ForeignKey, Enum, Table
+from sqlalchemy import Column, Integer, Float, String, Text, DateTime, ForeignKey, Enum, Table
 from sqlalchemy.orm import relationship, declarative_base
 import enum
 
@@ -67,7 +67,9 @@ class Article(Base):
     sommario_llm = Column(Text, default="")  # generato da Claude
     ordine = Column(Integer, default=0)  # posizione di default
     created_at = Column(DateTime, default=utcnow)
-    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow)
+    # Indicizzato: max(updated_at) è la filigrana degli ETag (response_cache)
+    # e l'elenco articoli è ordinato per updated_at.
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow, index=True)
 
     # Relazione many-to-many con numeri GEKO
     magazines = relationship(
@@ -89,9 +91,30 @@ class Image(Base):
     alt_text = Column(String(300), default="")  # testo alternativo/descrizione
     article_id = Column(Integer, ForeignKey("articles.id"), nullable=True)
     uploaded_at = Column(DateTime, default=utcnow)
+    # max(updated_at) è la filigrana degli ETag delle risposte che includono
+    # le immagini (response_cache): cambia anche per modifiche di alt_text o
+    # riassegnazioni fatte da un altro processo (server MCP).
+    updated_at = Column(DateTime, default=utcnow, onupdate=utcnow, index=True)
+    # Metadati estratti una volta all'upload (media_index.describe); NULL
+    # finché la migrazione non li ha ricavati per le immagini già esistenti.
+    size_bytes = Column(Integer, nullable=True)
+    mime_type = Column(String(100), nullable=True)
+    width = Column(Integer, nullable=True)        # px, orientamento EXIF applicato
+    height = Column(Integer, nullable=True)
+    orientation = Column(Integer, nullable=True)  # tag EXIF 1-8
+    sha256 = Column(String(64), nullable=True)
 
     article = relationship("Article", back_populates="images")
 
+    def set_metadata(self, entry) -> None:
+        """Copia i metadati da una `media_index.MediaEntry`."""
+        self.size_bytes = entry.byte
+        self.mime_type = entry.mime
+        self.width = entry.larghezza
+        self.height = entry.altezza
+        self.orientation = entry.orientamento
+        self.sha256 = entry.sha256
+
     @property
     def url(self):
         """URL pubblico dell'immagine, derivato dal path sotto la cartella uploads.
@@ -116,6 +139,33 @@ class Image(Base):
         )
 
 
+class Build(Base):
+    """Una build del PDF di un numero: storico, tempi e artefatti.
+
+    Le colonne JSON (fasi, byte, artefatti) sono testo, come `team_membri`
+    in Config. `artefatti` mappa profilo -> sha256 del file in
+    data/output/artifacts/; None quando la retention li ha eliminati.
+    """
+    __tablename__ = "builds"
+
+    id = Column(Integer, primary_key=True)
+    magazine_id = Column(Integer, ForeignKey("magazines.id"), nullable=True, index=True)
+    numero = Column(String(10), nullable=False)
+    esito = Column(String(20), nullable=False)  # successo, riuso, ripristino, errore, timeout, superata
+    errore = Column(Text, default="")
+    input_hash = Column(String(64), default="", index=True)
+    renderer = Column(String(50), default="")  # versione di typst-py
+    template = Column(String(64), default="")  # sha256 di template.typ
+    fasi = Column(Text, default="{}")  # {fase: secondi}
+    durata_s = Column(Float, default=0.0)
+    pagine = Column(Integer, nullable=True)
+    byte_compilato = Column(Integer, nullable=True)  # master prima della compressione
+    byte = Column(Text, default="{}")  # {profilo: byte} dopo la compressione
+    artefatti = Column(Text, nullable=True)
+    riuso_di = Column(Integer, nullable=True)  # build di cui si sono riusati gli artefatti
+    created_at = Column(DateTime, default=utcnow)
+
+
 class Config(Base):
     """
     Configurazione globale dell'applicazione.
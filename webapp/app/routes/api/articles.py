@@ -1,6 +1,6 @@
 """JSON API for articles."""
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, ConfigDict
@@ -9,7 +9,7 @@ from datetime import datetime
 
 from ...database import get_db
 from ...models import Article
-from ...services import article_ops
+from ...services import article_ops, response_cache
 
 router = APIRouter(prefix="/articles")
 
@@ -80,23 +80,48 @@ class AssignRequest(BaseModel):
     magazine_ids: list[int]
 
 
+class BulkAssignRequest(BaseModel):
+    article_ids: list[int]
+    add_magazine_ids: list[int] = []
+    remove_magazine_ids: list[int] = []
+
+
 @router.get("")
 async def list_articles(
+    request: Request,
     magazine_id: Optional[int] = None,
     search: Optional[str] = None,
     db: AsyncSession = Depends(get_db)
 ):
-    """List all articles with optional filters."""
-    return await article_ops.list_articles(db, magazine_id=magazine_id, search=search)
+    """List all articles with optional filters (ETag / 304, cached body)."""
+    return await response_cache.cached_json(
+        request, db, "articles",
+        lambda: article_ops.list_articles(db, magazine_id=magazine_id, search=search),
+    )
+
+
+@router.post("/bulk-assign")
+async def bulk_assign(data: BulkAssignRequest, db: AsyncSession = Depends(get_db)):
+    """Add many articles to / remove them from many magazines in one transaction."""
+    try:
+        return await article_ops.bulk_assign(
+            db, data.article_ids,
+            aggiungi=data.add_magazine_ids, rimuovi=data.remove_magazine_ids,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
 
 
 @router.get("/{article_id}")
-async def get_article(article_id: int, db: AsyncSession = Depends(get_db)):
-    """Get a single article by ID."""
-    art = await article_ops.get_article(db, article_id)
-    if art is None:
-        raise HTTPException(status_code=404, detail="Article not found")
-    return art
+async def get_article(article_id: int, request: Request, db: AsyncSession = Depends(get_db)):
+    """Get a single article by ID (ETag from the row's updated_at)."""
+    async def build():
+        art = await article_ops.get_article(db, article_id)
+        if art is None:
+            raise HTTPException(status_code=404, detail="Article not found")
+        return art
+
+    return await response_cache.cached_json(request, db, "article", build, article_id=article_id)
 
 
 @router.post("")
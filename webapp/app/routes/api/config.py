@@ -1,11 +1,12 @@
 """JSON API for configuration."""
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, ConfigDict
 
 from ...database import get_db
 from ...models import Config
+from ...services import response_cache
 
 router = APIRouter(prefix="/config")
 
@@ -17,9 +18,9 @@ class ConfigUpdate(BaseModel):
 
 
 @router.get("")
-async def get_all_config(db: AsyncSession = Depends(get_db)):
-    """Get all configuration values."""
-    return await Config.get_all(db)
+async def get_all_config(request: Request, db: AsyncSession = Depends(get_db)):
+    """Get all configuration values (ETag / 304, cached body)."""
+    return await response_cache.cached_json(request, db, "config", lambda: Config.get_all(db))
 
 
 @router.get("/{key}")
@@ -44,7 +45,7 @@ async def get_config(key: str, db: AsyncSession = Depends(get_db)):
         "key": key,
         "value": config_item["value"],
         "description": config_item["description"],
-        "updated_at": config_item["updated_at"].isoformat() if config_item["updated_at"] else None
+        "updated_at": config_item["updated_at"]
     }
 
 
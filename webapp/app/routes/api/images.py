@@ -7,12 +7,16 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import datetime
+import asyncio
 import os
 import uuid
+from pathlib import Path
 import aiofiles
 
 from ...database import get_db
 from ...models import Image, Article, Magazine, MagazineStatus
+from ...services.media_index import describe
+from ...services.serialization import FastJSONResponse
 
 router = APIRouter(prefix="/images")
 
@@ -36,6 +40,11 @@ class ImageResponse(BaseModel):
     uploaded_at: datetime
     url: str
     is_published: bool
+    size_bytes: Optional[int] = None
+    mime_type: Optional[str] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    orientation: Optional[int] = None
 
     model_config = ConfigDict(from_attributes=True)
 
@@ -49,9 +58,14 @@ def image_to_response(image: Image, is_published: bool = False) -> dict:
         "path": image.path,
         "alt_text": image.alt_text or "",
         "article_id": image.article_id,
-        "uploaded_at": image.uploaded_at.isoformat() if image.uploaded_at else None,
+        "uploaded_at": image.uploaded_at,  # serialized natively (serialization.dumps)
         "url": image.url,
         "is_published": is_published,
+        "size_bytes": image.size_bytes,
+        "mime_type": image.mime_type,
+        "width": image.width,
+        "height": image.height,
+        "orientation": image.orientation,
     }
 
 
@@ -95,7 +109,7 @@ async def list_images(
 
         filtered_images.append(image_to_response(img, is_published=is_pub))
 
-    return filtered_images
+    return FastJSONResponse(filtered_images)
 
 
 @router.get("/{image_id}")
@@ -166,13 +180,14 @@ async def upload_image(
         if not art_result.scalar_one_or_none():
             article_id = None
 
-    # Create database record
+    # Create database record (metadata extracted once, off the event loop)
     image = Image(
         filename=filename,
         original_filename=file.filename,
         path=filepath,
         article_id=article_id
     )
+    image.set_metadata(await asyncio.to_thread(describe, Path(filepath), content))
     db.add(image)
     await db.commit()
     await db.refresh(image)
@@ -238,6 +253,7 @@ async def upload_images_batch(
                 path=filepath,
                 article_id=article_id
             )
+            image.set_metadata(await asyncio.to_thread(describe, Path(filepath), content))
             db.add(image)
             await db.commit()
             await db.refresh(image)
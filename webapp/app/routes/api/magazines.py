@@ -1,19 +1,23 @@
 """JSON API for magazines."""
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.responses import FileResponse
 from sqlalchemy import select, delete, func
-from sqlalchemy.orm import selectinload
+from sqlalchemy.orm import joinedload, selectinload
 from sqlalchemy.ext.asyncio import AsyncSession
 from pydantic import BaseModel, ConfigDict
 from typing import Optional
 from datetime import datetime
-import os
 import asyncio
+import json
+import os
+import time
 
 from ...database import get_db
-from ...models import Magazine, MagazineStatus, Article, Image, article_magazines, Config
-import json
+from ...models import Magazine, MagazineStatus, Article, Image, article_magazines
+from ...services import response_cache
+from ...services.file_delivery import SendfileResponse
+from ...services.serialization import FastJSONResponse
 
 router = APIRouter(prefix="/magazines")
 
@@ -87,8 +91,8 @@ class AddArticleRequest(BaseModel):
     ordine: Optional[int] = None
 
 
-def magazine_to_response(magazine: Magazine) -> dict:
-    """Convert Magazine model to response dict."""
+def _magazine_fields(magazine: Magazine) -> dict:
+    """Magazine fields shared by the full response and the listing."""
     return {
         "id": magazine.id,
         "numero": magazine.numero,
@@ -104,8 +108,15 @@ def magazine_to_response(magazine: Magazine) -> dict:
             "url": magazine.copertina.url,
             "alt_text": magazine.copertina.alt_text or ""
         } if magazine.copertina else None,
-        "created_at": magazine.created_at.isoformat() if magazine.created_at else None,
-        "updated_at": magazine.updated_at.isoformat() if magazine.updated_at else None,
+        "created_at": magazine.created_at,  # serialized natively (serialization.dumps)
+        "updated_at": magazine.updated_at,
+    }
+
+
+def magazine_to_response(magazine: Magazine) -> dict:
+    """Convert Magazine model to response dict."""
+    return {
+        **_magazine_fields(magazine),
         "articles": [
             {
                 "id": a.id,
@@ -121,17 +132,33 @@ def magazine_to_response(magazine: Magazine) -> dict:
 
 
 @router.get("")
-async def list_magazines(db: AsyncSession = Depends(get_db)):
-    """List all magazines."""
-    query = select(Magazine).options(
-        selectinload(Magazine.articles),
-        selectinload(Magazine.copertina)
-    ).order_by(Magazine.anno.desc(), Magazine.numero.desc())
-
-    result = await db.execute(query)
-    magazines = result.scalars().unique().all()
+async def list_magazines(request: Request, db: AsyncSession = Depends(get_db)):
+    """List all magazines with their article count.
+
+    A single query: the count is a GROUP BY over article_magazines and the
+    cover is joined, so the cost does not grow with the number of articles.
+    The articles of an issue are served by `GET /{id}/articles`. Served with
+    an ETag: an unchanged list is a 304 without running the query.
+    """
+    async def build():
+        counts = (
+            select(article_magazines.c.magazine_id, func.count().label("article_count"))
+            .group_by(article_magazines.c.magazine_id)
+            .subquery()
+        )
+        query = (
+            select(Magazine, func.coalesce(counts.c.article_count, 0))
+            .outerjoin(counts, counts.c.magazine_id == Magazine.id)
+            .options(joinedload(Magazine.copertina))
+            .order_by(Magazine.anno.desc(), Magazine.numero.desc())
+        )
+        result = await db.execute(query)
+        return [
+            {**_magazine_fields(magazine), "article_count": count}
+            for magazine, count in result.all()
+        ]
 
-    return [magazine_to_response(m) for m in magazines]
+    return await response_cache.cached_json(request, db, "magazines", build)
 
 
 @router.get("/{magazine_id}")
@@ -148,7 +175,39 @@ async def get_magazine(magazine_id: int, db: AsyncSession = Depends(get_db)):
     if not magazine:
         raise HTTPException(status_code=404, detail="Magazine not found")
 
-    return magazine_to_response(magazine)
+    return FastJSONResponse(magazine_to_response(magazine))
+
+
+@router.get("/{magazine_id}/articles")
+async def list_magazine_articles(magazine_id: int, db: AsyncSession = Depends(get_db)):
+    """Table of contents of an issue: article headers in issue order.
+
+    Only the header columns are read (no markdown bodies, images or other
+    issues of each article).
+    """
+    query = (
+        select(
+            Article.id, Article.titolo, Article.sottotitolo, Article.autore,
+            Article.nome_autore, article_magazines.c.ordine,
+        )
+        .join(article_magazines, article_magazines.c.article_id == Article.id)
+        .where(article_magazines.c.magazine_id == magazine_id)
+        .order_by(article_magazines.c.ordine, Article.id)
+    )
+    rows = (await db.execute(query)).all()
+    if not rows and await db.get(Magazine, magazine_id) is None:
+        raise HTTPException(status_code=404, detail="Magazine not found")
+    return FastJSONResponse([
+        {
+            "id": row.id,
+            "titolo": row.titolo,
+            "sottotitolo": row.sottotitolo or "",
+            "autore": row.autore or "",
+            "nome_autore": row.nome_autore or "",
+            "ordine": row.ordine or 0,
+        }
+        for row in rows
+    ])
 
 
 @router.post("")
@@ -232,11 +291,22 @@ async def delete_magazine(magazine_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.post("/{magazine_id}/build")
-async def build_pdf(magazine_id: int, db: AsyncSession = Depends(get_db)):
-    """Build PDF for a magazine."""
-    from ...services import article_ops
-    from ...services.builder import MagazineBuilder, build_magazine_pdf
-    from ...services.md_render import generate_article_typst, render_segments
+async def build_pdf(magazine_id: int, forza: bool = False, db: AsyncSession = Depends(get_db)):
+    """Build PDF for a magazine.
+
+    Prima di compilare il markdown degli articoli passa la validazione
+    statica (md_validate): con errori la build è rifiutata subito, senza
+    compilare. `forza` salta questo controllo.
+    """
+    from ...services import article_ops, build_history, build_jobs
+    from ...services.builder import (
+        OUTPUT_DIR, MagazineBuilder, build_magazine_pdf, data_mode_enabled,
+    )
+    from ...services.compile_pool import (
+        CompileCancelled, CompileTimeout, CompileWorkerCrash, get_pool,
+    )
+    from ...services.md_render import article_data, generate_article_typst, render_segments
+    from ...services.md_validate import validate_markdown
 
     query = select(Magazine).options(
         selectinload(Magazine.articles).selectinload(Article.images),
@@ -252,116 +322,208 @@ async def build_pdf(magazine_id: int, db: AsyncSession = Depends(get_db)):
     if not magazine.articles:
         raise HTTPException(status_code=400, detail="Magazine has no articles")
 
+    if not forza:
+        errori = [
+            {
+                "articolo_id": article.id,
+                "titolo": article.titolo,
+                "segmento": "validazione",
+                "righe": p["righe"],
+                "codice": p["codice"],
+                "errore": p["messaggio"],
+            }
+            for article in magazine.articles
+            for p in validate_markdown(
+                article.contenuto_md or "", article_ops.article_image_base(article.id))
+            if p["livello"] == "errore"
+        ]
+        if errori:
+            return {
+                "status": "error",
+                "error": f"Contenuto non compilabile: {len(errori)} errori negli articoli",
+                "errori": errori,
+            }
+
+    start = time.perf_counter()
     try:
         # Prepara il Typst di ogni articolo SEMPRE dal markdown (niente
         # contenuto_typ): titolo, sottotitolo, autore e nome_autore vengono
         # inseriti da generate_article_typst; image_base risolve i riferimenti
         # a immagini con nome nudo (![](x.png)) nella media library dell'articolo.
+        # In modalità data-driven (GEKO_BUILD_DATA) gli articoli viaggiano come
+        # dati JSON verso il template, senza generare sorgente Typst.
+        data_mode = data_mode_enabled()
         articles_typst = []
+        articles_data = []
         for article in magazine.articles:
-            image_base = article_ops.article_image_base(article.id)
-            art_typ = generate_article_typst(
+            fields = dict(
                 titolo=article.titolo,
                 sottotitolo=article.sottotitolo,
                 autore=article.autore,
                 nome=article.nome_autore,
                 contenuto_md=article.contenuto_md or "",
-                image_base=image_base,
+                image_base=article_ops.article_image_base(article.id),
             )
-            articles_typst.append(art_typ)
-
-        # Build evidenze (highlights) from article summaries
-        evidenze = [
-            {
-                "titolo": article.titolo,
-                "descrizione": article.sommario_llm or ""
-            }
-            for article in magazine.articles
-            if article.sommario_llm  # Only include articles with AI summaries
-        ]
-
-        # Get cover image path if exists
-        copertina_path = None
-        if magazine.copertina:
-            copertina_path = magazine.copertina.path
+            if data_mode:
+                articles_data.append(article_data(**fields))
+            else:
+                articles_typst.append(generate_article_typst(**fields))
+
+        options = await article_ops.issue_options(db, magazine)
+
+        # Storico (build_history): hash degli input (contenuti, immagini,
+        # font) per riconoscere una build identica a una già riuscita.
+        payload = dict(
+            numero=magazine.numero, mese=magazine.mese, anno=magazine.anno,
+            articles=articles_data if data_mode else articles_typst,
+            data_mode=data_mode, **options,
+        )
+        files = build_history.issue_files(
+            [
+                {"id": a.id, "titolo": a.titolo, "contenuto_md": a.contenuto_md or "",
+                 "image_base": article_ops.article_image_base(a.id)}
+                for a in magazine.articles
+            ],
+            options,
+        )
+        input_hash = await asyncio.to_thread(build_history.input_hash, payload, files)
+        fasi = {"preparazione": time.perf_counter() - start}
 
-        # Load team and final page config
-        team_json = await Config.get(db, "team_membri", "[]")
-        team_membri = json.loads(team_json) if team_json else []
-        link_iscrizione = await Config.get(db, "link_iscrizione", "")
-        link_lista_distribuzione = await Config.get(db, "link_lista_distribuzione", "")
-        link_donazione = await Config.get(db, "link_donazione", "")
-        immagine_frequenze = await Config.get(db, "immagine_frequenze", "")
-        immagine_donazione = await Config.get(db, "immagine_donazione", "")
+        async def record(esito: str, **fields):
+            return await build_history.record_build(
+                db, magazine_id=magazine.id, numero=magazine.numero, esito=esito,
+                input_hash=input_hash, fasi=fasi, **fields,
+            )
 
         # Build PDF (not async)
+        pool = get_pool()
+        # Build dello stesso numero coalescenti (build_jobs): una richiesta più
+        # recente annulla questa; si compila in uno staging e si pubblica con
+        # rename atomici solo se nel frattempo non è arrivata una build nuova.
+        ticket = build_jobs.begin(magazine.numero, OUTPUT_DIR)
+        superseded = {
+            "status": "superseded",
+            "error": "Build superata da una richiesta più recente dello stesso numero",
+        }
         try:
-            # In un thread: typst.compile + compressione gs sono sincroni e
-            # pesanti; senza to_thread bloccherebbero l'event loop (healthcheck
-            # fallisce -> container unhealthy -> Traefik 404 sulle altre richieste).
-            pdf_path = await asyncio.to_thread(
-                build_magazine_pdf,
-                numero=magazine.numero,
-                mese=magazine.mese,
-                anno=magazine.anno,
-                articles_typst=articles_typst,
-                editoriale=magazine.editoriale,
-                editoriale_autore=magazine.editoriale_autore,
-                copertina_path=copertina_path,
-                evidenze=evidenze,
-                team_membri=team_membri if team_membri else None,
-                link_iscrizione=link_iscrizione or None,
-                link_lista_distribuzione=link_lista_distribuzione or None,
-                link_donazione=link_donazione or None,
-                immagine_frequenze=immagine_frequenze or None,
-                immagine_donazione=immagine_donazione or None,
-            )
-        except Exception:
-            # Diagnostica: isola articolo + segmento che non compila,
-            # provando ogni segmento markdown come frammento standalone.
-            builder = MagazineBuilder()
-            errori = []
-            for article in magazine.articles:
-                image_base = article_ops.article_image_base(article.id)
-                art_typ = generate_article_typst(
-                    titolo=article.titolo,
-                    sottotitolo=article.sottotitolo,
-                    autore=article.autore,
-                    nome=article.nome_autore,
-                    contenuto_md=article.contenuto_md or "",
-                    image_base=image_base,
+            # Stessi input, template e renderer di una build riuscita: si
+            # ripubblicano i suoi artefatti invece di ricompilare.
+            previous = await build_history.find_reusable(
+                db, magazine.id, input_hash, OUTPUT_DIR)
+            if previous is not None and build_history.stage_artifacts(
+                json.loads(previous.artefatti), magazine.numero, ticket.staging_dir, OUTPUT_DIR,
+            ):
+                build_history.stage_reuse_info(previous, magazine.numero, ticket.staging_dir)
+                start = time.perf_counter()
+                if not build_jobs.publish(ticket, OUTPUT_DIR):
+                    await record("superata")
+                    return superseded
+                fasi["pubblicazione"] = time.perf_counter() - start
+                build = await record(
+                    "riuso", riuso_di=previous.id, artefatti=json.loads(previous.artefatti),
+                    info={"pagine": previous.pagine, "byte_compilato": previous.byte_compilato,
+                          "byte": json.loads(previous.byte or "{}")},
+                )
+            else:
+                build = None
+
+            if build is None:
+                try:
+                    # In un processo worker isolato (compile_pool): typst.compile +
+                    # compressione gs sono sincroni e pesanti; nel processo web
+                    # bloccherebbero l'event loop (healthcheck fallisce -> container
+                    # unhealthy -> Traefik 404) e un documento patologico ne
+                    # gonfierebbe la memoria. Il worker ha timeout e tetto di memoria.
+                    await pool.run(
+                        build_magazine_pdf,
+                        numero=magazine.numero,
+                        mese=magazine.mese,
+                        anno=magazine.anno,
+                        articles_typst=articles_typst,
+                        **options,
+                        articles_data=articles_data if data_mode else None,
+                        output_dir=ticket.staging_dir,
+                        cancel=ticket.cancel,
+                    )
+                except CompileCancelled:
+                    await record("superata")
+                    return superseded
+                except CompileTimeout as e:
+                    await record("timeout", errore=str(e))
+                    return {"status": "error", "error": str(e)}
+                except CompileWorkerCrash as e:
+                    # Timeout o worker ucciso: la diagnostica per segmento
+                    # ricompilerebbe lo stesso documento patologico, si riporta e basta.
+                    await record("errore", errore=str(e))
+                    return {"status": "error", "error": str(e)}
+                except Exception as e:
+                    await record("errore", errore=str(e))
+                    # Diagnostica: isola articolo + segmento che non compila,
+                    # provando ogni segmento markdown come frammento standalone.
+                    builder = MagazineBuilder()
+                    errori = []
+                    for article in magazine.articles:
+                        image_base = article_ops.article_image_base(article.id)
+                        art_typ = generate_article_typst(
+                            titolo=article.titolo,
+                            sottotitolo=article.sottotitolo,
+                            autore=article.autore,
+                            nome=article.nome_autore,
+                            contenuto_md=article.contenuto_md or "",
+                            image_base=image_base,
+                        )
+                        if await pool.run(builder.try_compile_snippet, art_typ) is None:
+                            continue  # questo articolo compila: non è il colpevole
+                        found = False
+                        for seg, typ in render_segments(article.contenuto_md or "", image_base):
+                            msg = await pool.run(builder.try_compile_snippet, typ)
+                            if msg:
+                                errori.append({
+                                    "articolo_id": article.id,
+                                    "titolo": article.titolo,
+                                    "segmento": seg.kind,
+                                    "righe": [seg.start_line + 1, seg.end_line + 1],
+                                    "errore": msg,
+                                })
+                                found = True
+                        if not found:
+                            errori.append({
+                                "articolo_id": article.id,
+                                "titolo": article.titolo,
+                                "segmento": "metadati",
+                                "righe": [1, 1],
+                                "errore": await pool.run(builder.try_compile_snippet, art_typ),
+                            })
+                    return {"status": "error", "errori": errori}
+
+                info = build_history.read_build_info(ticket.staging_dir, magazine.numero)
+                fasi.update(info.get("fasi", {}))
+                start = time.perf_counter()
+                artefatti = await asyncio.to_thread(
+                    build_history.store_artifacts, ticket.staging_dir, magazine.numero, OUTPUT_DIR,
                 )
-                if await asyncio.to_thread(builder.try_compile_snippet, art_typ) is None:
-                    continue  # questo articolo compila: non è il colpevole
-                found = False
-                for seg, typ in render_segments(article.contenuto_md or "", image_base):
-                    msg = await asyncio.to_thread(builder.try_compile_snippet, typ)
-                    if msg:
-                        errori.append({
-                            "articolo_id": article.id,
-                            "titolo": article.titolo,
-                            "segmento": seg.kind,
-                            "righe": [seg.start_line + 1, seg.end_line + 1],
-                            "errore": msg,
-                        })
-                        found = True
-                if not found:
-                    errori.append({
-                        "articolo_id": article.id,
-                        "titolo": article.titolo,
-                        "segmento": "metadati",
-                        "righe": [1, 1],
-                        "errore": await asyncio.to_thread(builder.try_compile_snippet, art_typ),
-                    })
-            return {"status": "error", "errori": errori}
+                if not build_jobs.publish(ticket, OUTPUT_DIR):
+                    await record("superata")
+                    return superseded
+                fasi["pubblicazione"] = time.perf_counter() - start
+                build = await record("successo", info=info, artefatti=artefatti)
+        finally:
+            build_jobs.finish(ticket)
+        await build_history.apply_retention(db, magazine.id, OUTPUT_DIR)
 
         # Update magazine status
         magazine.stato = MagazineStatus.PUBBLICATO
         await db.commit()
 
+        from ...services.pdf_compress import PROFILES
         return {
             "status": "success",
-            "pdf_url": f"/api/magazines/{magazine_id}/pdf"
+            "build_id": build.id,
+            "riuso_di": build.riuso_di,
+            "pdf_url": f"/api/magazines/{magazine_id}/pdf",
+            "pdf_urls": {
+                p: f"/api/magazines/{magazine_id}/pdf?profile={p}" for p in PROFILES
+            },
         }
     except Exception as e:
         return {
@@ -371,8 +533,28 @@ async def build_pdf(magazine_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.get("/{magazine_id}/pdf")
-async def download_pdf(magazine_id: int, db: AsyncSession = Depends(get_db)):
-    """Download PDF for a magazine."""
+async def download_pdf(
+    magazine_id: int,
+    profile: str = "screen",
+    inline: bool = False,
+    db: AsyncSession = Depends(get_db),
+):
+    """Download PDF for a magazine.
+
+    `profile`: "screen" (default, 150 dpi), "print" (master non ricompresso)
+    o "mobile" (72 dpi). Con `inline` il browser apre il PDF nel suo viewer
+    invece di scaricarlo. Le richieste `Range` (e `If-Range` con l'ETag)
+    sono servite con 206: sui PDF linearizzati il viewer mostra la prima
+    pagina e scarica le altre su richiesta.
+    """
+    from ...services.pdf_compress import PROFILES, profile_path
+
+    if profile not in PROFILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown profile '{profile}'. Valid: {', '.join(PROFILES)}",
+        )
+
     query = select(Magazine).where(Magazine.id == magazine_id)
     result = await db.execute(query)
     magazine = result.scalar_one_or_none()
@@ -381,18 +563,20 @@ async def download_pdf(magazine_id: int, db: AsyncSession = Depends(get_db)):
         raise HTTPException(status_code=404, detail="Magazine not found")
 
     # Check if PDF exists
-    pdf_filename = f"geko{magazine.numero}.pdf"
-    pdf_path = os.path.join("data", "output", pdf_filename)
+    pdf_path = str(profile_path(os.path.join("data", "output"), magazine.numero, profile))
+    pdf_filename = os.path.basename(pdf_path)
 
     if not os.path.exists(pdf_path):
         raise HTTPException(status_code=404, detail="PDF not found. Build the magazine first.")
 
-    return FileResponse(
+    # SendfileResponse: offload/zero-copy dove possibile, 304 su If-None-Match.
+    return SendfileResponse(
         pdf_path,
         media_type="application/pdf",
         filename=pdf_filename,
+        content_disposition_type="inline" if inline else "attachment",
         # Il PDF viene rigenerato in-place a ogni build (stesso URL/nome file).
-        # Senza Cache-Control, FileResponse manda solo Last-Modified/ETag e il
+        # Senza Cache-Control, la risposta ha solo Last-Modified/ETag e il
         # browser applica il caching euristico (RFC 9111 §4.2.2), servendo la
         # copia vecchia dopo un rebuild. no-cache forza la rivalidazione: con
         # l'ETag che cambia a ogni build si riceve sempre il PDF aggiornato.
@@ -400,32 +584,185 @@ async def download_pdf(magazine_id: int, db: AsyncSession = Depends(get_db)):
     )
 
 
-@router.post("/{magazine_id}/articles/reorder")
-async def reorder_articles(
-    magazine_id: int,
-    data: ReorderRequest,
-    db: AsyncSession = Depends(get_db)
+@router.get("/{magazine_id}/builds")
+async def list_builds(magazine_id: int, limit: int = 50, db: AsyncSession = Depends(get_db)):
+    """Storico delle build del numero (dalla più recente): esito, tempi per
+    fase, pagine, byte per profilo, versioni di template e renderer."""
+    from ...services import build_history
+
+    magazine = await db.get(Magazine, magazine_id)
+    if not magazine:
+        raise HTTPException(status_code=404, detail="Magazine not found")
+    return await build_history.list_builds(db, magazine_id, limit=limit)
+
+
+async def _build_with_artifacts(db: AsyncSession, magazine_id: int, build_id: int):
+    from ...services import build_history
+    from ...services.builder import OUTPUT_DIR
+
+    build = await build_history.get_build(db, magazine_id, build_id)
+    if not build:
+        raise HTTPException(status_code=404, detail="Build not found")
+    artefatti = json.loads(build.artefatti) if build.artefatti else {}
+    if not artefatti or not all(
+        build_history.artifact_path(OUTPUT_DIR, sha).exists() for sha in artefatti.values()
+    ):
+        raise HTTPException(status_code=410, detail="Build artifacts no longer retained")
+    return build, artefatti
+
+
+@router.get("/{magazine_id}/builds/{build_id}/pdf")
+async def download_build_pdf(
+    magazine_id: int, build_id: int, profile: str = "screen",
+    db: AsyncSession = Depends(get_db),
 ):
-    """Reorder articles in a magazine."""
+    """Scarica il PDF di una build precedente (dagli artefatti conservati)."""
+    from ...services import build_history
+    from ...services.builder import OUTPUT_DIR
+
+    build, artefatti = await _build_with_artifacts(db, magazine_id, build_id)
+    if profile not in artefatti:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unknown profile '{profile}'. Valid: {', '.join(artefatti)}",
+        )
+    return SendfileResponse(
+        build_history.artifact_path(OUTPUT_DIR, artefatti[profile]),
+        media_type="application/pdf",
+        filename=f"geko{build.numero}-build{build.id}-{profile}.pdf",
+        # Content-addressed: il contenuto di questo URL non cambia più.
+        headers={"Cache-Control": "public, max-age=31536000, immutable"},
+    )
+
+
+@router.post("/{magazine_id}/builds/{build_id}/restore")
+async def restore_build(magazine_id: int, build_id: int, db: AsyncSession = Depends(get_db)):
+    """Ripubblica i PDF di una build precedente senza ricompilare."""
+    from ...services import build_history, build_jobs
+    from ...services.builder import OUTPUT_DIR
+
+    build, artefatti = await _build_with_artifacts(db, magazine_id, build_id)
+    start = time.perf_counter()
+    ticket = build_jobs.begin(build.numero, OUTPUT_DIR)
+    try:
+        if not build_history.stage_artifacts(artefatti, build.numero, ticket.staging_dir, OUTPUT_DIR):
+            raise HTTPException(status_code=410, detail="Build artifacts no longer retained")
+        build_history.stage_reuse_info(build, build.numero, ticket.staging_dir)
+        published = build_jobs.publish(ticket, OUTPUT_DIR)
+    finally:
+        build_jobs.finish(ticket)
+    if not published:
+        return {"status": "superseded",
+                "error": "Ripristino superato da una build più recente dello stesso numero"}
+    restored = await build_history.record_build(
+        db, magazine_id=magazine_id, numero=build.numero, esito="ripristino",
+        input_hash=build.input_hash, fasi={"pubblicazione": time.perf_counter() - start},
+        info={"pagine": build.pagine, "byte_compilato": build.byte_compilato,
+              "byte": json.loads(build.byte or "{}")},
+        artefatti=artefatti, riuso_di=build.id,
+    )
+    return {"status": "restored", "build": build_history.build_to_response(restored)}
+
+
+@router.post("/{magazine_id}/profile")
+async def profile_build(magazine_id: int, db: AsyncSession = Depends(get_db)):
+    """Profila la build: tempo per funzione del template e per articolo.
+
+    Il report JSON è anche salvato accanto al PDF; il flame graph (formato
+    folded, per flamegraph.pl/speedscope) si scarica da `profile.folded`.
+    """
+    from ...services import article_ops
+    from ...services.builder import profile_magazine
+    from ...services.compile_pool import CompileError, get_pool
+
+    query = select(Magazine).options(
+        selectinload(Magazine.articles),
+        selectinload(Magazine.copertina)
+    ).where(Magazine.id == magazine_id)
+    magazine = (await db.execute(query)).scalar_one_or_none()
+    if not magazine:
+        raise HTTPException(status_code=404, detail="Magazine not found")
+    if not magazine.articles:
+        raise HTTPException(status_code=400, detail="Magazine has no articles")
+
+    articles = [
+        dict(
+            titolo=article.titolo,
+            sottotitolo=article.sottotitolo,
+            autore=article.autore,
+            nome=article.nome_autore,
+            contenuto_md=article.contenuto_md or "",
+            image_base=article_ops.article_image_base(article.id),
+        )
+        for article in magazine.articles
+    ]
+    options = await article_ops.issue_options(db, magazine)
+    try:
+        report = await get_pool().run(
+            profile_magazine,
+            numero=magazine.numero,
+            mese=magazine.mese,
+            anno=magazine.anno,
+            articles=articles,
+            **options,
+        )
+    except CompileError as e:
+        return {"status": "error", "error": str(e)}
+    return {
+        "status": "success",
+        "flamegraph_url": f"/api/magazines/{magazine_id}/profile.folded",
+        **report,
+    }
+
+
+@router.get("/{magazine_id}/profile.folded")
+async def download_profile_folded(magazine_id: int, db: AsyncSession = Depends(get_db)):
+    """Scarica l'ultimo profilo della build in formato folded stacks."""
     query = select(Magazine).where(Magazine.id == magazine_id)
     result = await db.execute(query)
     magazine = result.scalar_one_or_none()
-
     if not magazine:
         raise HTTPException(status_code=404, detail="Magazine not found")
+    path = os.path.join("data", "output", f"geko{magazine.numero}.folded")
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Profile not found. Profile the build first.")
+    return FileResponse(
+        path, media_type="text/plain; charset=utf-8", filename=f"geko{magazine.numero}.folded",
+        headers={"Cache-Control": "no-cache"},
+    )
 
-    # Update order for each article
-    for idx, article_id in enumerate(data.article_ids):
-        await db.execute(
-            article_magazines.update()
-            .where(article_magazines.c.article_id == article_id)
-            .where(article_magazines.c.magazine_id == magazine_id)
-            .values(ordine=idx)
-        )
 
-    await db.commit()
+@router.get("/{magazine_id}/size-report")
+async def size_report(magazine_id: int, db: AsyncSession = Depends(get_db)):
+    """Peso del PDF per immagine e per articolo, prima e dopo la compressione.
+
+    Ogni immagine del PDF compilato è ricondotta al file sorgente e
+    all'articolo che la usa, con byte, pixel e dpi effettivi per profilo.
+    """
+    from ...services import article_ops
 
-    return {"status": "reordered"}
+    try:
+        report = await article_ops.pdf_size_report(db, magazine_id)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="PDF not found. Build the magazine first.")
+    if report is None:
+        raise HTTPException(status_code=404, detail="Magazine not found")
+    return report
+
+
+@router.post("/{magazine_id}/articles/reorder")
+async def reorder_articles(
+    magazine_id: int,
+    data: ReorderRequest,
+    db: AsyncSession = Depends(get_db)
+):
+    """Reorder articles in a magazine (a single UPDATE ... CASE)."""
+    from ...services import article_ops
+
+    updated = await article_ops.reorder_articles(db, magazine_id, data.article_ids)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="Magazine not found")
+    return {"status": "reordered", "updated": updated}
 
 
 @router.post("/{magazine_id}/articles/{article_id}")
@@ -436,6 +773,8 @@ async def add_article(
     db: AsyncSession = Depends(get_db)
 ):
     """Add an article to a magazine."""
+    from ...services import article_ops
+
     # Get magazine
     mag_query = select(Magazine).options(selectinload(Magazine.articles)).where(Magazine.id == magazine_id)
     mag_result = await db.execute(mag_query)
@@ -474,6 +813,8 @@ async def add_article(
         .where(article_magazines.c.magazine_id == magazine_id)
         .values(ordine=ordine)
     )
+    # Filigrana degli ETag nel DB: vale anche per gli altri processi.
+    await article_ops._touch_magazines(db, [magazine_id])
 
     await db.commit()
 
@@ -487,6 +828,8 @@ async def remove_article(
     db: AsyncSession = Depends(get_db)
 ):
     """Remove an article from a magazine."""
+    from ...services import article_ops
+
     # Delete from junction table
     result = await db.execute(
         delete(article_magazines)
@@ -496,6 +839,7 @@ async def remove_article(
 
     if result.rowcount == 0:
         raise HTTPException(status_code=404, detail="Article not in magazine")
+    await article_ops._touch_magazines(db, [magazine_id])
 
     await db.commit()
 
@@ -4,15 +4,19 @@ Unica fonte di verità usata sia dai router JSON (/api) sia dai tool MCP,
 per evitare derive tra i due percorsi.
 """
 
+import asyncio
+import json
 import os
 import re
 from pathlib import Path
 from typing import Optional
 
-from sqlalchemy import select
+from sqlalchemy import case, delete, func, insert, select, update
 from sqlalchemy.orm import selectinload
 
-from ..models import Article, Config, Image, Magazine, MagazineStatus
+from ..models import Article, Config, Image, Magazine, MagazineStatus, article_magazines, utcnow
+from .media_index import get_index, guess_mime
+from .md_validate import validate_markdown
 
 # ── Media library per-articolo ─────────────────────────────────────────
 # Le immagini caricate via MCP/API sono salvate col loro nome esatto sotto
@@ -21,7 +25,6 @@ from ..models import Article, Config, Image, Magazine, MagazineStatus
 UPLOADS_DIR = Path("data/uploads")
 ALLOWED_IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".gif", ".webp", ".svg"}
 MAX_IMAGE_BYTES = 10 * 1024 * 1024  # 10 MB
-_EXTRA_MIME = {".svg": "image/svg+xml", ".webp": "image/webp"}
 
 
 def article_to_response(article: Article) -> dict:
@@ -36,8 +39,8 @@ def article_to_response(article: Article) -> dict:
         "contenuto_typ": article.contenuto_typ or "",
         "sommario_llm": article.sommario_llm or "",
         "ordine": article.ordine or 0,
-        "created_at": article.created_at.isoformat() if article.created_at else None,
-        "updated_at": article.updated_at.isoformat() if article.updated_at else None,
+        "created_at": article.created_at,  # datetime: serializzati da orjson
+        "updated_at": article.updated_at,
         "magazines": [
             {
                 "id": m.id,
@@ -142,6 +145,13 @@ async def _reload(db, article_id: int) -> Optional[dict]:
     return article_to_response(article) if article else None
 
 
+def _with_validation(art: dict) -> dict:
+    """Aggiunge all'articolo appena salvato i problemi del suo markdown
+    (md_validate): l'editor li mostra subito, la build li rifiuterebbe."""
+    art["validazione"] = validate_markdown(art["contenuto_md"], article_image_base(art["id"]))
+    return art
+
+
 async def list_magazines(db) -> list[dict]:
     result = await db.execute(
         select(Magazine).order_by(Magazine.anno.desc(), Magazine.numero.desc())
@@ -219,7 +229,7 @@ async def create_article(
     db.add(article)
     await db.commit()
     await db.refresh(article)
-    return await _reload(db, article.id)
+    return _with_validation(await _reload(db, article.id))
 
 
 async def list_articles(
@@ -261,24 +271,80 @@ async def update_article(db, article_id: int, **fields) -> Optional[dict]:
         if key in allowed:
             setattr(article, key, value)
     await db.commit()
-    return await _reload(db, article_id)
+    return _with_validation(await _reload(db, article_id))
+
+
+async def _touch_magazines(db, magazine_ids) -> None:
+    """Aggiorna `updated_at` dei numeri la cui composizione è cambiata: la
+    tabella ponte non ha timestamp e gli ETag (response_cache) leggono quelli
+    dei numeri."""
+    if magazine_ids:
+        await db.execute(
+            update(Magazine).where(Magazine.id.in_(set(magazine_ids))).values(updated_at=utcnow())
+        )
+
+
+async def _append_links(db, pairs: list[tuple[int, int]]) -> int:
+    """Inserisce le coppie (articolo, numero) mancanti in coda ai numeri.
+
+    Statement costanti qualunque sia il numero di coppie: coppie esistenti,
+    ordine massimo per numero (GROUP BY), un INSERT executemany e
+    l'aggiornamento dei numeri toccati. Non fa commit: sta nella
+    transazione del chiamante.
+    """
+    if not pairs:
+        return 0
+    article_ids = {a for a, _ in pairs}
+    magazine_ids = {m for _, m in pairs}
+    esistenti = set((await db.execute(
+        select(article_magazines.c.article_id, article_magazines.c.magazine_id).where(
+            article_magazines.c.article_id.in_(article_ids),
+            article_magazines.c.magazine_id.in_(magazine_ids),
+        )
+    )).all())
+    ultimo = dict((await db.execute(
+        select(article_magazines.c.magazine_id, func.max(article_magazines.c.ordine))
+        .where(article_magazines.c.magazine_id.in_(magazine_ids))
+        .group_by(article_magazines.c.magazine_id)
+    )).all())
+    righe = []
+    for article_id, magazine_id in dict.fromkeys(pairs):
+        if (article_id, magazine_id) in esistenti:
+            continue
+        ultimo[magazine_id] = (ultimo.get(magazine_id) or 0) + 1
+        righe.append({"article_id": article_id, "magazine_id": magazine_id,
+                      "ordine": ultimo[magazine_id]})
+    if righe:
+        await db.execute(insert(article_magazines), righe)
+        await _touch_magazines(db, {r["magazine_id"] for r in righe})
+    return len(righe)
 
 
 async def assign_article(db, article_id: int, magazine_ids: list[int]) -> Optional[dict]:
-    query = select(Article).options(*_ARTICLE_LOADED).where(Article.id == article_id)
-    result = await db.execute(query)
-    article = result.scalar_one_or_none()
+    """Imposta i numeri di un articolo (sostituisce le assegnazioni).
+
+    I numeri già assegnati mantengono la posizione dell'articolo, quelli
+    nuovi lo mettono in coda; gli id di numeri inesistenti sono ignorati.
+    """
+    article = await db.get(Article, article_id)
     if not article:
         return None
-    article.magazines.clear()
     unique_ids = list(dict.fromkeys(magazine_ids))
     if unique_ids:
-        mags = (await db.execute(select(Magazine).where(Magazine.id.in_(unique_ids)))).scalars().all()
-        by_id = {m.id: m for m in mags}
-        for mid in unique_ids:
-            if mid in by_id:
-                article.magazines.append(by_id[mid])
+        esistenti = set((await db.execute(
+            select(Magazine.id).where(Magazine.id.in_(unique_ids))
+        )).scalars())
+        unique_ids = [mid for mid in unique_ids if mid in esistenti]
+    tolti = (await db.execute(
+        delete(article_magazines).where(
+            article_magazines.c.article_id == article_id,
+            article_magazines.c.magazine_id.not_in(unique_ids),
+        ).returning(article_magazines.c.magazine_id)
+    )).scalars().all()
+    await _touch_magazines(db, tolti)
+    await _append_links(db, [(article_id, mid) for mid in unique_ids])
     await db.commit()
+    db.expire(article)
     return await _reload(db, article_id)
 
 
@@ -287,14 +353,140 @@ def article_image_base(article_id: int) -> str:
     return f"/data/uploads/articoli/{article_id}"
 
 
-def _guess_mime(nome_file: str) -> str:
-    """Deduce il MIME dall'estensione (fallback su mimetypes)."""
-    import mimetypes
+async def _check_ids(db, model, ids: set, nome: str) -> None:
+    trovati = set((await db.execute(select(model.id).where(model.id.in_(ids)))).scalars())
+    mancanti = sorted(ids - trovati)
+    if mancanti:
+        raise ValueError(f"{nome} non trovati: {', '.join(map(str, mancanti))}")
 
-    ext = os.path.splitext(nome_file)[1].lower()
-    if ext in _EXTRA_MIME:
-        return _EXTRA_MIME[ext]
-    return mimetypes.guess_type(nome_file)[0] or "application/octet-stream"
+
+async def bulk_assign(
+    db,
+    article_ids: list[int],
+    *,
+    aggiungi: list[int] = (),
+    rimuovi: list[int] = (),
+) -> dict:
+    """Aggiunge gli articoli ai numeri `aggiungi` e li toglie dai numeri
+    `rimuovi`, in un'unica transazione (es. spostare articoli tra numeri).
+
+    I nuovi articoli vanno in coda a ciascun numero, nell'ordine di
+    `article_ids`. Solleva ValueError (senza modificare nulla) se un id non
+    esiste. Ritorna {"aggiunti": n, "rimossi": n}.
+    """
+    article_ids = list(dict.fromkeys(article_ids))
+    aggiungi, rimuovi = list(dict.fromkeys(aggiungi)), list(dict.fromkeys(rimuovi))
+    if set(aggiungi) & set(rimuovi):
+        raise ValueError("Un numero non può essere sia in aggiungi sia in rimuovi")
+    if not article_ids or not (aggiungi or rimuovi):
+        return {"aggiunti": 0, "rimossi": 0}
+    await _check_ids(db, Article, set(article_ids), "Articoli")
+    await _check_ids(db, Magazine, set(aggiungi) | set(rimuovi), "Numeri")
+
+    rimossi = 0
+    if rimuovi:
+        tolti = (await db.execute(
+            delete(article_magazines).where(
+                article_magazines.c.article_id.in_(article_ids),
+                article_magazines.c.magazine_id.in_(rimuovi),
+            ).returning(article_magazines.c.magazine_id)
+        )).scalars().all()
+        rimossi = len(tolti)
+        await _touch_magazines(db, tolti)
+    aggiunti = await _append_links(db, [(a, m) for m in aggiungi for a in article_ids])
+    await db.commit()
+    return {"aggiunti": aggiunti, "rimossi": rimossi}
+
+
+async def reorder_articles(db, magazine_id: int, article_ids: list[int]) -> Optional[int]:
+    """Riordina gli articoli di un numero con un solo UPDATE (CASE).
+
+    `article_ids` nell'ordine voluto; gli id non assegnati al numero sono
+    ignorati. Ritorna le righe aggiornate, None se il numero non esiste.
+    """
+    if await db.get(Magazine, magazine_id) is None:
+        return None
+    posizioni = {article_id: idx for idx, article_id in enumerate(dict.fromkeys(article_ids))}
+    if not posizioni:
+        return 0
+    result = await db.execute(
+        update(article_magazines)
+        .where(
+            article_magazines.c.magazine_id == magazine_id,
+            article_magazines.c.article_id.in_(posizioni),
+        )
+        .values(ordine=case(posizioni, value=article_magazines.c.article_id))
+    )
+    if result.rowcount:
+        await _touch_magazines(db, [magazine_id])
+    await db.commit()
+    return result.rowcount
+
+
+async def issue_options(db, magazine: Magazine) -> dict:
+    """Opzioni di build del numero oltre agli articoli: copertina, evidenze,
+    editoriale, team e pagina finale (da Config).
+
+    `magazine` deve avere `articles` e `copertina` già caricati.
+    """
+    # Evidenze dai sommari AI degli articoli
+    evidenze = [
+        {"titolo": article.titolo, "descrizione": article.sommario_llm or ""}
+        for article in magazine.articles
+        if article.sommario_llm
+    ]
+    copertina_path = magazine.copertina.path if magazine.copertina else None
+
+    team_json = await Config.get(db, "team_membri", "[]")
+    team_membri = json.loads(team_json) if team_json else []
+    link_iscrizione = await Config.get(db, "link_iscrizione", "")
+    link_lista_distribuzione = await Config.get(db, "link_lista_distribuzione", "")
+    link_donazione = await Config.get(db, "link_donazione", "")
+    immagine_frequenze = await Config.get(db, "immagine_frequenze", "")
+    immagine_donazione = await Config.get(db, "immagine_donazione", "")
+
+    return dict(
+        editoriale=magazine.editoriale,
+        editoriale_autore=magazine.editoriale_autore,
+        copertina_path=copertina_path,
+        evidenze=evidenze,
+        team_membri=team_membri if team_membri else None,
+        link_iscrizione=link_iscrizione or None,
+        link_lista_distribuzione=link_lista_distribuzione or None,
+        link_donazione=link_donazione or None,
+        immagine_frequenze=immagine_frequenze or None,
+        immagine_donazione=immagine_donazione or None,
+    )
+
+
+async def pdf_size_report(db, magazine_id: int) -> Optional[dict]:
+    """Report di attribuzione del peso del PDF compilato (vedi size_report).
+
+    None se il numero non esiste; FileNotFoundError se non è stato compilato.
+    """
+    from .builder import OUTPUT_DIR, WEBAPP_DIR
+    from .size_report import size_report
+
+    query = select(Magazine).options(
+        selectinload(Magazine.articles), selectinload(Magazine.copertina)
+    ).where(Magazine.id == magazine_id)
+    magazine = (await db.execute(query)).scalar_one_or_none()
+    if not magazine:
+        return None
+    articles = [
+        {
+            "id": article.id,
+            "titolo": article.titolo,
+            "contenuto_md": article.contenuto_md or "",
+            "image_base": article_image_base(article.id),
+        }
+        for article in magazine.articles
+    ]
+    options = await issue_options(db, magazine)
+    # Parsing dei PDF (anche decine di MB): fuori dall'event loop.
+    return await asyncio.to_thread(
+        size_report, magazine.numero, articles, options, OUTPUT_DIR, WEBAPP_DIR,
+    )
 
 
 def _sanitize_nome_file(nome_file: str) -> str:
@@ -359,6 +551,9 @@ async def save_article_image(
     dest_dir.mkdir(parents=True, exist_ok=True)
     dest_path = dest_dir / nome_file
     dest_path.write_bytes(content)
+    # Metadati (byte, mime, dimensioni, orientamento EXIF, hash) estratti una
+    # volta sola, fuori dall'event loop: indice in memoria e colonne di images.
+    entry = await asyncio.to_thread(get_index(UPLOADS_DIR).put, article_id, nome_file, content)
 
     if existing:
         existing.path = str(dest_path)
@@ -371,6 +566,7 @@ async def save_article_image(
             article_id=article_id,
         )
         db.add(image)
+    image.set_metadata(entry)
     await db.commit()
     await db.refresh(image)
 
@@ -378,33 +574,33 @@ async def save_article_image(
         "nome_file": image.filename,
         "url": image.url,
         "bytes": len(content),
-        "mime": mime or _guess_mime(nome_file),
+        "mime": mime or guess_mime(nome_file),
     }
 
 
 async def list_article_images(db, article_id: int) -> list[dict]:
-    """Elenca le immagini caricate per un articolo."""
+    """Elenca le immagini caricate per un articolo.
+
+    Risponde dai metadati salvati all'upload (colonne di images), senza
+    toccare il disco.
+    """
     result = await db.execute(
         select(Image)
         .where(Image.article_id == article_id)
         .order_by(Image.filename)
     )
     images = result.scalars().all()
-    out = []
-    for img in images:
-        try:
-            size = os.path.getsize(img.path)
-        except OSError:
-            size = 0
-        out.append(
-            {
-                "nome_file": img.filename,
-                "url": img.url,
-                "bytes": size,
-                "mime": _guess_mime(img.filename),
-            }
-        )
-    return out
+    return [
+        {
+            "nome_file": img.filename,
+            "url": img.url,
+            "bytes": img.size_bytes or 0,
+            "mime": img.mime_type or guess_mime(img.filename),
+            "larghezza": img.width,
+            "altezza": img.height,
+        }
+        for img in images
+    ]
 
 
 async def delete_article_image(db, article_id: int, nome_file: str) -> bool:
@@ -417,6 +613,7 @@ async def delete_article_image(db, article_id: int, nome_file: str) -> bool:
         )
     if image.path and os.path.exists(image.path):
         os.remove(image.path)
+    get_index(UPLOADS_DIR).remove(article_id, nome_file)
     await db.delete(image)
     await db.commit()
     return True
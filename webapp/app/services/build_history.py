@@ -0,0 +1,318 @@
+"""Storico delle build e artefatti content-addressed.
+
+Ogni build di un numero lascia una riga in `builds` (models.Build): hash
+degli input, versioni di renderer e template, tempi per fase, pagine, byte
+prima e dopo la compressione ed esito. I PDF prodotti sono conservati in
+`data/output/artifacts/<sha256>.pdf`:
+
+  - una build con gli stessi input, lo stesso template e lo stesso renderer
+    di una build riuscita non ricompila: ne ripubblica gli artefatti
+    (`find_reusable`);
+  - una build precedente si può scaricare o ripristinare come pubblicata
+    senza ricompilare;
+  - la retention (GEKO_BUILD_RETENTION, default 5 per numero) elimina gli
+    artefatti delle build più vecchie; le righe restano, per seguire nel
+    tempo i tempi di build e le regressioni dovute al template.
+
+Gli artefatti sono hard link dei file pubblicati (copie se il filesystem non
+li supporta): i PDF in data/output si riscrivono sempre con file temporaneo
++ rename, mai in place, quindi un artefatto non cambia dopo la build.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+from importlib import metadata
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import select
+
+from ..models import Build
+from .pdf_compress import PROFILES, profile_path
+
+logger = logging.getLogger(__name__)
+
+ARTIFACTS = "artifacts"
+_DEFAULT_RETENTION = 5
+# Variabili d'ambiente che cambiano i byte prodotti: fanno parte degli input.
+_OUTPUT_ENV = ("GEKO_PDF_RECOMPRESS", "GEKO_PDF_LINEARIZE", "SOURCE_DATE_EPOCH")
+
+
+def retention() -> int:
+    """Build per numero di cui si conservano gli artefatti (GEKO_BUILD_RETENTION)."""
+    try:
+        return max(1, int(os.environ.get("GEKO_BUILD_RETENTION", _DEFAULT_RETENTION)))
+    except ValueError:
+        return _DEFAULT_RETENTION
+
+
+def renderer_version() -> str:
+    try:
+        return f"typst-py {metadata.version('typst')}"
+    except metadata.PackageNotFoundError:
+        return "typst-py ?"
+
+
+def template_version() -> str:
+    """sha256 di template.typ: cambia a ogni modifica del template."""
+    from .builder import TEMPLATE_DIR
+
+    try:
+        return hashlib.sha256((TEMPLATE_DIR / "template.typ").read_bytes()).hexdigest()
+    except OSError:
+        return ""
+
+
+def _sha256_file(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def input_hash(payload: dict, files: list[Path]) -> str:
+    """Hash degli input della build: contenuti (JSON canonico), i byte dei
+    file usati (immagini, font) e le variabili d'ambiente che cambiano
+    l'output. I file mancanti contano come assenti.
+
+    Per i file della media library lo sha256 viene dall'indice (media_index):
+    si rilegge solo ciò che è cambiato dall'ultima indicizzazione.
+    """
+    from .media_index import get_index
+
+    index = get_index()
+    h = hashlib.sha256()
+    h.update(json.dumps(payload, sort_keys=True, ensure_ascii=False, default=str).encode())
+    h.update(json.dumps({k: os.environ.get(k) for k in _OUTPUT_ENV}, sort_keys=True).encode())
+    for path in sorted({Path(p) for p in files}):
+        h.update(str(path).encode())
+        if path.is_file():
+            h.update((index.digest(path) or _sha256_file(path)).encode())
+        else:
+            h.update(b"-")
+    return h.hexdigest()
+
+
+def issue_files(articles: list[dict], options: dict) -> list[Path]:
+    """File letti dalla build del numero: immagini (vedi
+    size_report.collect_sources) e font di progetto."""
+    from .builder import WEBAPP_DIR
+    from .fonts import font_dir
+    from .size_report import collect_sources
+
+    files = [WEBAPP_DIR / s["file"] for s in collect_sources(articles, options, WEBAPP_DIR)]
+    fonts = font_dir()
+    if fonts.is_dir():
+        files += [f for f in fonts.iterdir() if f.suffix.lower() in (".ttf", ".otf", ".ttc")]
+    return files
+
+
+def artifact_path(output_dir: Path, sha: str) -> Path:
+    return Path(output_dir) / ARTIFACTS / f"{sha}.pdf"
+
+
+def _link(src: Path, dst: Path) -> None:
+    """Hard link di src in dst (copia se il link non è possibile)."""
+    try:
+        os.link(src, dst)
+    except OSError:
+        shutil.copyfile(src, dst)
+
+
+def read_build_info(build_dir: Path, numero: str) -> dict:
+    """Il geko{numero}.build.json scritto da MagazineBuilder ({} se manca)."""
+    try:
+        return json.loads((Path(build_dir) / f"geko{numero}.build.json").read_text("utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def store_artifacts(build_dir: Path, numero: str, output_dir: Path) -> dict[str, str]:
+    """Conserva i profili prodotti in build_dir tra gli artefatti.
+
+    Ritorna {profilo: sha256}. Un artefatto già presente (stesso contenuto)
+    non viene riscritto.
+    """
+    store = Path(output_dir) / ARTIFACTS
+    store.mkdir(parents=True, exist_ok=True)
+    artefatti = {}
+    for profile in PROFILES:
+        src = profile_path(build_dir, numero, profile)
+        if not src.exists():
+            continue
+        sha = _sha256_file(src)
+        dst = artifact_path(output_dir, sha)
+        if not dst.exists():
+            tmp = dst.with_name(f".{dst.name}.tmp")
+            _link(src, tmp)
+            tmp.replace(dst)
+        artefatti[profile] = sha
+    return artefatti
+
+
+def stage_artifacts(artefatti: dict[str, str], numero: str, staging_dir: Path,
+                    output_dir: Path) -> bool:
+    """Prepara in staging_dir i profili di una build precedente, pronti per
+    `build_jobs.publish`. False se qualche artefatto non c'è più."""
+    if not artefatti or any(not artifact_path(output_dir, s).exists() for s in artefatti.values()):
+        return False
+    for profile, sha in artefatti.items():
+        _link(artifact_path(output_dir, sha), profile_path(staging_dir, numero, profile))
+    return True
+
+
+def stage_reuse_info(build: Build, numero: str, staging_dir: Path) -> Path:
+    """Scrive in staging_dir il geko{numero}.build.json di una build che
+    ripubblica gli artefatti di `build` (riuso o ripristino): pagine e byte
+    di quella build, `riuso_di` e nessuna fase di compilazione, così il file
+    pubblicato descrive questa richiesta e non la build originale."""
+    info = {
+        "riuso_di": build.id,
+        "fasi": {},
+        "pagine": build.pagine,
+        "byte_compilato": build.byte_compilato,
+        "byte": json.loads(build.byte or "{}"),
+    }
+    path = Path(staging_dir) / f"geko{numero}.build.json"
+    path.write_text(json.dumps(info, ensure_ascii=False, indent=2), encoding="utf-8")
+    return path
+
+
+def build_to_response(build: Build) -> dict:
+    """Serializza una Build in dict JSON-friendly."""
+    return {
+        "id": build.id,
+        "magazine_id": build.magazine_id,
+        "numero": build.numero,
+        "esito": build.esito,
+        "errore": build.errore or "",
+        "input_hash": build.input_hash,
+        "renderer": build.renderer,
+        "template": build.template,
+        "fasi": json.loads(build.fasi or "{}"),
+        "durata_s": build.durata_s,
+        "pagine": build.pagine,
+        "byte_compilato": build.byte_compilato,
+        "byte": json.loads(build.byte or "{}"),
+        "artefatti": json.loads(build.artefatti) if build.artefatti else None,
+        "riuso_di": build.riuso_di,
+        "created_at": build.created_at,  # datetime: serializzato da orjson
+    }
+
+
+async def record_build(
+    db,
+    *,
+    magazine_id: int,
+    numero: str,
+    esito: str,
+    input_hash: str = "",
+    fasi: Optional[dict] = None,
+    info: Optional[dict] = None,
+    artefatti: Optional[dict] = None,
+    errore: str = "",
+    riuso_di: Optional[int] = None,
+) -> Build:
+    """Registra una build. `info` è il build.json del builder (pagine, byte)."""
+    info = info or {}
+    fasi = {k: round(v, 3) for k, v in (fasi or {}).items()}
+    build = Build(
+        magazine_id=magazine_id,
+        numero=numero,
+        esito=esito,
+        errore=errore,
+        input_hash=input_hash,
+        renderer=renderer_version(),
+        template=template_version(),
+        fasi=json.dumps(fasi),
+        durata_s=round(sum(fasi.values()), 3),
+        pagine=info.get("pagine"),
+        byte_compilato=info.get("byte_compilato"),
+        byte=json.dumps(info.get("byte", {})),
+        artefatti=json.dumps(artefatti) if artefatti else None,
+        riuso_di=riuso_di,
+    )
+    db.add(build)
+    await db.commit()
+    await db.refresh(build)
+    return build
+
+
+async def get_build(db, magazine_id: int, build_id: int) -> Optional[Build]:
+    return (await db.execute(
+        select(Build).where(Build.id == build_id, Build.magazine_id == magazine_id)
+    )).scalar_one_or_none()
+
+
+async def list_builds(db, magazine_id: int, limit: int = 50) -> list[dict]:
+    """Build del numero, dalla più recente."""
+    query = (
+        select(Build).where(Build.magazine_id == magazine_id)
+        .order_by(Build.id.desc()).limit(limit)
+    )
+    return [build_to_response(b) for b in (await db.execute(query)).scalars()]
+
+
+async def find_reusable(db, magazine_id: int, hash_: str, output_dir: Path) -> Optional[Build]:
+    """L'ultima build riuscita con gli stessi input, template e renderer i
+    cui artefatti sono ancora disponibili."""
+    query = (
+        select(Build)
+        .where(
+            Build.magazine_id == magazine_id,
+            Build.input_hash == hash_,
+            Build.renderer == renderer_version(),
+            Build.template == template_version(),
+            Build.esito.in_(("successo", "riuso", "ripristino")),
+            Build.artefatti.is_not(None),
+        )
+        .order_by(Build.id.desc())
+    )
+    for build in (await db.execute(query)).scalars():
+        artefatti = json.loads(build.artefatti)
+        if all(artifact_path(output_dir, s).exists() for s in artefatti.values()):
+            return build
+    return None
+
+
+async def apply_retention(db, magazine_id: int, output_dir: Path,
+                          keep: Optional[int] = None) -> int:
+    """Tiene gli artefatti delle ultime `keep` build del numero ed elimina
+    quelli delle build più vecchie non più referenziati da nessuna build.
+
+    Si considerano solo i file delle build appena scartate di questo
+    numero: gli artefatti appena scritti da una build di un altro numero
+    (tra `store_artifacts` e `record_build`) non sono ancora referenziati,
+    ma non vanno toccati. Ritorna i file eliminati.
+    """
+    keep = keep or retention()
+    query = (
+        select(Build)
+        .where(Build.magazine_id == magazine_id, Build.artefatti.is_not(None))
+        .order_by(Build.id.desc())
+    )
+    builds = list((await db.execute(query)).scalars())
+    candidates = set()
+    for build in builds[keep:]:
+        candidates.update(json.loads(build.artefatti).values())
+        build.artefatti = None
+    await db.commit()
+    if not candidates:
+        return 0
+
+    referenced = set()
+    for (artefatti,) in await db.execute(select(Build.artefatti).where(Build.artefatti.is_not(None))):
+        referenced.update(json.loads(artefatti).values())
+    removed = 0
+    for sha in candidates - referenced:
+        path = artifact_path(output_dir, sha)
+        if path.exists():
+            path.unlink(missing_ok=True)
+            removed += 1
+    if removed:
+        logger.info("Retention build: eliminati %d artefatti", removed)
+    return removed
@@ -0,0 +1,94 @@
+"""Coordinamento delle build dello stesso numero: vince la più recente.
+
+Se un redattore lancia la build, corregge un refuso e la rilancia, le due
+build correvano fino in fondo e si contendevano `data/output/geko{N}.pdf`.
+Qui ogni richiesta di build di un numero ottiene un `BuildTicket`:
+
+  - `begin` annulla il ticket precedente dello stesso numero (il suo
+    `cancel` viene impostato: il compile_pool uccide il worker che lo sta
+    compilando) e registra il nuovo;
+  - la build scrive in una directory di staging propria
+    (`data/output/.staging/`), mai nei file pubblicati;
+  - `publish` sposta i file nella directory di output con rename atomici,
+    solo se il ticket è ancora il più recente: una build superata che arriva
+    in fondo viene scartata, e chi scarica vede sempre un PDF intero.
+"""
+
+import itertools
+import logging
+import os
+import shutil
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+_STAGING = ".staging"
+
+_seq = itertools.count(1)
+_lock = threading.Lock()
+_latest: dict[str, "BuildTicket"] = {}
+
+
+@dataclass
+class BuildTicket:
+    """Una richiesta di build di un numero."""
+
+    numero: str
+    seq: int
+    staging_dir: Path
+    cancel: threading.Event = field(default_factory=threading.Event)
+
+    @property
+    def superseded(self) -> bool:
+        return self.cancel.is_set()
+
+
+def begin(numero: str, output_dir: Path) -> BuildTicket:
+    """Registra una nuova build del numero e annulla quella in corso."""
+    seq = next(_seq)
+    ticket = BuildTicket(
+        numero=numero,
+        seq=seq,
+        staging_dir=Path(output_dir) / _STAGING / f"geko{numero}-{seq}",
+    )
+    ticket.staging_dir.mkdir(parents=True, exist_ok=True)
+    with _lock:
+        previous = _latest.get(numero)
+        _latest[numero] = ticket
+    if previous is not None:
+        logger.info("Build %d del numero %s superata dalla %d: annullata",
+                    previous.seq, numero, seq)
+        previous.cancel.set()
+    return ticket
+
+
+def publish(ticket: BuildTicket, output_dir: Path) -> bool:
+    """Pubblica i file della build con rename atomici.
+
+    False (e niente di pubblicato) se nel frattempo è arrivata una build più
+    recente dello stesso numero.
+    """
+    with _lock:
+        if ticket.superseded or _latest.get(ticket.numero) is not ticket:
+            return False
+        # Dentro il lock: una build più recente non può annullare questa a
+        # metà pubblicazione, né pubblicare in contemporanea.
+        for path in sorted(ticket.staging_dir.iterdir()):
+            if path.is_file() and not path.name.startswith("."):
+                os.replace(path, Path(output_dir) / path.name)
+    return True
+
+
+def finish(ticket: BuildTicket) -> None:
+    """Chiude la build: elimina lo staging e, se era l'ultima, la deregistra."""
+    with _lock:
+        if _latest.get(ticket.numero) is ticket:
+            del _latest[ticket.numero]
+    shutil.rmtree(ticket.staging_dir, ignore_errors=True)
+
+
+def clear_staging(output_dir: Path) -> None:
+    """Elimina gli staging rimasti da build interrotte (avvio dell'app)."""
+    shutil.rmtree(Path(output_dir) / _STAGING, ignore_errors=True)
@@ -1,9 +1,16 @@
 """Build PDF from Typst files using the GEKO template."""
 
+import json
+import os
+import threading
+import time
 from pathlib import Path
 from typing import Optional
 import typst
 
+from .fonts import compiler_options
+from .md_render import _typ_str
+
 # Paths
 WEBAPP_DIR = Path(__file__).parent.parent.parent
 TYPST_DIR = WEBAPP_DIR / "typst"
@@ -12,17 +19,113 @@ PKG_PATH = WEBAPP_DIR / "typst" / "packages"
 
 # template.typ è servito sotto typst/src/ (in Docker: mount di DIRECTORY della
 # repo root su /app/typst/src, così un `git pull` aggiorna il file senza problemi
-# di inode; nei test: symlink creato dalla fixture conftest). I doc generati sotto
-# typst/generated/ lo importano come "../src/template.typ".
+# di inode; nei test: symlink creato dalla fixture conftest).
 TEMPLATE_DIR = TYPST_DIR / "src"
 
+# I documenti si compilano IN MEMORIA: il sorgente principale è passato a
+# typst come bytes, mentre template, package e asset si risolvono sul disco
+# tramite root (WEBAPP_DIR) e package_path. Per questo gli import sono
+# assoluti dalla root ("/typst/src/template.typ") e non relativi a un file.
+# Un overlay virtuale anche per template/package/asset non è possibile:
+# typst-py accetta in memoria solo il file principale (nessuna API per file
+# aggiuntivi), e il disco resta l'unica sorgente degli import.
+# typst/generated/ si usa solo se si chiede di persistere il .typ per debug.
+GENERATED_DIR = TYPST_DIR / "generated"
+
+# Sorgente principale della build data-driven: costante tra le build, il
+# numero arriva come JSON in sys.inputs (vedi geko-numero in template.typ).
+_DATA_MAIN = '#import "/typst/src/template.typ": *\n#geko-numero(json(bytes(sys.inputs.at("geko-dati"))))\n'
+
+# Import cmarker (rendering markdown) + template
+_PREAMBLE = '#import "@preview/cmarker:0.1.10"\n#import "/typst/src/template.typ": *\n'
+
+
+# Documento canarino del warm-up: tocca template, show rule, font e plugin
+# WASM di cmarker, cioè tutto quello che la prima build pagherebbe a freddo.
+_CANARY = (
+    _PREAMBLE
+    + '#show: geko-magazine.with(numero: "0", mese: "Warm-up", anno: "2026")\n'
+    + '= Warm-up\n\n#cmarker.render("Canarino *GEKO*.")\n'
+)
+
+# Compilatore persistente per thread: font scoperti una volta sola e cache
+# (memoizzazione comemo) condivisa tra le compilazioni dello stesso thread.
+# I file su disco vengono comunque riletti a ogni compilazione.
+# Typst.Compiler non è thread-safe, ma un'istanza per thread evita un lock di
+# processo: build parallele e compilazioni brevi (snippet, anteprime MCP)
+# non si mettono in coda dietro una build intera. Nei worker di compile_pool
+# (un thread ciascuno) è di fatto il compilatore del processo, scaldato da
+# warm_up. Font: directory di progetto ed eventuale esclusione dei font di
+# sistema, vedi fonts.py.
+_local = threading.local()
+
+
+def _env_flag(name: str) -> bool:
+    return os.environ.get(name, "").strip().lower() in {"1", "true", "yes", "on"}
+
+
+def _timestamp() -> Optional[int]:
+    """SOURCE_DATE_EPOCH, se impostato: data fissa nei metadati del PDF, così
+    la stessa build produce gli stessi byte (build riproducibili)."""
+    try:
+        return int(os.environ["SOURCE_DATE_EPOCH"])
+    except (KeyError, ValueError):
+        return None
+
+
+def compile_source(source: str, sys_inputs: Optional[dict] = None) -> bytes:
+    """Compila in PDF un sorgente Typst in memoria (nessun file scritto)."""
+    compiler = getattr(_local, "compiler", None)
+    if compiler is None:
+        compiler = _local.compiler = typst.Compiler(
+            root=str(WEBAPP_DIR), package_path=str(PKG_PATH), **compiler_options()
+        )
+    return compiler.compile(
+        source.encode("utf-8"), sys_inputs=sys_inputs or {}, timestamp=_timestamp()
+    )
+
+
+def warm_up() -> float:
+    """Scalda il compilatore persistente del thread col documento canarino.
+
+    Ritorna la durata in secondi della compilazione a freddo; le chiamate
+    successive nello stesso thread ritornano la stessa durata senza
+    ricompilare.
+    """
+    durata = getattr(_local, "warmup_seconds", None)
+    if durata is None:
+        start = time.perf_counter()
+        compile_source(_CANARY)
+        durata = _local.warmup_seconds = time.perf_counter() - start
+    return durata
+
+
+def persist_source(name: str, text: str) -> Path:
+    """Salva un sorgente generato in typst/generated/ (solo per debug)."""
+    GENERATED_DIR.mkdir(parents=True, exist_ok=True)
+    path = GENERATED_DIR / name
+    path.write_text(text, encoding="utf-8")
+    return path
+
+
+def data_mode_enabled() -> bool:
+    """True se la build deve usare la modalità data-driven (GEKO_BUILD_DATA)."""
+    return _env_flag("GEKO_BUILD_DATA")
+
+
+def _root_path(path: Optional[str]) -> Optional[str]:
+    """Path assoluto dalla root Typst ("data/x.png" -> "/data/x.png")."""
+    if not path:
+        return None
+    return path if path.startswith("/") else f"/{path}"
+
 
 class MagazineBuilder:
     """Builds GEKO Magazine PDF from articles."""
 
-    def __init__(self):
+    def __init__(self, output_dir: Optional[Path] = None):
         self.template_path = TEMPLATE_DIR / "template.typ"
-        self.output_dir = OUTPUT_DIR
+        self.output_dir = Path(output_dir) if output_dir is not None else OUTPUT_DIR
         self.output_dir.mkdir(parents=True, exist_ok=True)
 
     def build_magazine(
@@ -41,6 +144,9 @@ class MagazineBuilder:
         link_donazione: Optional[str] = None,
         immagine_frequenze: Optional[str] = None,
         immagine_donazione: Optional[str] = None,
+        sharded: Optional[bool] = None,
+        articles_data: Optional[list[dict]] = None,
+        persist_typ: Optional[bool] = None,
     ) -> Path:
         """
         Build complete magazine PDF.
@@ -60,12 +166,25 @@ class MagazineBuilder:
             link_donazione: Link to donation page
             immagine_frequenze: Path to frequencies image
             immagine_donazione: Path to donation QR image
+            sharded: Compile front matter, each article and final pages as
+                separate documents on a process pool (see sharded_build).
+                None = read GEKO_BUILD_SHARDED from the environment.
+            articles_data: Articles as data (md_render.article_data). When
+                given, the issue is compiled in data-driven mode: a constant
+                main source plus the issue JSON in sys.inputs, and
+                articles_typst is ignored.
+            persist_typ: Also write the generated source (or issue JSON) to
+                typst/generated/ for debugging; compilation never reads it.
+                None = read GEKO_PERSIST_TYP from the environment.
+
+        The compiled PDF is kept as the print master (geko{numero}-print.pdf)
+        and recompressed in parallel into the screen (geko{numero}.pdf, 150
+        dpi) and mobile (geko{numero}-mobile.pdf, 72 dpi) profiles.
 
         Returns:
-            Path to generated PDF
+            Path to the generated PDF (screen profile)
         """
-        # Generate document
-        document = self._generate_document(
+        content = dict(
             numero=numero,
             mese=mese,
             anno=anno,
@@ -81,32 +200,186 @@ class MagazineBuilder:
             immagine_frequenze=immagine_frequenze,
             immagine_donazione=immagine_donazione,
         )
+        if sharded is None:
+            sharded = _env_flag("GEKO_BUILD_SHARDED")
+        if persist_typ is None:
+            persist_typ = _env_flag("GEKO_PERSIST_TYP")
+
+        fasi: dict[str, float] = {}
+        start = time.perf_counter()
+        if articles_data is not None:
+            content["articles"] = articles_data
+            dati = self._issue_data(**content)
+            if persist_typ:
+                persist_source(f"geko{numero}.json", json.dumps(dati, ensure_ascii=False))
+            pdf_bytes = self._compile_data(dati)
+        elif sharded:
+            from .sharded_build import build_sharded
+            pdf_bytes = build_sharded(self, persist=persist_typ, **content)
+        else:
+            # Generate document
+            document = self._generate_document(**content)
+            if persist_typ:
+                persist_source(f"geko{numero}.typ", document)
+
+            # Compile to PDF (in memory)
+            # Use WEBAPP_DIR as root to access both typst/ and data/ directories
+            pdf_bytes = compile_source(document)
+        fasi["compilazione"] = time.perf_counter() - start
+
+        # Post-processing: master di stampa + profili ricompressi in
+        # parallelo (schermo = default, mobile). Fail-safe, non rompe la build.
+        from .pdf_compress import DEFAULT_PROFILE, linearize_pdf, make_profiles, profile_path
+        master = profile_path(self.output_dir, numero, "print")
+        # File temporaneo + rename atomico: chi legge il master non vede mai
+        # un PDF scritto a metà.
+        tmp = master.with_name(f".{master.name}.tmp")
+        tmp.write_bytes(pdf_bytes)
+        tmp.replace(master)
+        start = time.perf_counter()
+        profiles = make_profiles(master, self.output_dir, numero)
+        fasi["profili"] = time.perf_counter() - start
+        # Il master si linearizza per ultimo: i profili ne leggono una copia.
+        start = time.perf_counter()
+        profiles_linearized = [p for p, info in profiles.items() if info.get("linearized")]
+        if linearize_pdf(master)["linearized"]:
+            profiles_linearized.insert(0, "print")
+        fasi["linearizzazione"] = time.perf_counter() - start
+        for profile, info in profiles.items():
+            if info["compressed"]:
+                print(
+                    f"PDF {profile} compresso: {info['before'] / 1048576:.1f} MB -> "
+                    f"{info['after'] / 1048576:.1f} MB"
+                )
+            else:
+                print(f"Compressione PDF {profile} saltata: {info.get('reason', '?')}")
+        if profiles_linearized:
+            print(f"PDF linearizzati (fast web view): {', '.join(profiles_linearized)}")
+
+        self._write_build_info(numero, len(pdf_bytes), fasi, profiles)
+        pdf_path = profile_path(self.output_dir, numero, DEFAULT_PROFILE)
+
+        return pdf_path
+
+    def _write_build_info(
+        self, numero: str, byte_compilato: int, fasi: dict, profiles: dict
+    ) -> Path:
+        """Write geko{numero}.build.json next to the PDFs: phase timings,
+        page count and sizes before/after compression (read by build_history)."""
+        from pypdf import PdfReader
+        from .pdf_compress import PROFILES, profile_path
+
+        master = profile_path(self.output_dir, numero, "print")
+        info = {
+            "fasi": {k: round(v, 3) for k, v in fasi.items()},
+            "pagine": len(PdfReader(master).pages),
+            "byte_compilato": byte_compilato,
+            "byte": {
+                p: profile_path(self.output_dir, numero, p).stat().st_size for p in PROFILES
+            },
+            "compressione": {
+                p: {k: v for k, v in i.items() if k != "immagini"} for p, i in profiles.items()
+            },
+        }
+        path = self.output_dir / f"geko{numero}.build.json"
+        path.write_text(json.dumps(info, ensure_ascii=False, indent=2), encoding="utf-8")
+        return path
+
+    def profile_magazine(
+        self, numero: str, mese: str, anno: str, articles: list[dict], **kwargs
+    ) -> dict:
+        """
+        Profile the build per template function and per article.
+
+        Args:
+            articles: Article fields for generate_article_typst (titolo,
+                sottotitolo, autore, nome, contenuto_md, image_base)
+            **kwargs: Same issue options as build_magazine
 
-        # Write .typ file
-        typ_path = TYPST_DIR / "generated" / f"geko{numero}.typ"
-        typ_path.parent.mkdir(parents=True, exist_ok=True)
-        typ_path.write_text(document, encoding='utf-8')
+        The report (see profiling.py) is also written next to the PDF as
+        geko{numero}.profile.json and as a flame graph in folded-stack
+        format, geko{numero}.folded.
 
-        # Compile to PDF
-        # Use WEBAPP_DIR as root to access both typst/ and data/ directories
-        pdf_path = self.output_dir / f"geko{numero}.pdf"
-        pdf_bytes = typst.compile(
-            str(typ_path), root=str(WEBAPP_DIR), package_path=str(PKG_PATH)
+        Returns:
+            Profiling report
+        """
+        from .profiling import profile_build, to_folded
+
+        report = profile_build(
+            self, numero=numero, mese=mese, anno=anno, articles=articles, **kwargs
         )
-        pdf_path.write_bytes(pdf_bytes)
-
-        # Post-processing: comprime il PDF (fail-safe, non rompe la build)
-        from .pdf_compress import compress_pdf
-        info = compress_pdf(pdf_path)
-        if info["compressed"]:
-            print(
-                f"PDF compresso: {info['before'] / 1048576:.1f} MB -> "
-                f"{info['after'] / 1048576:.1f} MB"
-            )
-        else:
-            print(f"Compressione PDF saltata: {info.get('reason', '?')}")
+        (self.output_dir / f"geko{numero}.profile.json").write_text(
+            json.dumps(report, ensure_ascii=False, indent=2), encoding="utf-8"
+        )
+        (self.output_dir / f"geko{numero}.folded").write_text(
+            to_folded(report), encoding="utf-8"
+        )
+        return report
 
-        return pdf_path
+    def _issue_data(
+        self,
+        numero: str,
+        mese: str,
+        anno: str,
+        articles: list[dict],
+        editoriale: Optional[str] = None,
+        editoriale_autore: Optional[str] = None,
+        copertina_path: Optional[str] = None,
+        evidenze: Optional[list[dict]] = None,
+        team_membri: Optional[list[dict]] = None,
+        link_iscrizione: Optional[str] = None,
+        link_lista_distribuzione: Optional[str] = None,
+        link_donazione: Optional[str] = None,
+        immagine_frequenze: Optional[str] = None,
+        immagine_donazione: Optional[str] = None,
+    ) -> dict:
+        """Issue content as the JSON structure read by `geko-numero`."""
+        copertina = None
+        if copertina_path:
+            copertina = {
+                "immagine": _root_path(copertina_path),
+                "evidenze": [
+                    {"titolo": ev.get("titolo", ""), "descrizione": ev.get("descrizione", "")}
+                    for ev in evidenze or []
+                ],
+                "editoriale": editoriale or "",
+                "editoriale_autore": editoriale_autore or "",
+            }
+        team = None
+        if team_membri:
+            team = {
+                "membri": [
+                    {
+                        "foto": _root_path(m.get("foto")),
+                        "nominativo": m.get("nominativo", ""),
+                        "nome": m.get("nome", ""),
+                        "ruolo": m.get("ruolo", ""),
+                        "ruolo2": m.get("ruolo2") or None,
+                    }
+                    for m in team_membri
+                ],
+                "link_iscrizione": link_iscrizione or None,
+            }
+        return {
+            "numero": numero,
+            "mese": mese,
+            "anno": anno,
+            "copertina": copertina,
+            "articoli": articles,
+            "team": team,
+            "finale": {
+                "link_lista_distribuzione": link_lista_distribuzione or None,
+                "link_donazione": link_donazione or None,
+                "immagine_frequenze": _root_path(immagine_frequenze),
+                "immagine_donazione": _root_path(immagine_donazione),
+            },
+        }
+
+    def _compile_data(self, dati: dict) -> bytes:
+        """Compile the constant data-driven main source with `dati` in sys.inputs."""
+        return compile_source(
+            _DATA_MAIN, sys_inputs={"geko-dati": json.dumps(dati, ensure_ascii=False)}
+        )
 
     def try_compile_snippet(self, typst_body: str) -> Optional[str]:
         """Compila un frammento isolato (import cmarker+template+show geko).
@@ -118,16 +391,12 @@ class MagazineBuilder:
         Ritorna None se ok, oppure il messaggio d'errore Typst.
         """
         doc = (
-            '#import "@preview/cmarker:0.1.10"\n'
-            '#import "../src/template.typ": *\n'
-            '#show: geko-magazine.with(numero: "0", mese: "Test", anno: "2026")\n'
+            _PREAMBLE
+            + '#show: geko-magazine.with(numero: "0", mese: "Test", anno: "2026")\n'
             + typst_body
         )
-        tmp = TYPST_DIR / "generated" / "_probe.typ"
-        tmp.parent.mkdir(parents=True, exist_ok=True)
-        tmp.write_text(doc, encoding="utf-8")
         try:
-            typst.compile(str(tmp), root=str(WEBAPP_DIR), package_path=str(PKG_PATH))
+            compile_source(doc)
             return None
         except Exception as e:
             return str(e)
@@ -150,79 +419,155 @@ class MagazineBuilder:
         immagine_donazione: Optional[str] = None,
     ) -> str:
         """Generate complete Typst document."""
-        parts = []
+        parts = [self._front_matter(
+            numero=numero,
+            mese=mese,
+            anno=anno,
+            editoriale=editoriale,
+            editoriale_autore=editoriale_autore,
+            copertina_path=copertina_path,
+            evidenze=evidenze,
+        )]
 
-        # Import cmarker (rendering markdown) + template
-        parts.append('#import "@preview/cmarker:0.1.10"')
-        parts.append('#import "../src/template.typ": *')
-        parts.append('')
+        # Main content setup
+        parts.append(self._main_setup(numero, mese, anno))
+
+        # Articles
+        for article in articles:
+            parts.append(article)
+            parts.append('')
+
+        # Team + final page
+        parts.append(self._back_matter(
+            team_membri,
+            link_iscrizione,
+            link_lista_distribuzione,
+            link_donazione,
+            immagine_frequenze,
+            immagine_donazione,
+        ))
+
+        return '\n'.join(parts)
+
+    def _front_matter(
+        self,
+        numero: str,
+        mese: str,
+        anno: str,
+        editoriale: Optional[str],
+        editoriale_autore: Optional[str],
+        copertina_path: Optional[str],
+        evidenze: Optional[list[dict]],
+        voci_sommario: Optional[list[dict]] = None,
+    ) -> str:
+        """Generate imports, cover, logo page and table of contents.
 
-        # Cover page
+        `voci_sommario` ({"titolo", "pagina"}) replaces the native outline:
+        used by the sharded build, where articles are separate documents.
+        """
+        parts = [_PREAMBLE]
         if copertina_path:
-            # Path must be absolute from root (starting with /)
-            # copertina_path is like "data/uploads/file.png", we add "/" prefix
-            abs_copertina = f"/{copertina_path}" if not copertina_path.startswith("/") else copertina_path
-            evidenze_typst = self._format_evidenze(evidenze) if evidenze else "()"
-            parts.append(f'''#copertina(
+            parts.append(self._cover_page(
+                numero, mese, anno, editoriale, editoriale_autore, copertina_path, evidenze,
+            ))
+            parts.append('')
+        parts.append(self._logo_page(numero, mese, anno))
+        parts.append('')
+        parts.append(self._toc(numero, mese, anno, voci_sommario))
+        parts.append('')
+
+        return '\n'.join(parts)
+
+    def _cover_page(
+        self,
+        numero: str,
+        mese: str,
+        anno: str,
+        editoriale: Optional[str],
+        editoriale_autore: Optional[str],
+        copertina_path: str,
+        evidenze: Optional[list[dict]],
+    ) -> str:
+        """Generate the `copertina` call."""
+        # Path must be absolute from root (starting with /)
+        # copertina_path is like "data/uploads/file.png", we add "/" prefix
+        abs_copertina = f"/{copertina_path}" if not copertina_path.startswith("/") else copertina_path
+        evidenze_typst = self._format_evidenze(evidenze) if evidenze else "()"
+        return f'''#copertina(
   numero: "{numero}",
   mese: "{mese}",
   anno: "{anno}",
   immagine-principale: "{abs_copertina}",
   evidenze: {evidenze_typst},
   editoriale-testo: [{(editoriale or "").replace(chr(10), chr(10) + chr(10))}],
-  editoriale-autore: "{editoriale_autore or ""}",
-)''')
-            parts.append('')
+  editoriale-autore: "{_typ_str(editoriale_autore or "")}",
+)'''
 
-        # Logo page - absolute path from root
-        parts.append(f'''#pagina-logo(
+    def _logo_page(self, numero: str, mese: str, anno: str) -> str:
+        """Generate the `pagina-logo` call (logo path absolute from root)."""
+        return f'''#pagina-logo(
   numero: "{numero}",
   mese: "{mese}",
   anno: "{anno}",
   logo-rivista: "/typst/assets/logo_rivista.jpg",
   sottotitolo-testo: "Il GEKO RADIO MAGAZINE – Rivista aperiodica del Mountain QRP Club.",
-)''')
-        parts.append('')
+)'''
 
-        # Table of contents
-        parts.append(f'''#sommario(numero: "{numero}", mese: "{mese}", anno: "{anno}")''')
-        parts.append('')
+    def _toc(
+        self, numero: str, mese: str, anno: str, voci_sommario: Optional[list[dict]] = None,
+    ) -> str:
+        """Generate the `sommario` call (native outline unless `voci_sommario`)."""
+        if voci_sommario is None:
+            return f'''#sommario(numero: "{numero}", mese: "{mese}", anno: "{anno}")'''
+        voci = ''.join(
+            f'(titolo: "{_typ_str(v["titolo"])}", pagina: "{v["pagina"]}"), '
+            for v in voci_sommario
+        )
+        return f'''#sommario(numero: "{numero}", mese: "{mese}", anno: "{anno}", voci: ({voci}))'''
 
-        # Main content setup
-        parts.append(f'''#show: geko-magazine.with(
+    def _main_setup(self, numero: str, mese: str, anno: str) -> str:
+        """Generate the `geko-magazine` show rule that styles the articles."""
+        return f'''#show: geko-magazine.with(
   numero: "{numero}",
   mese: "{mese}",
   anno: "{anno}",
-)''')
-
-        # Articles
-        for article in articles:
-            parts.append(article)
-            parts.append('')
+)'''
 
-        # Team page (if members are configured)
+    def _back_matter(
+        self,
+        team_membri: Optional[list[dict]] = None,
+        link_iscrizione: Optional[str] = None,
+        link_lista_distribuzione: Optional[str] = None,
+        link_donazione: Optional[str] = None,
+        immagine_frequenze: Optional[str] = None,
+        immagine_donazione: Optional[str] = None,
+        leading_pagebreak: bool = True,
+    ) -> str:
+        """Generate team page (if members are configured) and final page."""
+        parts = []
         if team_membri:
-            parts.append('#pagebreak()')
+            if leading_pagebreak:
+                parts.append('#pagebreak()')
             parts.append(self._generate_team_page(team_membri, link_iscrizione))
             parts.append('')
+            leading_pagebreak = True
 
-        # Final page
-        parts.append('#pagebreak()')
+        if leading_pagebreak:
+            parts.append('#pagebreak()')
         parts.append(self._generate_final_page(
             link_lista_distribuzione,
             link_donazione,
             immagine_frequenze,
             immagine_donazione
         ))
-
         return '\n'.join(parts)
 
     def _format_evidenze(self, evidenze: list[dict]) -> str:
         """Format highlights list for Typst."""
         items = []
         for ev in evidenze:
-            titolo = ev.get('titolo', '')
-            descrizione = ev.get('descrizione', '')
+            titolo = _typ_str(ev.get('titolo', ''))
+            descrizione = _typ_str(ev.get('descrizione', ''))
             items.append(f'(titolo: "{titolo}", descrizione: "{descrizione}")')
         return '(\n    ' + ',\n    '.join(items) + ',\n  )'
 
@@ -238,10 +583,10 @@ class MagazineBuilder:
             foto = m.get('foto', '')
             if foto and not foto.startswith('/'):
                 foto = f"/{foto}"
-            nominativo = m.get('nominativo', '')
-            nome = m.get('nome', '')
-            ruolo = m.get('ruolo', '')
-            ruolo2 = m.get('ruolo2', '')
+            nominativo = _typ_str(m.get('nominativo', ''))
+            nome = _typ_str(m.get('nome', ''))
+            ruolo = _typ_str(m.get('ruolo', ''))
+            ruolo2 = _typ_str(m.get('ruolo2', ''))
 
             member_str = f'(foto: "{foto}", nominativo: "{nominativo}", nome: "{nome}", ruolo: "{ruolo}"'
             if ruolo2:
@@ -290,8 +635,25 @@ def build_magazine_pdf(
     mese: str,
     anno: str,
     articles_typst: list[str],
+    output_dir: Optional[Path] = None,
     **kwargs
 ) -> Path:
-    """Convenience function for building magazine PDF."""
-    builder = MagazineBuilder()
+    """Convenience function for building magazine PDF.
+
+    `output_dir` (default data/output) is where the profiles are written;
+    the API builds into a staging directory and publishes from there.
+    """
+    builder = MagazineBuilder(output_dir)
     return builder.build_magazine(numero, mese, anno, articles_typst, **kwargs)
+
+
+def profile_magazine(
+    numero: str,
+    mese: str,
+    anno: str,
+    articles: list[dict],
+    **kwargs
+) -> dict:
+    """Convenience function for profiling a magazine build."""
+    builder = MagazineBuilder()
+    return builder.profile_magazine(numero, mese, anno, articles, **kwargs)
@@ -0,0 +1,310 @@
+"""Pool di processi worker isolati per le compilazioni del magazine.
+
+`typst.compile` e Ghostscript giravano in un thread del worker uvicorn: un
+documento patologico (tabella enorme, immagine gigante, loop nel template)
+poteva occupare il thread a tempo indeterminato e gonfiare la RSS del
+processo web. Qui ogni lavoro gira in un processo separato con:
+
+  - timeout wall-clock (GEKO_COMPILE_TIMEOUT, secondi): allo scadere il
+    worker viene ucciso insieme ai suoi figli (shard, gs) e la chiamata
+    solleva `CompileTimeout`;
+  - tetto di memoria RLIMIT_AS (GEKO_COMPILE_MEM_MB): un'allocazione oltre il
+    limite fa fallire il lavoro (MemoryError o abort del worker), non l'API;
+  - riciclo dopo GEKO_COMPILE_MAX_JOBS lavori, contro la crescita della RSS;
+  - annullamento: con un `threading.Event` (`cancel=`) chi ha chiesto il
+    lavoro può abbandonarlo (build superata da una più recente); il worker
+    viene ucciso e la chiamata solleva `CompileCancelled`.
+
+Il processo web resta solo in attesa sulla pipe (in un thread, via
+`run`), quindi l'event loop — e `/health` — rispondono sempre.
+"""
+
+import asyncio
+import atexit
+import logging
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_WORKERS = 1
+_DEFAULT_TIMEOUT = 300.0
+_DEFAULT_MEM_MB = 2048
+_DEFAULT_MAX_JOBS = 20
+# Ogni quanto `call` controlla l'annullamento mentre attende il worker.
+_CANCEL_POLL = 0.1
+
+
+class CompileError(Exception):
+    """Il lavoro è fallito nel worker (eccezione Python o Typst)."""
+
+
+class CompileTimeout(CompileError):
+    """Il lavoro ha superato il timeout ed è stato interrotto."""
+
+
+class CompileWorkerCrash(CompileError):
+    """Il worker è morto durante il lavoro (segnale, abort, OOM)."""
+
+
+class CompileCancelled(CompileError):
+    """Il lavoro è stato annullato da chi lo aveva chiesto."""
+
+
+def _env_number(name: str, default, cast=int):
+    try:
+        return cast(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+def _worker_main(conn, mem_mb: int, initializer: Optional[Callable]) -> None:
+    """Loop del processo worker: riceve (fn, args, kwargs), risponde con
+    ("ok", risultato) o ("err", messaggio). None = chiusura ordinata."""
+    if hasattr(os, "setsid"):
+        # Gruppo di processi proprio: al timeout si uccidono anche i figli
+        # (pool degli shard, Ghostscript) con un solo killpg.
+        os.setsid()
+    if mem_mb > 0:
+        import resource
+
+        limite = mem_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limite, limite))
+    if initializer is not None:
+        try:
+            initializer()
+        except Exception:  # noqa: BLE001 — un warm-up fallito non blocca i lavori
+            logger.exception("Inizializzazione del worker di compilazione fallita")
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            return
+        if job is None:
+            return
+        fn, args, kwargs = job
+        try:
+            conn.send(("ok", fn(*args, **kwargs)))
+        except BaseException as e:  # noqa: BLE001 — MemoryError compreso
+            conn.send(("err", str(e) or type(e).__name__))
+
+
+class _Worker:
+    """Un processo worker e il lato padre della sua pipe."""
+
+    def __init__(self, ctx, mem_mb: int, initializer: Optional[Callable] = None):
+        self.conn, child = ctx.Pipe()
+        # Non daemon: i processi daemon non possono avere figli, e la build a
+        # shard apre il suo ProcessPoolExecutor dentro il worker.
+        self.process = ctx.Process(
+            target=_worker_main, args=(child, mem_mb, initializer),
+            name="geko-compile", daemon=False,
+        )
+        self.process.start()
+        child.close()
+        self.jobs = 0
+
+    def kill(self) -> None:
+        try:
+            os.killpg(self.process.pid, signal.SIGKILL)
+        except (AttributeError, ProcessLookupError, PermissionError):
+            # setsid non ancora eseguito (o non POSIX): solo il worker
+            self.process.kill()
+        self.process.join(5)
+        self.conn.close()
+
+    def stop(self) -> None:
+        try:
+            self.conn.send(None)
+        except (BrokenPipeError, OSError):
+            pass
+        self.process.join(5)
+        if self.process.is_alive():
+            self.kill()
+        else:
+            self.conn.close()
+
+
+class CompilePool:
+    """Pool di worker di compilazione con timeout, tetto di memoria e riciclo.
+
+    I parametri a None si leggono dall'ambiente (GEKO_COMPILE_WORKERS,
+    GEKO_COMPILE_TIMEOUT, GEKO_COMPILE_MEM_MB, GEKO_COMPILE_MAX_JOBS).
+    I worker partono su richiesta e restano vivi tra un lavoro e l'altro;
+    `initializer` (funzione di modulo) gira in ogni worker appena avviato,
+    anche dopo un riciclo.
+    """
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        timeout: Optional[float] = None,
+        mem_mb: Optional[int] = None,
+        max_jobs: Optional[int] = None,
+        initializer: Optional[Callable] = None,
+    ):
+        self.workers = max(1, workers or _env_number("GEKO_COMPILE_WORKERS", _DEFAULT_WORKERS))
+        self.timeout = timeout or _env_number("GEKO_COMPILE_TIMEOUT", _DEFAULT_TIMEOUT, float)
+        self.mem_mb = mem_mb if mem_mb is not None else _env_number(
+            "GEKO_COMPILE_MEM_MB", _DEFAULT_MEM_MB)
+        self.max_jobs = max(1, max_jobs or _env_number("GEKO_COMPILE_MAX_JOBS", _DEFAULT_MAX_JOBS))
+        self.initializer = initializer
+        # spawn: il pool è usato dai thread di uvicorn, fork lì non è sicuro.
+        self._ctx = multiprocessing.get_context("spawn")
+        self._idle: list[_Worker] = []
+        self._slots = threading.BoundedSemaphore(self.workers)
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _acquire(self, cancel: Optional[threading.Event] = None) -> _Worker:
+        """Attende uno slot libero e ne ritorna il worker; con `cancel`
+        l'attesa in coda si interrompe con CompileCancelled."""
+        if cancel is None:
+            self._slots.acquire()
+        else:
+            while not self._slots.acquire(timeout=_CANCEL_POLL):
+                if cancel.is_set():
+                    raise CompileCancelled("compilazione annullata")
+        with self._lock:
+            worker = self._idle.pop() if self._idle else None
+        if worker is None or not worker.process.is_alive():
+            worker = _Worker(self._ctx, self.mem_mb, self.initializer)
+        return worker
+
+    def _release(self, worker: Optional[_Worker]) -> None:
+        if worker is not None and worker.jobs >= self.max_jobs:
+            logger.info("Riciclo worker di compilazione %s dopo %d lavori",
+                        worker.process.pid, worker.jobs)
+            worker.stop()
+            worker = None
+        with self._lock:
+            if worker is not None and not self._closed:
+                self._idle.append(worker)
+                worker = None
+        if worker is not None:
+            worker.stop()
+        self._slots.release()
+
+    def _wait(self, worker: _Worker, cancel: Optional[threading.Event]) -> bool:
+        """Attende la risposta del worker entro il timeout. False = scaduto;
+        solleva CompileCancelled se `cancel` viene impostato nel frattempo."""
+        if cancel is None:
+            return worker.conn.poll(self.timeout)
+        deadline = time.monotonic() + self.timeout
+        while True:
+            if cancel.is_set():
+                raise CompileCancelled("compilazione annullata")
+            rimanente = deadline - time.monotonic()
+            if rimanente <= 0:
+                return False
+            if worker.conn.poll(min(_CANCEL_POLL, rimanente)):
+                return True
+
+    def call(
+        self, fn: Callable, *args, cancel: Optional[threading.Event] = None, **kwargs
+    ) -> Any:
+        """Esegue `fn(*args, **kwargs)` in un worker e ne ritorna il risultato.
+
+        `fn` e argomenti devono essere picklabili (funzioni di modulo).
+        Con `cancel`, impostare l'evento interrompe il lavoro (anche prima che
+        trovi un worker libero). Solleva CompileTimeout, CompileWorkerCrash,
+        CompileCancelled o CompileError.
+        """
+        if self._closed:
+            raise RuntimeError("CompilePool chiuso")
+        if cancel is not None and cancel.is_set():
+            raise CompileCancelled("compilazione annullata")
+        worker = self._acquire(cancel)
+        try:
+            if cancel is not None and cancel.is_set():
+                raise CompileCancelled("compilazione annullata")
+            try:
+                worker.conn.send((fn, args, kwargs))
+            except (BrokenPipeError, OSError) as e:
+                worker.kill()
+                worker = None
+                raise CompileWorkerCrash(f"worker di compilazione non raggiungibile: {e}") from e
+            worker.jobs += 1
+            try:
+                pronto = self._wait(worker, cancel)
+            except CompileCancelled:
+                logger.info("Compilazione annullata: termino il worker %s", worker.process.pid)
+                worker.kill()
+                worker = None
+                raise
+            if not pronto:
+                logger.warning("Compilazione oltre %.0f s: termino il worker %s",
+                               self.timeout, worker.process.pid)
+                worker.kill()
+                worker = None
+                raise CompileTimeout(
+                    f"compilazione interrotta: superato il limite di {self.timeout:.0f} s"
+                )
+            try:
+                status, payload = worker.conn.recv()
+            except (EOFError, OSError) as e:
+                worker.process.join(5)
+                code = worker.process.exitcode
+                worker.kill()
+                worker = None
+                motivo = (
+                    f"segnale {signal.Signals(-code).name}" if code and code < 0
+                    else f"codice di uscita {code}"
+                )
+                raise CompileWorkerCrash(
+                    f"il worker di compilazione è terminato ({motivo}): "
+                    f"documento troppo grande o limite di memoria ({self.mem_mb} MB) superato"
+                ) from e
+        finally:
+            self._release(worker)
+        if status == "err":
+            raise CompileError(payload)
+        return payload
+
+    async def run(
+        self, fn: Callable, *args, cancel: Optional[threading.Event] = None, **kwargs
+    ) -> Any:
+        """Versione async di `call`: l'attesa avviene in un thread, l'event
+        loop resta libero."""
+        return await asyncio.to_thread(self.call, fn, *args, cancel=cancel, **kwargs)
+
+    def shutdown(self) -> None:
+        """Chiude i worker inattivi; quelli occupati si chiudono al rilascio."""
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.stop()
+
+
+_pool: Optional[CompilePool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> CompilePool:
+    """Pool condiviso del processo, creato al primo uso."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            from . import warmup
+
+            # Con il warm-up attivo ogni worker nuovo (anche riciclato) parte
+            # già caldo: font, package e template caricati prima del primo lavoro.
+            _pool = CompilePool(initializer=warmup.worker_initializer())
+            # I worker non sono daemon: vanno chiusi prima che multiprocessing
+            # li attenda all'uscita dell'interprete.
+            atexit.register(_pool.shutdown)
+        return _pool
+
+
+def shutdown_pool() -> None:
+    """Chiude il pool condiviso (shutdown dell'app)."""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
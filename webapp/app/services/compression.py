@@ -0,0 +1,296 @@
+"""Compressione HTTP (brotli/gzip) delle risposte e asset SPA precompressi.
+
+Il JSON degli articoli (Markdown e Typst completi) e il bundle Svelte si
+comprimono 5-10 volte: per gli editori su linee lente è la differenza tra
+un elenco che arriva subito e uno che si fa aspettare.
+
+  - `CompressionMiddleware` negozia `Accept-Encoding` (br preferito a gzip
+    a parità di q) e comprime al volo le risposte testuali (JSON, HTML,
+    JS, CSS, SVG...) sopra `minimum_size` byte, anche in streaming. Non tocca
+    le risposte già codificate, i 204/304, le risposte parziali (Range) e
+    i binari (PDF, immagini);
+  - `precompress` scrive accanto a ogni asset testuale della build Svelte le
+    varianti `.br` e `.gz` alla compressione massima. Gira una volta (nel
+    Dockerfile, e all'avvio per le build locali: i file già aggiornati sono
+    saltati);
+  - `PrecompressedStaticFiles` serve `/_app` usando quelle varianti, con
+    `Cache-Control: immutable` per gli asset con hash nel nome
+    (`_app/immutable/`).
+"""
+
+import gzip
+import logging
+import mimetypes
+import os
+import zlib
+from pathlib import Path
+from typing import Optional
+
+import brotli
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+logger = logging.getLogger(__name__)
+
+MIN_BYTES = 1024  # sotto questa soglia la compressione non ripaga
+
+# Livelli per la compressione al volo (veloci) e per le varianti statiche (massimi).
+_BROTLI_AL_VOLO = 5
+_GZIP_AL_VOLO = 6
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+_TIPI_COMPRIMIBILI = {
+    "application/json",
+    "application/javascript",
+    "application/manifest+json",
+    "application/xml",
+    "image/svg+xml",
+}
+
+_ESTENSIONI = {"br": ".br", "gzip": ".gz"}
+
+
+def comprimibile(content_type: Optional[str]) -> bool:
+    """True per i tipi testuali che vale la pena comprimere."""
+    if not content_type:
+        return False
+    tipo = content_type.split(";", 1)[0].strip().lower()
+    return tipo.startswith("text/") or tipo in _TIPI_COMPRIMIBILI
+
+
+def scegli_codifica(accept_encoding: Optional[str]) -> Optional[str]:
+    """"br", "gzip" o None secondo `Accept-Encoding` (q-value, `*`, `identity`)."""
+    if not accept_encoding:
+        return None
+    pesi = {}
+    for parte in accept_encoding.split(","):
+        nome, _, parametri = parte.partition(";")
+        q = 1.0
+        for parametro in parametri.split(";"):
+            chiave, _, valore = parametro.strip().partition("=")
+            if chiave.lower() == "q":
+                try:
+                    q = float(valore)
+                except ValueError:
+                    q = 0.0
+        if nome.strip():
+            pesi[nome.strip().lower()] = q
+    migliore, q_migliore = None, 0.0
+    for codifica in ("br", "gzip"):
+        q = pesi.get(codifica, pesi.get("*", 0.0))
+        if q > q_migliore:
+            migliore, q_migliore = codifica, q
+    return migliore
+
+
+class _Gzip:
+    def __init__(self):
+        self._c = zlib.compressobj(_GZIP_AL_VOLO, zlib.DEFLATED, 31)
+
+    def parte(self, dati: bytes) -> bytes:
+        return self._c.compress(dati) + self._c.flush(zlib.Z_SYNC_FLUSH)
+
+    def fine(self, dati: bytes = b"") -> bytes:
+        return self._c.compress(dati) + self._c.flush()
+
+
+class _Brotli:
+    def __init__(self):
+        self._c = brotli.Compressor(quality=_BROTLI_AL_VOLO)
+
+    def parte(self, dati: bytes) -> bytes:
+        return self._c.process(dati) + self._c.flush()
+
+    def fine(self, dati: bytes = b"") -> bytes:
+        return self._c.process(dati) + self._c.finish()
+
+
+_COMPRESSORI = {"br": _Brotli, "gzip": _Gzip}
+
+
+class CompressionMiddleware:
+    """Middleware ASGI: comprime le risposte testuali secondo `Accept-Encoding`."""
+
+    def __init__(self, app, minimum_size: int = MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] == "HEAD":
+            await self.app(scope, receive, send)
+            return
+        codifica = scegli_codifica(Headers(scope=scope).get("accept-encoding"))
+        if codifica is None:
+            await self.app(scope, receive, send)
+            return
+        await _Risposta(self.app, codifica, self.minimum_size)(scope, receive, send)
+
+
+class _Risposta:
+    """Stato della compressione di una singola risposta.
+
+    I primi blocchi del corpo restano in attesa finché non si sa se la
+    risposta supera `minimum_size`: una risposta piccola, anche se arriva a
+    pezzi, esce com'è.
+    """
+
+    def __init__(self, app, codifica: str, minimum_size: int):
+        self.app = app
+        self.codifica = codifica
+        self.minimum_size = minimum_size
+        self.inizio = None
+        self.attesa: list[bytes] = []
+        self.compressore = None
+
+    async def __call__(self, scope, receive, send):
+        self.send = send
+        await self.app(scope, receive, self._send)
+
+    async def _send(self, message):
+        tipo = message["type"]
+        if tipo == "http.response.start":
+            headers = MutableHeaders(raw=message["headers"])
+            if comprimibile(headers.get("content-type")):
+                headers.add_vary_header("Accept-Encoding")
+                if (
+                    message["status"] not in (204, 206, 304)
+                    and "content-encoding" not in headers
+                    and "content-range" not in headers
+                ):
+                    self.inizio = message
+                    return
+            await self.send(message)
+            return
+        if self.compressore is not None:
+            corpo = message.get("body", b"")
+            if message.get("more_body", False):
+                await self.send({"type": tipo, "body": self.compressore.parte(corpo), "more_body": True})
+            else:
+                await self.send({"type": tipo, "body": self.compressore.fine(corpo)})
+            return
+        if self.inizio is None or tipo != "http.response.body":
+            # Risposta non compressa (o estensioni come pathsend).
+            await self._rilascia()
+            await self.send(message)
+            return
+
+        self.attesa.append(message.get("body", b""))
+        corpo = b"".join(self.attesa)
+        altro = message.get("more_body", False)
+        if len(corpo) < self.minimum_size:
+            if not altro:
+                inizio, self.inizio, self.attesa = self.inizio, None, []
+                await self.send(inizio)
+                await self.send({"type": tipo, "body": corpo})
+            return
+
+        inizio, self.inizio, self.attesa = self.inizio, None, []
+        headers = MutableHeaders(raw=inizio["headers"])
+        self.compressore = _COMPRESSORI[self.codifica]()
+        headers["Content-Encoding"] = self.codifica
+        if altro:
+            del headers["Content-Length"]
+            await self.send(inizio)
+            await self.send({"type": tipo, "body": self.compressore.parte(corpo), "more_body": True})
+        else:
+            compresso = self.compressore.fine(corpo)
+            headers["Content-Length"] = str(len(compresso))
+            await self.send(inizio)
+            await self.send({"type": tipo, "body": compresso})
+
+    async def _rilascia(self):
+        """Invia così com'è quanto trattenuto finora."""
+        if self.inizio is None:
+            return
+        inizio, self.inizio = self.inizio, None
+        await self.send(inizio)
+        if self.attesa:
+            corpo, self.attesa = b"".join(self.attesa), []
+            await self.send({"type": "http.response.body", "body": corpo, "more_body": True})
+
+
+# --- Varianti precompresse ---
+
+def _varianti(dati: bytes) -> dict[str, bytes]:
+    return {
+        ".br": brotli.compress(dati, quality=11),
+        ".gz": gzip.compress(dati, compresslevel=9, mtime=0),
+    }
+
+
+def precompress(directory: Path, *, minimum_size: int = MIN_BYTES) -> int:
+    """Scrive `<file>.br` e `<file>.gz` per gli asset testuali di `directory`.
+
+    Salta le varianti più recenti del sorgente e quelle che non
+    risparmierebbero nulla. Ritorna il numero di file scritti.
+    """
+    scritti = 0
+    if not directory.is_dir():
+        return 0
+    for path in sorted(directory.rglob("*")):
+        if path.suffix in (".br", ".gz") or not path.is_file():
+            continue
+        st = path.stat()
+        if st.st_size < minimum_size or not comprimibile(mimetypes.guess_type(path.name)[0]):
+            continue
+        destinazioni = {ext: path.with_name(path.name + ext) for ext in (".br", ".gz")}
+        if all(d.exists() and d.stat().st_mtime >= st.st_mtime for d in destinazioni.values()):
+            continue
+        dati = path.read_bytes()
+        for ext, compresso in _varianti(dati).items():
+            dest = destinazioni[ext]
+            if len(compresso) >= len(dati):
+                dest.unlink(missing_ok=True)
+                continue
+            tmp = dest.with_name(dest.name + ".tmp")
+            tmp.write_bytes(compresso)
+            os.replace(tmp, dest)
+            scritti += 1
+    if scritti:
+        logger.info("Asset precompressi in %s: %d file", directory, scritti)
+    return scritti
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """StaticFiles che serve le varianti `.br`/`.gz` quando il client le accetta.
+
+    I percorsi sotto `immutable_prefix` (asset con hash nel nome) hanno
+    `Cache-Control: immutable` per un anno; gli altri vanno rivalidati.
+    """
+
+    def __init__(self, *args, immutable_prefix: Optional[str] = "immutable/", **kwargs):
+        super().__init__(*args, **kwargs)
+        self.immutable_prefix = immutable_prefix
+
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        response = None
+        codifica = scegli_codifica(request_headers.get("accept-encoding")) if comprimibile(media_type) else None
+        if codifica is not None:
+            variante = f"{full_path}{_ESTENSIONI[codifica]}"
+            try:
+                st = os.stat(variante)
+            except OSError:
+                st = None
+            if st is not None and st.st_mtime >= stat_result.st_mtime:
+                response = FileResponse(variante, status_code=status_code, stat_result=st,
+                                        media_type=media_type)
+                response.headers["Content-Encoding"] = codifica
+        if response is None:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result,
+                                    media_type=media_type)
+        if comprimibile(media_type):
+            response.headers.add_vary_header("Accept-Encoding")
+
+        relativo = Path(os.path.relpath(full_path, self.directory)).as_posix()
+        if self.immutable_prefix is not None and relativo.startswith(self.immutable_prefix):
+            response.headers["Cache-Control"] = IMMUTABLE
+        else:
+            response.headers["Cache-Control"] = "no-cache"
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
@@ -0,0 +1,131 @@
+"""Consegna dei file grandi (PDF dei numeri, foto in `/uploads`) senza copie in Python.
+
+Quando esce un numero molti soci scaricano il PDF insieme, e con il
+`FileResponse` standard ogni download passa dal worker Python a blocchi da
+64 KB: lettura in un thread, copia in userland, un messaggio ASGI per blocco.
+`SendfileResponse` sceglie il percorso più economico disponibile:
+
+  1. offload al server davanti (`GEKO_SENDFILE_HEADER`): la risposta porta
+     solo gli header e `X-Accel-Redirect` (nginx; URI interna
+     `GEKO_SENDFILE_PREFIX` + percorso relativo a `GEKO_SENDFILE_ROOT`) o
+     `X-Sendfile` (Apache, lighttpd; percorso assoluto). Il server invia il
+     file con sendfile e gestisce lui le richieste Range;
+  2. estensione ASGI `http.response.zerocopysend`, se il server la offre:
+     il server riceve il file descriptor e usa `os.sendfile` (anche per
+     una singola Range);
+  3. estensione `http.response.pathsend` (file intero), già gestita da
+     Starlette;
+  4. altrimenti lettura a blocchi da `CHUNK_SIZE` (1 MiB): sedici volte meno
+     passaggi thread/event loop per GB.
+
+In tutti i casi: `ETag`/`Last-Modified`, `304` su `If-None-Match` /
+`If-Modified-Since`, `Accept-Ranges` e `206` come il `FileResponse` di
+Starlette. Misure: `python -m bench.consegna`.
+"""
+
+import os
+from email.utils import parsedate
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+CHUNK_SIZE = 1024 * 1024
+
+OFFLOAD_HEADERS = ("X-Accel-Redirect", "X-Sendfile")
+
+
+def not_modified(response_headers: Headers, request_headers: Headers) -> bool:
+    """Validatori condizionali come `StaticFiles.is_not_modified`."""
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match:
+        if if_none_match.strip() == "*":
+            return True
+        etag = response_headers["etag"]
+        return etag in [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    if_modified_since = parsedate(request_headers.get("if-modified-since") or "")
+    last_modified = parsedate(response_headers.get("last-modified") or "")
+    return bool(if_modified_since and last_modified and if_modified_since >= last_modified)
+
+
+def _offload(path) -> Optional[tuple[str, str]]:
+    """(header, valore) per l'offload al server davanti, se configurato."""
+    header = os.environ.get("GEKO_SENDFILE_HEADER", "").strip()
+    if not header:
+        return None
+    if header not in OFFLOAD_HEADERS:
+        raise ValueError(f"GEKO_SENDFILE_HEADER={header!r} non valido: usa {' o '.join(OFFLOAD_HEADERS)}")
+    assoluto = os.path.abspath(path)
+    if header == "X-Sendfile":
+        return header, assoluto
+    root = os.path.abspath(os.environ.get("GEKO_SENDFILE_ROOT", "data"))
+    relativo = os.path.relpath(assoluto, root)
+    if relativo.startswith(".."):
+        return None  # fuori dalla location interna: lo serve l'app
+    prefisso = os.environ.get("GEKO_SENDFILE_PREFIX", "/_protected/")
+    return header, prefisso.rstrip("/") + "/" + relativo.replace(os.sep, "/")
+
+
+class SendfileResponse(FileResponse):
+    """`FileResponse` con offload, zero-copy e validatori condizionali."""
+
+    chunk_size = CHUNK_SIZE
+
+    async def __call__(self, scope, receive, send) -> None:
+        self._zerocopy = False
+        if scope["type"] == "http":
+            if self.stat_result is None:
+                try:
+                    self.stat_result = await anyio.to_thread.run_sync(os.stat, self.path)
+                except FileNotFoundError:
+                    raise RuntimeError(f"File at path {self.path} does not exist.")
+                self.set_stat_headers(self.stat_result)
+            if self.status_code == 200 and not_modified(self.headers, Headers(scope=scope)):
+                await NotModifiedResponse(self.headers)(scope, receive, send)
+                return
+            offload = _offload(self.path)
+            if offload is not None:
+                await self._send_offload(send, *offload)
+                return
+            self._zerocopy = "http.response.zerocopysend" in scope.get("extensions", {})
+        await super().__call__(scope, receive, send)
+
+    async def _send_offload(self, send, header: str, valore: str) -> None:
+        headers = MutableHeaders(raw=list(self.raw_headers))
+        del headers["content-length"]  # lo mette il server insieme al corpo
+        headers[header] = valore
+        await send({"type": "http.response.start", "status": self.status_code, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _zerocopysend(self, send, offset: int, count: int) -> None:
+        with open(self.path, "rb") as file:
+            await send({"type": "http.response.zerocopysend", "file": file,
+                        "offset": offset, "count": count})
+
+    async def _handle_simple(self, send, send_header_only: bool, send_pathsend: bool) -> None:
+        if not self._zerocopy or send_header_only:
+            await super()._handle_simple(send, send_header_only, send_pathsend)
+            return
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        await self._zerocopysend(send, 0, self.stat_result.st_size)
+
+    async def _handle_single_range(self, send, start: int, end: int, file_size: int,
+                                   send_header_only: bool) -> None:
+        if not self._zerocopy or send_header_only:
+            await super()._handle_single_range(send, start, end, file_size, send_header_only)
+            return
+        headers = MutableHeaders(raw=list(self.raw_headers))
+        headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": headers.raw})
+        await self._zerocopysend(send, start, end - start)
+
+
+class SendfileStaticFiles(StaticFiles):
+    """StaticFiles che consegna i file con `SendfileResponse`."""
+
+    def file_response(self, full_path, stat_result, scope, status_code=200) -> Response:
+        # Il 304 lo decide la risposta stessa (not_modified).
+        return SendfileResponse(full_path, status_code=status_code, stat_result=stat_result)
@@ -0,0 +1,141 @@
+"""Font del progetto per la compilazione Typst.
+
+Di default Typst scandisce a ogni compilatore tutti i font di sistema: il costo
+cresce coi pacchetti installati e il risultato dipende dalla macchina (laptop
+di sviluppo e container producono PDF diversi). Qui i font vengono da una
+directory di progetto (GEKO_FONT_DIR, default `typst/fonts/`) e, con
+GEKO_IGNORE_SYSTEM_FONTS, solo da lì più i font incorporati in typst: la
+scoperta dei font diventa un costo fisso e piccolo e la stessa build produce
+lo stesso PDF ovunque (prerequisito per una cache delle build per hash).
+
+`typst/fonts/manifest.json` dichiara famiglie, file attesi (con sha256
+opzionale) e i caratteri che il magazine deve coprire; `check_fonts` lo
+verifica all'avvio e segnala i caratteri che finirebbero su un font di
+ripiego non dichiarato.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Optional
+
+import typst
+
+logger = logging.getLogger(__name__)
+
+WEBAPP_DIR = Path(__file__).parent.parent.parent
+DEFAULT_FONT_DIR = WEBAPP_DIR / "typst" / "fonts"
+MANIFEST_NAME = "manifest.json"
+
+
+def font_dir() -> Path:
+    """Directory dei font di progetto (GEKO_FONT_DIR o typst/fonts/)."""
+    return Path(os.environ.get("GEKO_FONT_DIR") or DEFAULT_FONT_DIR)
+
+
+def ignore_system_fonts() -> bool:
+    """True se Typst deve ignorare i font di sistema (GEKO_IGNORE_SYSTEM_FONTS)."""
+    return os.environ.get("GEKO_IGNORE_SYSTEM_FONTS", "").strip().lower() in {
+        "1", "true", "yes", "on"}
+
+
+def compiler_options() -> dict:
+    """Argomenti font per `typst.Compiler` / `typst.compile`."""
+    d = font_dir()
+    return {
+        "font_paths": [str(d)] if d.is_dir() else [],
+        "ignore_system_fonts": ignore_system_fonts(),
+    }
+
+
+def load_manifest(path: Optional[Path] = None) -> dict:
+    path = Path(path) if path else font_dir() / MANIFEST_NAME
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _base_font(nome: str) -> str:
+    """"/ABCDEF+DejaVuSerif-Bold-Identity-H" -> "DejaVuSerif-Bold-Identity-H"."""
+    nome = nome.lstrip("/")
+    return nome.split("+", 1)[1] if "+" in nome else nome
+
+
+def _ripieghi(famiglie: list[dict], caratteri: str) -> list[dict]:
+    """Compila un carattere per pagina con lo stack delle famiglie dichiarate e
+    ritorna quelli resi con un font che non è tra le famiglie del manifest."""
+    caratteri = "".join(dict.fromkeys(c for c in caratteri if not c.isspace()))
+    if not caratteri or not famiglie:
+        return []
+    from pypdf import PdfReader
+
+    stack = ", ".join(json.dumps(f["famiglia"]) for f in famiglie)
+    prefissi = tuple(f.get("postscript") or f["famiglia"].replace(" ", "") for f in famiglie)
+    pagine = "\n#pagebreak()\n".join(
+        f"#str.from-unicode({ord(c)})" for c in caratteri
+    )
+    src = f"#set page(width: 2cm, height: 2cm)\n#set text(font: ({stack},))\n{pagine}\n"
+    pdf = typst.Compiler(**compiler_options()).compile(src.encode("utf-8"))
+    out = []
+    for c, page in zip(caratteri, PdfReader(io.BytesIO(pdf)).pages):
+        usati = [_base_font(str(f["/BaseFont"]))
+                 for f in page["/Resources"]["/Font"].values()]
+        if not any(u.startswith(prefissi) for u in usati):
+            out.append({"carattere": c, "codice": f"U+{ord(c):04X}", "font": usati})
+    return out
+
+
+def check_fonts(manifest_path: Optional[Path] = None) -> dict:
+    """Verifica la configurazione font contro il manifest. Non solleva mai.
+
+    Ritorna: {"ok": bool, "font_dir": str, "ignora_font_di_sistema": bool,
+              "file_mancanti": [...], "checksum_errati": [...],
+              "famiglie_mancanti": [...], "ripieghi": [...], "errore": str?}.
+    """
+    d = font_dir()
+    report = {
+        "ok": False,
+        "font_dir": str(d),
+        "ignora_font_di_sistema": ignore_system_fonts(),
+        "file_mancanti": [],
+        "checksum_errati": [],
+        "famiglie_mancanti": [],
+        "ripieghi": [],
+    }
+    try:
+        manifest = load_manifest(manifest_path)
+        for voce in manifest.get("file", []):
+            path = d / voce["nome"]
+            if not path.is_file():
+                report["file_mancanti"].append(voce["nome"])
+            elif voce.get("sha256") and _sha256(path) != voce["sha256"].lower():
+                report["checksum_errati"].append(voce["nome"])
+
+        opts = compiler_options()
+        disponibili = set(typst.Fonts(
+            include_system_fonts=not opts["ignore_system_fonts"],
+            font_paths=opts["font_paths"],
+        ).families())
+        famiglie = manifest.get("famiglie", [])
+        report["famiglie_mancanti"] = [
+            f["famiglia"] for f in famiglie if f["famiglia"] not in disponibili
+        ]
+        report["ripieghi"] = _ripieghi(famiglie, manifest.get("caratteri", ""))
+    except Exception as e:  # noqa: BLE001 — la verifica non deve bloccare l'avvio
+        logger.warning("Verifica font fallita: %s", e)
+        report["errore"] = str(e)
+        return report
+
+    report["ok"] = not any(
+        report[k] for k in ("file_mancanti", "checksum_errati", "famiglie_mancanti", "ripieghi")
+    )
+    return report
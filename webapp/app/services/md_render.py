@@ -278,3 +278,45 @@ def generate_article_typst(
     parts.append('')
     parts.append('#separatore()')
     return '\n'.join(parts)
+
+
+# ── Modalità data-driven (template.typ: geko-articolo / geko-numero) ──
+def segments_data(md: str, image_base: Optional[str] = None) -> list[dict]:
+    """Segmenti come dati JSON per `geko-articolo`: stesse regole di
+    render_segments, ma senza generare (né escapare) sorgente Typst."""
+    out = []
+    for seg in segment_markdown(md):
+        if seg.kind == "prose":
+            out.append({"tipo": "prosa", "testo": seg.text})
+        elif seg.kind == "box":
+            out.append({
+                "tipo": "box", "box": seg.tipo, "titolo": seg.titolo, "testo": seg.text,
+            })
+        elif seg.kind == "images":
+            out.append({"tipo": "immagini", "immagini": [
+                {
+                    "percorso": _remap_path(path, image_base),
+                    "didascalia": alt or None,
+                    "larghezza": _parse_width(attrs),
+                }
+                for alt, path, attrs in seg.images
+            ]})
+    return out
+
+
+def article_data(
+    titolo: str,
+    sottotitolo: Optional[str],
+    autore: Optional[str],
+    nome: Optional[str],
+    contenuto_md: str,
+    image_base: Optional[str] = None,
+) -> dict:
+    """Articolo come dati JSON: equivalente di generate_article_typst."""
+    return {
+        "titolo": titolo,
+        "sottotitolo": sottotitolo or None,
+        "autore": autore or None,
+        "nome": (nome or None) if autore else None,
+        "segmenti": segments_data(contenuto_md, image_base),
+    }
@@ -0,0 +1,238 @@
+"""Validazione statica del Markdown di un articolo, senza compilare.
+
+Finora un contenuto che rompe Typst si scopriva solo facendo fallire la
+build completa e ricompilando poi ogni segmento (diagnostica di `/build`):
+minuti di compilazione per un'immagine mancante. Qui si controllano in
+pochi millisecondi, sull'output di `md_render.segment_markdown`, i casi che
+rompono la compilazione o l'impaginazione:
+
+  - immagini: file mancante (nella media library dell'articolo
+    `data/uploads/articoli/<id>/`, dall'indice in memoria di media_index, o
+    al path indicato), URL remoti, formati
+    che Typst non legge, immagini dentro la prosa con path non risolvibili
+    (cmarker non rimappa `/uploads/` né i nomi nudi);
+  - attributi `{...}` delle immagini: chiavi che `_parse_width` ignora e
+    larghezze senza `%` (in modalità Typst diventano un intero: errore);
+  - costrutti sbilanciati: blocchi `<!--raw-typst ...-->` con parentesi non
+    chiuse nel segmento, blocchi di codice spezzati dal segmenter;
+  - tabelle con troppe colonne e griglie con troppe immagini.
+
+Ogni problema è un dict con `livello` ("errore": la build fallirebbe,
+"avviso": compila ma l'impaginazione ne soffre), `codice`, `righe` (1-based,
+inclusive) e `messaggio`.
+"""
+
+import re
+from pathlib import Path
+from typing import Optional
+
+from .md_render import _IMG_RE, _parse_width, _remap_path, segment_markdown
+
+# Oltre queste soglie tabella e griglia escono dalla colonna di testo o
+# occupano pagine intere: non rompono la build, ma vanno segnalate.
+_MAX_COLONNE_TABELLA = 8
+_MAX_IMMAGINI_GRIGLIA = 12
+
+_FENCE_RE = re.compile(r'^\s{0,3}(`{3,}|~{3,})')
+_RAW_TYPST_RE = re.compile(r'<!--raw-typst(.*?)-->', re.DOTALL)
+_HTML_IMG_RE = re.compile(r'<img\b[^>]*\bsrc\s*=\s*["\']([^"\']+)["\']', re.IGNORECASE)
+_TABLE_SEP_RE = re.compile(r'^\s*\|?\s*:?-+:?\s*(\|\s*:?-+:?\s*)*\|?\s*$')
+_COPPIE = {')': '(', ']': '[', '}': '{'}
+
+
+def _issue(livello: str, codice: str, righe: tuple[int, int], messaggio: str) -> dict:
+    return {"livello": livello, "codice": codice, "righe": [righe[0] + 1, righe[1] + 1],
+            "messaggio": messaggio}
+
+
+def _resolve(path: str, root: Path, uploads_dir: Path, template_dir: Path) -> Path:
+    """File che Typst leggerà per `path` (assoluto dalla root Typst, o
+    relativo al template se non inizia con `/`)."""
+    if path.startswith('/data/uploads/'):
+        return uploads_dir / path[len('/data/uploads/'):]
+    if path.startswith('/'):
+        return root / path.lstrip('/')
+    return template_dir / path
+
+
+def _check_path(path: str, righe: tuple[int, int], ctx: dict, *,
+                in_prosa: bool = False) -> Optional[dict]:
+    if '://' in path or path.startswith('data:'):
+        return _issue("errore", "immagine-remota", righe,
+                      f"Immagine non locale '{path[:60]}': carica il file nella "
+                      "media library dell'articolo e usa il nome file")
+    if Path(path).suffix.lower() not in ctx["formati"]:
+        return _issue("errore", "formato-immagine", righe,
+                      f"Formato non supportato per '{path}' "
+                      f"(ammessi: {', '.join(sorted(f[1:] for f in ctx['formati']))})")
+    # Media library degli articoli: dall'indice in memoria, con un solo stat.
+    in_media, entry = ctx["media"].lookup_ref(path)
+    if entry is not None or (
+        not in_media
+        and _resolve(path, ctx["root"], ctx["uploads_dir"], ctx["template_dir"]).is_file()
+    ):
+        return None
+    if in_prosa:
+        return _issue("errore", "immagine-in-prosa", righe,
+                      f"Immagine '{path}' dentro il testo: qui il path non viene "
+                      "rimappato; mettila su una riga da sola")
+    return _issue("errore", "immagine-mancante", righe, f"Immagine non trovata: '{path}'")
+
+
+def _check_attrs(attrs: Optional[str], righe: tuple[int, int], data_mode: bool) -> list[dict]:
+    if not attrs:
+        return []
+    out = []
+    for token in re.split(r'[\s,;]+', attrs.strip()):
+        if not token:
+            continue
+        chiave, _, valore = token.partition('=')
+        if chiave != "width":
+            out.append(_issue("avviso", "attributo-sconosciuto", righe,
+                              f"Attributo '{token}' ignorato (supportato solo width=N%)"))
+        elif not re.fullmatch(r'\d+%?', valore):
+            out.append(_issue("avviso", "larghezza-non-valida", righe,
+                              f"Larghezza '{valore}' non valida: usa width=N%"))
+        elif valore.endswith('%') and not 0 < int(valore[:-1]) <= 100:
+            out.append(_issue("avviso", "larghezza-non-valida", righe,
+                              f"Larghezza {valore} fuori da 1-100%"))
+    width = _parse_width(attrs)
+    if width and not width.endswith('%') and not data_mode:
+        out.append(_issue("errore", "larghezza-senza-unita", righe,
+                          f"width={width} senza '%': Typst vuole una lunghezza "
+                          f"(es. width={width}%)"))
+    return out
+
+
+def _raw_typst_sbilanciato(codice: str) -> Optional[str]:
+    """Prima parentesi sbilanciata nel codice Typst grezzo (stringhe escluse)."""
+    pila = []
+    in_stringa = False
+    prev = ''
+    for ch in codice:
+        if in_stringa:
+            if ch == '"' and prev != '\\':
+                in_stringa = False
+        elif ch == '"':
+            in_stringa = True
+        elif ch in '([{':
+            pila.append(ch)
+        elif ch in _COPPIE:
+            if not pila or pila.pop() != _COPPIE[ch]:
+                return ch
+        prev = ch
+    return pila[-1] if pila else None
+
+
+def _check_testo(testo: str, inizio: int, ultimo: bool, ctx: dict) -> list[dict]:
+    """Controlli su un segmento prosa o box (markdown che va a cmarker)."""
+    out = []
+    righe = testo.split('\n')
+    fence = None
+    fence_riga = 0
+    for n, riga in enumerate(righe):
+        pos = inizio + n
+        m = _FENCE_RE.match(riga)
+        if m:
+            if fence is None:
+                fence, fence_riga = m.group(1), pos
+            elif m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence):
+                fence = None
+            continue
+        if fence is not None:
+            continue
+        for img in _IMG_RE.finditer(riga):
+            problema = _check_path(img.group(2).strip(), (pos, pos), ctx, in_prosa=True)
+            if problema:
+                out.append(problema)
+            if img.group(3):
+                out.append(_issue("avviso", "attributo-sconosciuto", (pos, pos),
+                                  "Attributi {...} ignorati per le immagini dentro il testo"))
+        for src in _HTML_IMG_RE.findall(riga):
+            problema = _check_path(src, (pos, pos), ctx, in_prosa=True)
+            if problema:
+                out.append(problema)
+        if _TABLE_SEP_RE.match(riga) and '|' in riga and n > 0:
+            colonne = len(riga.strip().strip('|').split('|'))
+            if colonne > _MAX_COLONNE_TABELLA:
+                out.append(_issue("avviso", "tabella-larga", (pos - 1, pos),
+                                  f"Tabella con {colonne} colonne (max consigliato "
+                                  f"{_MAX_COLONNE_TABELLA}): esce dalla colonna di testo"))
+    if fence is not None and not ultimo:
+        out.append(_issue("avviso", "codice-spezzato", (fence_riga, inizio + len(righe) - 1),
+                          "Blocco di codice non chiuso prima di un'immagine o di un box: "
+                          "le righe successive escono dal blocco"))
+
+    # cmarker valuta i blocchi raw-typst di un segmento come un unico
+    # sorgente: le parentesi devono bilanciarsi nel segmento, non nel blocco.
+    blocchi = list(_RAW_TYPST_RE.finditer(testo))
+    carattere = _raw_typst_sbilanciato(''.join(m.group(1) for m in blocchi)) if blocchi else None
+    if carattere:
+        da = inizio + testo.count('\n', 0, blocchi[0].start())
+        a = inizio + testo.count('\n', 0, blocchi[-1].end())
+        out.append(_issue("errore", "typst-sbilanciato", (da, a),
+                          f"Blocchi <!--raw-typst--> con '{carattere}' non bilanciato "
+                          "in questo tratto di testo"))
+    return out
+
+
+def validate_markdown(
+    md: str,
+    image_base: Optional[str] = None,
+    *,
+    root: Optional[Path] = None,
+    uploads_dir: Optional[Path] = None,
+    data_mode: Optional[bool] = None,
+) -> list[dict]:
+    """Problemi del markdown di un articolo, in ordine di riga.
+
+    `image_base` è la media library dell'articolo
+    (`article_ops.article_image_base`); `root` la root Typst (default la
+    webapp), `uploads_dir` la directory degli upload (default
+    `article_ops.UPLOADS_DIR`); `data_mode` la modalità di build (default
+    GEKO_BUILD_DATA).
+    """
+    from . import article_ops
+    from .builder import TEMPLATE_DIR, WEBAPP_DIR, data_mode_enabled
+    from .media_index import get_index
+
+    root = Path(root) if root is not None else WEBAPP_DIR
+    uploads_dir = Path(uploads_dir) if uploads_dir is not None else article_ops.UPLOADS_DIR
+    ctx = {
+        "root": root,
+        "uploads_dir": uploads_dir,
+        "media": get_index(uploads_dir),
+        "template_dir": root / TEMPLATE_DIR.relative_to(WEBAPP_DIR),
+        "formati": article_ops.ALLOWED_IMAGE_EXTENSIONS,
+    }
+    if data_mode is None:
+        data_mode = data_mode_enabled()
+
+    out: list[dict] = []
+    segmenti = segment_markdown(md or "")
+    for k, seg in enumerate(segmenti):
+        righe = (seg.start_line, seg.end_line)
+        if seg.kind == "images":
+            if len(seg.images) > _MAX_IMMAGINI_GRIGLIA:
+                out.append(_issue("avviso", "griglia-grande", righe,
+                                  f"Griglia di {len(seg.images)} immagini (max consigliato "
+                                  f"{_MAX_IMMAGINI_GRIGLIA}): spezzala con del testo"))
+            for _alt, path, attrs in seg.images:
+                problema = _check_path(_remap_path(path.strip(), image_base), righe, ctx)
+                if problema:
+                    out.append(problema)
+                if len(seg.images) == 1:
+                    out.extend(_check_attrs(attrs, righe, data_mode))
+                elif attrs:
+                    out.append(_issue("avviso", "attributo-sconosciuto", righe,
+                                      "Attributi {...} ignorati per le immagini in griglia"))
+        else:
+            # Il corpo di un box parte dalla riga dopo l'intestazione "> [!TIPO]".
+            inizio = seg.start_line + (1 if seg.kind == "box" else 0)
+            out.extend(_check_testo(seg.text, inizio, k == len(segmenti) - 1, ctx))
+    out.sort(key=lambda p: p["righe"][0])
+    return out
+
+
+def has_errors(problemi: list[dict]) -> bool:
+    return any(p["livello"] == "errore" for p in problemi)
@@ -0,0 +1,263 @@
+"""Indice in memoria della media library degli articoli.
+
+La media library è `UPLOADS_DIR/articoli/<id>/<nome>` (vedi
+`article_ops.save_article_image`). Prima ogni elenco immagini faceva uno
+stat per file, la validazione dei riferimenti un `is_file` per immagine e
+l'hash degli input della build rileggeva tutti i byte di tutte le immagini.
+
+Qui, per articolo, nome → byte, mime, dimensioni in pixel (con
+l'orientamento EXIF applicato) e sha256:
+
+  - costruito all'avvio (`scan`, in un thread) o al primo uso, solo con
+    stat (byte, mtime, mime dall'estensione): con centinaia di migliaia di
+    immagini leggere e decodificare ogni file bloccherebbe l'avvio per
+    minuti. sha256 e pixel si calcolano al primo `lookup`/`list`/`digest`
+    del file;
+  - aggiornato da `save_article_image` / `delete_article_image` (`put`,
+    `remove`), che sono l'unica via di scrittura della media library;
+  - `lookup` rifà solo lo stat del file, così file copiati a mano o
+    cancellati da un altro processo si vedono subito; `lookup_ref` (usato
+    dalla validazione, nell'event loop) non legge mai i byte;
+  - `digest` (per l'hash degli input della build) verifica con uno stat che
+    il file non sia cambiato prima di fidarsi dello sha256 in indice.
+"""
+
+import hashlib
+import io
+import logging
+import mimetypes
+import re
+import stat
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+_EXTRA_MIME = {".svg": "image/svg+xml", ".webp": "image/webp"}
+_EXIF_ORIENTATION = 0x0112
+# Riferimento alla media library dalla root Typst (vedi md_render._remap_path).
+_MEDIA_REF_RE = re.compile(r'^/data/uploads/articoli/(\d+)/([^/]+)$')
+
+
+def guess_mime(nome_file: str) -> str:
+    """Deduce il MIME dall'estensione (fallback su mimetypes)."""
+    ext = Path(nome_file).suffix.lower()
+    if ext in _EXTRA_MIME:
+        return _EXTRA_MIME[ext]
+    return mimetypes.guess_type(nome_file)[0] or "application/octet-stream"
+
+
+@dataclass(frozen=True)
+class MediaEntry:
+    """Un file della media library di un articolo."""
+
+    nome: str
+    byte: int
+    mime: str
+    larghezza: Optional[int]
+    altezza: Optional[int]
+    orientamento: int
+    sha256: Optional[str]  # None: entry da stat, non ancora letta (vedi scan)
+    mtime_ns: int
+
+    def to_dict(self) -> dict:
+        return asdict(self)
+
+
+def pixel_size(data: bytes) -> tuple[Optional[int], Optional[int], int]:
+    """(larghezza, altezza, orientamento EXIF) di un'immagine raster.
+
+    Le dimensioni sono quelle visualizzate: con orientamento EXIF 5-8 (foto
+    scattate in verticale) larghezza e altezza sono scambiate, come quando
+    l'immagine viene impaginata. (None, None, 1) per SVG e formati non
+    raster.
+    """
+    try:
+        from PIL import Image
+
+        with Image.open(io.BytesIO(data)) as img:  # legge solo l'header
+            larghezza, altezza = img.size
+            orientamento = img.getexif().get(_EXIF_ORIENTATION, 1)
+    except Exception:  # noqa: BLE001 — SVG e formati non raster: niente pixel
+        return None, None, 1
+    if orientamento in (5, 6, 7, 8):
+        larghezza, altezza = altezza, larghezza
+    return larghezza, altezza, orientamento
+
+
+def describe(path: Path, content: Optional[bytes] = None) -> MediaEntry:
+    """Legge (o riceve) i byte del file e ne ricava l'entry dell'indice."""
+    data = path.read_bytes() if content is None else content
+    larghezza, altezza, orientamento = pixel_size(data)
+    return MediaEntry(
+        nome=path.name,
+        byte=len(data),
+        mime=guess_mime(path.name),
+        larghezza=larghezza,
+        altezza=altezza,
+        orientamento=orientamento,
+        sha256=hashlib.sha256(data).hexdigest(),
+        mtime_ns=path.stat().st_mtime_ns,
+    )
+
+
+def _from_stat(path: Path, st) -> MediaEntry:
+    """Entry parziale dal solo stat: pixel e sha256 arrivano al primo uso."""
+    return MediaEntry(
+        nome=path.name,
+        byte=st.st_size,
+        mime=guess_mime(path.name),
+        larghezza=None,
+        altezza=None,
+        orientamento=1,
+        sha256=None,
+        mtime_ns=st.st_mtime_ns,
+    )
+
+
+class MediaIndex:
+    """Indice di `uploads_dir/articoli/`: {articolo_id: {nome: MediaEntry}}."""
+
+    def __init__(self, uploads_dir: Path):
+        self.uploads_dir = Path(uploads_dir)
+        self._articoli_dir = (self.uploads_dir / "articoli").resolve()
+        self._lock = threading.Lock()
+        self._entries: dict[int, dict[str, MediaEntry]] = {}
+        self._scanned = False
+
+    def scan(self) -> int:
+        """(Ri)costruisce l'indice dal disco, con soli stat. Ritorna i file indicizzati."""
+        entries: dict[int, dict[str, MediaEntry]] = {}
+        if self._articoli_dir.is_dir():
+            for art_dir in self._articoli_dir.iterdir():
+                if not (art_dir.is_dir() and art_dir.name.isdigit()):
+                    continue
+                files = {}
+                for f in art_dir.iterdir():
+                    try:
+                        st = f.stat()
+                    except OSError:
+                        continue
+                    if stat.S_ISREG(st.st_mode):
+                        files[f.name] = _from_stat(f, st)
+                if files:
+                    entries[int(art_dir.name)] = files
+        with self._lock:
+            self._entries = entries
+            self._scanned = True
+        totale = sum(len(v) for v in entries.values())
+        logger.info("Indice media: %d file in %d articoli", totale, len(entries))
+        return totale
+
+    def _ensure(self) -> None:
+        if not self._scanned:
+            self.scan()
+
+    def path(self, article_id: int, nome: str) -> Path:
+        return self.uploads_dir / "articoli" / str(article_id) / nome
+
+    def put(self, article_id: int, nome: str, content: Optional[bytes] = None) -> MediaEntry:
+        """Aggiorna l'entry di un file appena scritto (content: i suoi byte)."""
+        self._ensure()
+        entry = describe(self.path(article_id, nome), content)
+        with self._lock:
+            self._entries.setdefault(article_id, {})[nome] = entry
+        return entry
+
+    def _complete(self, article_id: int, entry: MediaEntry) -> Optional[MediaEntry]:
+        """Legge il file di un'entry parziale (da scan) e la sostituisce;
+        None (ed entry rimossa) se nel frattempo il file è sparito."""
+        if entry.sha256 is not None:
+            return entry
+        try:
+            return self.put(article_id, entry.nome)
+        except OSError:
+            self.remove(article_id, entry.nome)
+            return None
+
+    def remove(self, article_id: int, nome: str) -> None:
+        self._ensure()
+        with self._lock:
+            files = self._entries.get(article_id, {})
+            files.pop(nome, None)
+            if not files:
+                self._entries.pop(article_id, None)
+
+    def lookup(self, article_id: int, nome: str, *, complete: bool = True) -> Optional[MediaEntry]:
+        """Entry del file, None se non esiste.
+
+        Ogni lookup rifà lo stat del file: un file cancellato o sostituito da
+        un altro processo (il server MCP condivide `data/uploads`) non resta
+        in indice. Con `complete=False` basta l'entry da stat (esistenza,
+        byte, mime) e il file non viene letto: è il lookup da usare
+        nell'event loop (validazione dei riferimenti).
+        """
+        self._ensure()
+        path = self.path(article_id, nome)
+        try:
+            st = path.stat()
+        except OSError:
+            st = None
+        if st is None or not stat.S_ISREG(st.st_mode):
+            self.remove(article_id, nome)
+            return None
+        with self._lock:
+            files = self._entries.setdefault(article_id, {})
+            entry = files.get(nome)
+            if entry is None or (entry.byte, entry.mtime_ns) != (st.st_size, st.st_mtime_ns):
+                entry = files[nome] = _from_stat(path, st)
+        return self._complete(article_id, entry) if complete else entry
+
+    def list(self, article_id: int) -> list[MediaEntry]:
+        self._ensure()
+        with self._lock:
+            files = dict(self._entries.get(article_id, {}))
+        entries = (self._complete(article_id, files[n]) for n in sorted(files))
+        return [e for e in entries if e is not None]
+
+    def lookup_ref(self, ref: str) -> tuple[bool, Optional[MediaEntry]]:
+        """Per un riferimento `/data/uploads/articoli/<id>/<nome>`:
+        (True, entry da stat o None). (False, None) se `ref` non è della
+        media library. Non legge il file (vedi `lookup`)."""
+        m = _MEDIA_REF_RE.match(ref)
+        if not m:
+            return False, None
+        return True, self.lookup(int(m.group(1)), m.group(2), complete=False)
+
+    def digest(self, path: Path) -> Optional[str]:
+        """sha256 di un file della media library senza rileggerlo, se lo stat
+        coincide con l'indice. None se il file non è della media library."""
+        path = Path(path).resolve()
+        if path.parent.parent != self._articoli_dir or not path.parent.name.isdigit():
+            return None
+        try:
+            st = path.stat()
+        except OSError:
+            return None
+        article_id = int(path.parent.name)
+        self._ensure()
+        with self._lock:
+            entry = self._entries.get(article_id, {}).get(path.name)
+        if entry is None or entry.sha256 is None or (entry.byte, entry.mtime_ns) != (st.st_size, st.st_mtime_ns):
+            entry = self.put(article_id, path.name)
+        return entry.sha256
+
+
+_indexes: dict[Path, MediaIndex] = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(uploads_dir: Optional[Path] = None) -> MediaIndex:
+    """L'indice della media library (default `article_ops.UPLOADS_DIR`)."""
+    if uploads_dir is None:
+        from .article_ops import UPLOADS_DIR
+
+        uploads_dir = UPLOADS_DIR
+    key = Path(uploads_dir).resolve()
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = MediaIndex(uploads_dir)
+    return index
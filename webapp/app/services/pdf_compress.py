@@ -4,32 +4,90 @@ Typst incorpora le immagini alla risoluzione originale: un numero con molte foto
 può superare decine di MB. Questo passo post-build ricampiona/ricomprime le
 immagini interne al PDF (preset /ebook, 150 dpi) mantenendo il testo vettoriale.
 Fail-safe: se Ghostscript non è disponibile o fallisce, l'originale resta intatto.
+Un pre-scan delle immagini (pdf_images.py) evita la passata gs quando non c'è
+niente da guadagnare.
+
+Profili di output (`PROFILES`): dalla stessa build escono un master di stampa
+non ricompresso, l'edizione schermo a 150 dpi (quella di default, il vecchio
+`geko{numero}.pdf`) e un'edizione mobile a 72 dpi; `make_profiles` le produce
+in parallelo, una passata Ghostscript per profilo.
+
+Linearizzazione ("fast web view", `linearize_pdf`): dopo la compressione ogni
+profilo viene riscritto con `qpdf --linearize`, così un viewer che legge a
+richieste Range (PDF.js, i viewer dei browser) mostra la prima pagina senza
+scaricare tutto il file. Disattivabile con GEKO_PDF_LINEARIZE=0; senza qpdf
+il file resta com'è.
 """
 
 import logging
+import os
 import shutil
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
+from typing import Optional
 
 logger = logging.getLogger(__name__)
 
 # /ebook = 150 dpi: buon compromesso qualità/dimensione per lettura a schermo.
 _GS_PRESET = "ebook"
+# Risoluzione di destinazione dei preset gs, per il pre-scan delle immagini.
+_PRESET_DPI = {"screen": 72, "ebook": 150, "printer": 300, "prepress": 300}
+
+# Profilo -> preset Ghostscript (None = master di stampa, non ricompresso).
+# /screen = 72 dpi: edizione leggera per connessioni mobili.
+PROFILES: dict[str, Optional[str]] = {"print": None, "screen": "ebook", "mobile": "screen"}
+DEFAULT_PROFILE = "screen"
 
 
-def compress_pdf(path: Path, preset: str = _GS_PRESET) -> dict:
+def compress_pdf(path: Path, preset: str = _GS_PRESET, strategy: Optional[str] = None) -> dict:
     """Ricomprime in-place il PDF con Ghostscript. Non solleva mai eccezioni.
 
+    Prima un pre-scan delle immagini (pdf_images.scan_images): se nessuna è
+    sovradimensionata rispetto ai dpi del preset né pesante e senza perdita,
+    Ghostscript non avrebbe niente da guadagnare e non viene lanciato.
+    `strategy` (default GEKO_PDF_RECOMPRESS, "gs"): "gs" = passata completa
+    pdfwrite; "images" = ricompressione mirata delle sole immagini
+    sovradimensionate, con esito per immagine.
+
     Sostituisce l'originale col compresso SOLO se strettamente più piccolo.
     Ritorna: {"compressed": bool, "before": int, "after": int, "preset": str,
-              "reason": str (solo se non compresso)}.
+              "reason": str (solo se non compresso),
+              "immagini": [...] (solo strategia "images")}.
     """
+    from .pdf_images import recompress_images, scan_images
+
     path = Path(path)
     before = path.stat().st_size
+    strategy = strategy or os.environ.get("GEKO_PDF_RECOMPRESS", "gs")
 
-    def _skip(reason: str) -> dict:
+    def _skip(reason: str, **extra) -> dict:
         return {"compressed": False, "before": before, "after": before,
-                "preset": preset, "reason": reason}
+                "preset": preset, "reason": reason, **extra}
+
+    target_dpi = _PRESET_DPI.get(preset, 150)
+    try:
+        scan = scan_images(path, target_dpi)
+    except Exception as e:  # noqa: BLE001 — nel dubbio si ricomprime
+        logger.warning("Pre-scan immagini fallito (%s): procedo senza", e)
+        scan = None
+    if scan is not None and not scan["conviene"]:
+        logger.info("Compressione PDF saltata: %d immagini già entro %d dpi",
+                    len(scan["immagini"]), target_dpi)
+        return _skip("immagini già ottimizzate")
+
+    if strategy == "images":
+        try:
+            info = recompress_images(path, target_dpi)
+        except Exception as e:  # noqa: BLE001
+            logger.warning("Ricompressione immagini fallita (%s): tengo l'originale", e)
+            return _skip("ricompressione immagini fallita")
+        if not info["compressed"]:
+            return _skip("nessuna riduzione", immagini=info["immagini"])
+        logger.info("PDF compresso (immagini): %.1f MB -> %.1f MB",
+                    before / 1048576, info["after"] / 1048576)
+        return {"compressed": True, "before": before, "after": info["after"],
+                "preset": preset, "immagini": info["immagini"]}
 
     gs = shutil.which("gs")
     if gs is None:
@@ -64,3 +122,85 @@ def compress_pdf(path: Path, preset: str = _GS_PRESET) -> dict:
 
     tmp.unlink()  # nessuna riduzione: tieni l'originale
     return _skip("nessuna riduzione")
+
+
+def linearize_enabled() -> bool:
+    """Linearizzazione dei PDF attiva (GEKO_PDF_LINEARIZE, default 1)."""
+    return os.environ.get("GEKO_PDF_LINEARIZE", "1").strip().lower() not in ("0", "false", "no")
+
+
+def is_linearized(path: Path) -> bool:
+    """True se il PDF dichiara il dizionario /Linearized in testa al file."""
+    with open(path, "rb") as f:
+        return b"/Linearized" in f.read(1024)
+
+
+def linearize_pdf(path: Path) -> dict:
+    """Linearizza in-place il PDF con qpdf. Non solleva mai eccezioni.
+
+    Ritorna {"linearized": bool, "reason": str (solo se non linearizzato)}.
+    """
+    path = Path(path)
+    if not linearize_enabled():
+        return {"linearized": False, "reason": "disattivata"}
+    qpdf = shutil.which("qpdf")
+    if qpdf is None:
+        logger.warning("Linearizzazione PDF saltata: qpdf non disponibile")
+        return {"linearized": False, "reason": "qpdf non disponibile"}
+
+    tmp = path.with_suffix(".linearized.pdf")
+    try:
+        # Exit code 3 = successo con warning (PDF riparabili): va bene.
+        proc = subprocess.run([qpdf, "--linearize", str(path), str(tmp)], capture_output=True)
+        if proc.returncode not in (0, 3):
+            raise subprocess.CalledProcessError(proc.returncode, proc.args, proc.stderr)
+    except (subprocess.CalledProcessError, OSError) as e:
+        logger.warning("Linearizzazione PDF fallita (%s): tengo l'originale", e)
+        if tmp.exists():
+            tmp.unlink()
+        return {"linearized": False, "reason": "qpdf ha fallito"}
+
+    if not tmp.exists() or tmp.stat().st_size == 0:
+        if tmp.exists():
+            tmp.unlink()
+        return {"linearized": False, "reason": "output vuoto"}
+    tmp.replace(path)
+    return {"linearized": True}
+
+
+def profile_path(output_dir: Path, numero: str, profile: str) -> Path:
+    """File del profilo: il default resta `geko{numero}.pdf`, gli altri
+    `geko{numero}-{profilo}.pdf`."""
+    if profile == DEFAULT_PROFILE:
+        return Path(output_dir) / f"geko{numero}.pdf"
+    return Path(output_dir) / f"geko{numero}-{profile}.pdf"
+
+
+def _make_profile(master: Path, dst: Path, preset: str) -> dict:
+    # Copia temporanea accanto alla destinazione: chi scarica il profilo
+    # durante la build continua a ricevere il file precedente, intero.
+    tmp = dst.with_name(f".{dst.name}.tmp")
+    shutil.copyfile(master, tmp)
+    info = compress_pdf(tmp, preset=preset)
+    # Dopo la compressione: gs riscrive il file e perderebbe la linearizzazione.
+    info["linearized"] = linearize_pdf(tmp)["linearized"]
+    tmp.replace(dst)
+    return info
+
+
+def make_profiles(master: Path, output_dir: Path, numero: str) -> dict[str, dict]:
+    """Produce in parallelo i profili ricompressi a partire dal master.
+
+    Il master (profilo "print") deve essere già in `profile_path(..., "print")`.
+    Ogni profilo ha la sua passata Ghostscript su un thread: nessuna attende
+    le altre. Fail-safe come compress_pdf: senza gs i profili sono copie del
+    master. Ritorna {profilo: info di compress_pdf + "linearized"}.
+    """
+    master = Path(master)
+    jobs = {p: preset for p, preset in PROFILES.items() if preset is not None}
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = {
+            p: pool.submit(_make_profile, master, profile_path(output_dir, numero, p), preset)
+            for p, preset in jobs.items()
+        }
+        return {p: f.result() for p, f in futures.items()}
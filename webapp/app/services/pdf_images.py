@@ -0,0 +1,256 @@
+"""Analisi e ricompressione mirata delle immagini incorporate in un PDF.
+
+`compress_pdf` faceva sempre una passata completa `gs pdfwrite` e poi la
+scartava se non riduceva il file: sui numeri con immagini già ottimizzate si
+pagava tutto il tempo di Ghostscript per niente. `scan_images` legge invece
+gli XObject immagine (dimensioni, filtri, byte) e, seguendo la matrice di
+trasformazione dei content stream, la risoluzione effettiva con cui ogni
+immagine è disegnata: in millisecondi dice se una ricompressione può servire.
+
+`recompress_images` ricomprime SOLO le immagini sovradimensionate
+(ricampionate alla risoluzione del profilo, JPEG), lasciando intatto il resto
+del PDF, e riporta l'esito immagine per immagine.
+"""
+
+import hashlib
+import io
+import logging
+import math
+from pathlib import Path
+from typing import Optional, Union
+
+from pypdf import PdfReader, PdfWriter
+from pypdf.generic import ContentStream
+
+logger = logging.getLogger(__name__)
+
+# Come Ghostscript (DownsampleThreshold 1.5): si ricampiona solo oltre 1.5x
+# la risoluzione di destinazione.
+SOGLIA_DPI = 1.5
+# Sotto questa dimensione un'immagine non vale la ricompressione.
+MIN_BYTE = 16 * 1024
+# Immagini senza perdita (Flate) oltre questa dimensione: gs le ricodifica
+# in JPEG con guadagni forti (foto salvate come PNG).
+MIN_BYTE_LOSSLESS = 256 * 1024
+# Qualità JPEG della ricompressione mirata (vicina a quella di /ebook).
+QUALITA_JPEG = 75
+
+_IDENTITA = (1.0, 0.0, 0.0, 1.0, 0.0, 0.0)
+
+
+def _mul(m: tuple, n: tuple) -> tuple:
+    """Prodotto di matrici PDF [a b c d e f] (m applicata prima di n)."""
+    a, b, c, d, e, f = m
+    a2, b2, c2, d2, e2, f2 = n
+    return (
+        a * a2 + b * c2, a * b2 + b * d2,
+        c * a2 + d * c2, c * b2 + d * d2,
+        e * a2 + f * c2 + e2, e * b2 + f * d2 + f2,
+    )
+
+
+def _byte(xobj) -> int:
+    """Byte codificati dello stream (pypdf non conserva /Length dopo il parse)."""
+    data = getattr(xobj, "_data", None)
+    return len(data) if data is not None else int(xobj.get("/Length", 0) or 0)
+
+
+def _filtro(xobj) -> str:
+    f = xobj.get("/Filter")
+    if f is None:
+        return "nessuno"
+    if isinstance(f, list):
+        return "+".join(str(x).lstrip("/") for x in f)
+    return str(f).lstrip("/")
+
+
+def _walk(content, resources, ctm: tuple, pdf, visit, pagina: int, profondita: int = 0):
+    """Percorre un content stream tracciando la CTM; chiama `visit` per ogni
+    immagine disegnata con `Do` (ricorsivo nei Form XObject)."""
+    if resources is None or profondita > 8:
+        return
+    xobjects = resources.get_object().get("/XObject")
+    xobjects = xobjects.get_object() if xobjects is not None else {}
+    stack = []
+    for operands, op in ContentStream(content, pdf).operations:
+        if op == b"q":
+            stack.append(ctm)
+        elif op == b"Q":
+            ctm = stack.pop() if stack else ctm
+        elif op == b"cm":
+            ctm = _mul(tuple(float(x) for x in operands), ctm)
+        elif op == b"Do":
+            ref = xobjects.get(operands[0])
+            if ref is None:
+                continue
+            xobj = ref.get_object()
+            subtype = xobj.get("/Subtype")
+            if subtype == "/Image":
+                visit(ref, xobj, str(operands[0]), ctm, pagina)
+            elif subtype == "/Form":
+                matrix = tuple(float(x) for x in xobj.get("/Matrix", _IDENTITA))
+                _walk(xobj, xobj.get("/Resources") or resources, _mul(matrix, ctm),
+                      pdf, visit, pagina, profondita + 1)
+
+
+def _scan_pages(pdf, target_dpi: float, impronte: bool = False) -> dict:
+    immagini: dict = {}
+    ordine: dict[int, int] = {}
+
+    def visit(ref, xobj, nome, ctm, pagina):
+        # Posizione del disegno (pagina, n-esima immagine della pagina): stabile
+        # tra il master e i profili ricompressi, serve ad allinearli.
+        ordine[pagina] = ordine.get(pagina, 0) + 1
+        larghezza_pt = math.hypot(ctm[0], ctm[1])
+        altezza_pt = math.hypot(ctm[2], ctm[3])
+        w, h = int(xobj.get("/Width", 0)), int(xobj.get("/Height", 0))
+        dpi = 0.0
+        if larghezza_pt > 0 and altezza_pt > 0:
+            dpi = max(w / (larghezza_pt / 72), h / (altezza_pt / 72))
+        key = getattr(ref, "idnum", None) or id(xobj)
+        voce = immagini.get(key)
+        if voce is None:
+            immagini[key] = voce = {
+                "id": key,
+                "nome": nome,
+                "pagina": pagina,
+                "larghezza": w,
+                "altezza": h,
+                "filtro": _filtro(xobj),
+                "bpc": int(xobj.get("/BitsPerComponent", 0) or 0),
+                "spazio_colore": str(xobj.get("/ColorSpace", "")),
+                "smask": "/SMask" in xobj or "/Mask" in xobj,
+                "byte": _byte(xobj),
+                "byte_smask": _byte(xobj["/SMask"].get_object()) if "/SMask" in xobj else 0,
+                "dpi": 0.0,
+                "usi": 0,
+                "disegni": [],
+            }
+            if impronte:
+                data = getattr(xobj, "_data", None) or b""
+                voce["sha256"] = hashlib.sha256(data).hexdigest()
+        voce["usi"] += 1
+        voce["disegni"].append((pagina, ordine[pagina]))
+        # Disegnata più volte: conta la risoluzione più alta (uso più piccolo).
+        voce["dpi"] = max(voce["dpi"], dpi)
+
+    for n, page in enumerate(pdf.pages, start=1):
+        content = page.get_contents()
+        if content is not None:
+            _walk(content, page.get("/Resources"), _IDENTITA, pdf, visit, n)
+
+    soglia = target_dpi * SOGLIA_DPI
+    for voce in immagini.values():
+        voce["dpi"] = round(voce["dpi"], 1)
+        if voce["byte"] >= MIN_BYTE and voce["dpi"] > soglia:
+            voce["candidata"] = "sovradimensionata"
+        elif (voce["byte"] >= MIN_BYTE_LOSSLESS and voce["filtro"] in ("FlateDecode", "nessuno")
+              and not voce["smask"]):
+            voce["candidata"] = "senza perdita"
+        else:
+            voce["candidata"] = None
+    lista = sorted(immagini.values(), key=lambda v: v["byte"], reverse=True)
+    candidate = [v for v in lista if v["candidata"]]
+    return {
+        "target_dpi": target_dpi,
+        "immagini": lista,
+        "byte_immagini": sum(v["byte"] for v in lista),
+        "byte_candidati": sum(v["byte"] for v in candidate),
+        "conviene": bool(candidate),
+    }
+
+
+def scan_images(
+    source: Union[str, Path, bytes], target_dpi: float, impronte: bool = False,
+) -> dict:
+    """Analizza le immagini del PDF rispetto a una risoluzione di destinazione.
+
+    Ritorna {"target_dpi", "immagini": [...], "byte_immagini",
+    "byte_candidati", "conviene": bool}. Ogni immagine riporta dimensioni,
+    filtro, byte, dpi effettivi e `candidata` ("sovradimensionata",
+    "senza perdita" o None). `conviene` è False quando Ghostscript non
+    avrebbe niente da guadagnare sulle immagini. `disegni` elenca le posizioni
+    (pagina, ordine nella pagina) in cui l'immagine è disegnata; con
+    `impronte` ogni immagine ha anche lo `sha256` dello stream codificato.
+    """
+    data = source if isinstance(source, bytes) else Path(source).read_bytes()
+    return _scan_pages(PdfReader(io.BytesIO(data)), target_dpi, impronte)
+
+
+def recompress_images(
+    path: Union[str, Path], target_dpi: float, quality: int = QUALITA_JPEG,
+) -> dict:
+    """Ricampiona e ricodifica in JPEG solo le immagini sovradimensionate.
+
+    Il PDF viene riscritto solo se risulta più piccolo. Ritorna
+    {"compressed": bool, "before": int, "after": int, "immagini": [...]}, con
+    per ogni immagine candidata l'azione eseguita e i byte prima/dopo.
+    """
+    from PIL import Image
+
+    path = Path(path)
+    before = path.stat().st_size
+    writer = PdfWriter(clone_from=PdfReader(path))
+    scan = _scan_pages(writer, target_dpi)
+    sovradimensionate = {v["id"]: v for v in scan["immagini"]
+                         if v["candidata"] == "sovradimensionata"}
+
+    report = []
+    fatte: set = set()
+    for page in writer.pages:
+        for img in page.images:
+            ref = img.indirect_reference
+            key = getattr(ref, "idnum", None)
+            voce = sovradimensionate.get(key)
+            if voce is None or key in fatte:
+                continue
+            fatte.add(key)
+            esito = {k: voce[k] for k in ("nome", "pagina", "larghezza", "altezza", "dpi", "byte")}
+            if voce["smask"] or voce["bpc"] not in (0, 8):
+                esito["azione"] = "saltata (trasparenza o profondità non supportata)"
+                report.append(esito)
+                continue
+            try:
+                pil = img.image
+                if pil.mode not in ("RGB", "L"):
+                    pil = pil.convert("RGB")
+                scala = target_dpi / voce["dpi"]
+                nuova = pil.resize(
+                    (max(1, round(pil.width * scala)), max(1, round(pil.height * scala))),
+                    Image.LANCZOS,
+                )
+                img.replace(nuova, quality=quality)
+                nuovo = ref.get_object()
+                esito.update(
+                    azione="ricampionata",
+                    nuova_larghezza=nuova.width,
+                    nuova_altezza=nuova.height,
+                    byte_dopo=_byte(nuovo),
+                )
+            except Exception as e:  # noqa: BLE001 — l'immagine resta com'era
+                logger.warning("Ricompressione immagine %s fallita: %s", voce["nome"], e)
+                esito["azione"] = f"fallita ({e})"
+            report.append(esito)
+
+    if not any(e["azione"] == "ricampionata" for e in report):
+        return {"compressed": False, "before": before, "after": before, "immagini": report}
+
+    buf = io.BytesIO()
+    writer.compress_identical_objects()
+    writer.write(buf)
+    after = len(buf.getvalue())
+    if after >= before:
+        return {"compressed": False, "before": before, "after": before, "immagini": report}
+    tmp = path.with_suffix(".images.pdf")
+    tmp.write_bytes(buf.getvalue())
+    tmp.replace(path)
+    return {"compressed": True, "before": before, "after": after, "immagini": report}
+
+
+def summarize(scan: dict, limit: Optional[int] = 10) -> list[dict]:
+    """Le immagini più pesanti dello scan in forma compatta, per i log/report."""
+    return [
+        {k: v[k] for k in ("nome", "pagina", "larghezza", "altezza", "dpi", "filtro",
+                           "byte", "candidata")}
+        for v in scan["immagini"][:limit]
+    ]
@@ -0,0 +1,196 @@
+"""Profilazione di una build per funzione del template e per articolo.
+
+typst-py non espone il trace di `typst compile --timings`, quindi il costo si
+misura per differenza: ogni unità del numero (copertina, pagina-logo,
+sommario, intestazione e segmenti di ogni articolo, pagina-team,
+pagina-finale) viene compilata in un documento isolato — preambolo, show rule
+`geko-magazine` se l'unità sta nel corpo, e l'unità — con un mondo Typst nuovo
+(`typst.compile`, non il compilatore persistente del processo). Il costo
+dell'unità è il suo tempo meno quello del documento base senza unità.
+
+I segmenti markdown si attribuiscono alla funzione del template che li rende:
+prosa → `geko-md-scope` (cmarker), box → `box-evidenza`, immagini → `figura`.
+La differenza tra la build completa e la somma delle unità (impaginazione
+d'insieme, contatori, outline) finisce in "altro".
+
+Il report è un dict JSON; `to_folded` lo converte nel formato "folded stacks"
+di flamegraph.pl / inferno / speedscope (una riga per stack, microsecondi).
+"""
+
+import time
+from typing import Optional
+
+import typst
+
+from .fonts import compiler_options
+from .md_render import generate_article_typst, render_segments
+
+# Misure del documento base: si prende il minimo, per togliere il rumore.
+_RIPETIZIONI_BASE = 3
+
+
+def _funzione(seg, typ: str) -> str:
+    """Funzione del template che rende il segmento."""
+    if seg.kind == "box":
+        return "box-evidenza"
+    if seg.kind == "images":
+        return "figura" if typ.startswith("#figura") else "figura (griglia)"
+    return "geko-md-scope (cmarker)"
+
+
+def _frame(s: str) -> str:
+    """Nome di frame valido nel formato folded (niente ';' né a capo)."""
+    return " ".join(s.replace(";", ",").split()) or "?"
+
+
+def profile_build(
+    builder,
+    *,
+    numero: str,
+    mese: str,
+    anno: str,
+    articles: list[dict],
+    editoriale: Optional[str] = None,
+    editoriale_autore: Optional[str] = None,
+    copertina_path: Optional[str] = None,
+    evidenze: Optional[list[dict]] = None,
+    team_membri: Optional[list[dict]] = None,
+    link_iscrizione: Optional[str] = None,
+    link_lista_distribuzione: Optional[str] = None,
+    link_donazione: Optional[str] = None,
+    immagine_frequenze: Optional[str] = None,
+    immagine_donazione: Optional[str] = None,
+) -> dict:
+    """Profila la build del numero e ritorna il report.
+
+    `articles` sono i campi di `md_render.generate_article_typst` (titolo,
+    sottotitolo, autore, nome, contenuto_md, image_base): servono i segmenti
+    markdown, non il Typst già generato.
+    """
+    from .builder import _PREAMBLE, PKG_PATH, WEBAPP_DIR, _CANARY
+
+    opts = dict(root=str(WEBAPP_DIR), package_path=str(PKG_PATH), **compiler_options())
+
+    def tempo(source: str) -> float:
+        start = time.perf_counter()
+        typst.compile(source.encode("utf-8"), **opts)
+        return time.perf_counter() - start
+
+    setup = builder._main_setup(numero, mese, anno)
+    testa = _PREAMBLE
+    corpo = "\n".join([_PREAMBLE, setup, ""])
+
+    # Costi una tantum (font, plugin cmarker, parsing del template) fuori
+    # dalle misure, poi i due documenti base.
+    tempo(_CANARY)
+    base = {
+        "testa": min(tempo(testa) for _ in range(_RIPETIZIONI_BASE)),
+        "corpo": min(tempo(corpo) for _ in range(_RIPETIZIONI_BASE)),
+    }
+
+    unita: list[dict] = []
+
+    def misura(percorso: list[str], funzione: str, source: str, nel_corpo: bool, **extra):
+        base_s = base["corpo" if nel_corpo else "testa"]
+        doc = (corpo if nel_corpo else testa) + "\n" + source
+        unita.append({
+            "percorso": percorso,
+            "funzione": funzione,
+            "secondi": max(0.0, tempo(doc) - base_s),
+            **extra,
+        })
+
+    # ── Front matter ──
+    if copertina_path:
+        misura(["front matter"], "copertina", builder._cover_page(
+            numero, mese, anno, editoriale, editoriale_autore, copertina_path, evidenze,
+        ), nel_corpo=False)
+    misura(["front matter"], "pagina-logo", builder._logo_page(numero, mese, anno),
+           nel_corpo=False)
+    misura(["front matter"], "sommario", builder._toc(numero, mese, anno), nel_corpo=False)
+
+    # ── Articoli: intestazione + un'unità per segmento ──
+    articoli = []
+    for art in articles:
+        titolo = art["titolo"]
+        percorso = ["articoli", titolo]
+        prima = len(unita)
+        intestazione = generate_article_typst(**{**art, "contenuto_md": ""})
+        misura(percorso, "intestazione (autore, sottotitolo-sezione)", intestazione,
+               nel_corpo=True)
+        for seg, typ in render_segments(art["contenuto_md"] or "", art.get("image_base")):
+            misura(percorso, _funzione(seg, typ), typ, nel_corpo=True,
+                   righe=[seg.start_line + 1, seg.end_line + 1])
+        sue = unita[prima:]
+        articoli.append({
+            "titolo": titolo,
+            "secondi": sum(u["secondi"] for u in sue),
+            "funzioni": _per_funzione(sue),
+        })
+
+    # ── Pagine finali ──
+    if team_membri:
+        misura(["pagine finali"], "pagina-team",
+               builder._generate_team_page(team_membri, link_iscrizione), nel_corpo=True)
+    misura(["pagine finali"], "pagina-finale", builder._generate_final_page(
+        link_lista_distribuzione, link_donazione, immagine_frequenze, immagine_donazione,
+    ), nel_corpo=True)
+
+    # ── Build completa, per confronto ──
+    document = builder._generate_document(
+        numero=numero, mese=mese, anno=anno,
+        articles=[generate_article_typst(**art) for art in articles],
+        editoriale=editoriale, editoriale_autore=editoriale_autore,
+        copertina_path=copertina_path, evidenze=evidenze,
+        team_membri=team_membri, link_iscrizione=link_iscrizione,
+        link_lista_distribuzione=link_lista_distribuzione, link_donazione=link_donazione,
+        immagine_frequenze=immagine_frequenze, immagine_donazione=immagine_donazione,
+    )
+    build_s = tempo(document)
+    somma = sum(u["secondi"] for u in unita)
+    unita.append({
+        "percorso": [], "funzione": "altro (impaginazione d'insieme)",
+        "secondi": max(0.0, build_s - somma - base["corpo"]),
+    })
+    unita.append({"percorso": [], "funzione": "base (preambolo + show rule)",
+                  "secondi": base["corpo"]})
+
+    for u in unita:
+        u["secondi"] = round(u["secondi"], 6)
+    return {
+        "numero": numero,
+        "build_s": round(build_s, 6),
+        "base_s": {k: round(v, 6) for k, v in base.items()},
+        "funzioni": _per_funzione(unita),
+        "articoli": sorted(
+            ({**a, "secondi": round(a["secondi"], 6)} for a in articoli),
+            key=lambda a: a["secondi"], reverse=True,
+        ),
+        "unita": unita,
+    }
+
+
+def _per_funzione(unita: list[dict]) -> list[dict]:
+    """Aggrega le unità per funzione del template, dalla più costosa."""
+    agg: dict[str, dict] = {}
+    for u in unita:
+        voce = agg.setdefault(u["funzione"], {"funzione": u["funzione"], "secondi": 0.0,
+                                               "chiamate": 0})
+        voce["secondi"] += u["secondi"]
+        voce["chiamate"] += 1
+    totale = sum(v["secondi"] for v in agg.values()) or 1.0
+    out = sorted(agg.values(), key=lambda v: v["secondi"], reverse=True)
+    for v in out:
+        v["quota"] = round(100 * v["secondi"] / totale, 1)
+        v["secondi"] = round(v["secondi"], 6)
+    return out
+
+
+def to_folded(report: dict) -> str:
+    """Report in formato "folded stacks": `numero N;sezione;...;funzione µs`."""
+    radice = _frame(f"numero {report['numero']}")
+    righe = []
+    for u in report["unita"]:
+        stack = ";".join([radice] + [_frame(p) for p in u["percorso"]] + [_frame(u["funzione"])])
+        righe.append(f"{stack} {round(u['secondi'] * 1_000_000)}")
+    return "\n".join(righe) + "\n"
@@ -0,0 +1,175 @@
+"""ETag e cache delle risposte per le GET che la SPA rilegge a ogni poll.
+
+`GET /api/magazines`, `/api/articles`, `/api/articles/{id}` e `/api/config`
+ricalcolavano e riserializzavano tutto a ogni navigazione o refocus di una
+scheda. Qui:
+
+  - l'ETag deriva dalle filigrane (watermark) delle tabelle da cui dipende
+    la risposta: `count(*)` e `max(updated_at)`, lette con una sola query;
+    per un singolo articolo l'`updated_at` della sua riga. Le scritture del server MCP (altro processo, stesso SQLite)
+    passano da `article_ops`, che aggiorna queste colonne, comprese quelle
+    dei numeri quando cambia la loro composizione;
+  - alla filigrana si aggiunge una generazione del processo, incrementata da
+    ogni scrittura `/api` della webapp (`invalidate`, dal middleware in
+    main.py): copre anche le modifiche che non toccano le filigrane;
+  - `If-None-Match` uguale → `304 Not Modified` senza costruire né
+    serializzare la risposta;
+  - i corpi già serializzati stanno in una cache LRU in memoria, validi
+    finché l'ETag non cambia (budget `GEKO_RESPONSE_CACHE_MB`, default 32).
+"""
+
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Optional
+
+from fastapi.responses import Response
+from sqlalchemy import text
+
+from .serialization import FastJSONResponse, dumps
+
+logger = logging.getLogger(__name__)
+
+_FIRME = {
+    "articles": "SELECT count(*) || '/' || ifnull(max(updated_at), '') FROM articles",
+    "magazines": "SELECT count(*) || '/' || ifnull(max(updated_at), '') FROM magazines",
+    "images": "SELECT count(*) || '/' || ifnull(max(updated_at), '') FROM images",
+    "config": "SELECT count(*) || '/' || ifnull(max(updated_at), '') FROM config",
+}
+
+# Tabelle da cui dipende ogni tipo di risposta.
+SCOPES = {
+    "articles": ("articles", "magazines", "images"),
+    "article": ("magazines", "images"),  # + la riga dell'articolo
+    "magazines": ("magazines", "articles", "images"),
+    "config": ("config",),
+}
+
+CACHE_CONTROL = "private, no-cache"
+
+_AVVIO = f"{time.time_ns():x}"  # ETag di processi diversi non collidono
+_generazione = 0
+_lock = threading.Lock()
+_cache: "OrderedDict[str, tuple[str, bytes]]" = OrderedDict()
+_cache_bytes = 0
+
+
+def _budget() -> int:
+    return int(float(os.environ.get("GEKO_RESPONSE_CACHE_MB", "32")) * 1024 * 1024)
+
+
+def invalidate() -> None:
+    """Dopo una scrittura: nuova generazione, cache svuotata."""
+    global _generazione, _cache_bytes
+    with _lock:
+        _generazione += 1
+        _cache.clear()
+        _cache_bytes = 0
+
+
+class InvalidateOnWriteMiddleware:
+    """Middleware ASGI: ogni scrittura `/api` (non GET/HEAD/OPTIONS) invalida.
+
+    L'invalidazione avviene all'inizio della risposta, prima che il client
+    possa rileggere. Middleware ASGI puro: i corpi (e i messaggi
+    pathsend/zerocopysend dei download) passano senza essere rimessi in coda.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] in ("GET", "HEAD", "OPTIONS")
+            or not scope["path"].startswith("/api/")
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                invalidate()
+            await send(message)
+
+        await self.app(scope, receive, _send)
+
+
+async def etag(db, scope: str, *, article_id: Optional[int] = None) -> Optional[str]:
+    """ETag corrente per `scope`; None se l'articolo `article_id` non esiste."""
+    parti = [f"({_FIRME[t]})" for t in SCOPES[scope]]
+    params = {}
+    if scope == "article":
+        parti.append("(SELECT ifnull(updated_at, '') FROM articles WHERE id = :id)")
+        params["id"] = article_id
+    firme = (await db.execute(text("SELECT " + ", ".join(parti)), params)).one()
+    if scope == "article" and firme[-1] is None:
+        return None
+    grezzo = "|".join([_AVVIO, str(_generazione), scope, *map(str, firme)])
+    return '"' + hashlib.sha1(grezzo.encode()).hexdigest()[:20] + '"'
+
+
+def _matches(if_none_match: Optional[str], tag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidato in if_none_match.split(","):
+        candidato = candidato.strip()
+        if candidato == "*" or candidato.removeprefix("W/") == tag:
+            return True
+    return False
+
+
+def _get(key: str, tag: str) -> Optional[bytes]:
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] != tag:
+            return None
+        _cache.move_to_end(key)
+        return entry[1]
+
+
+def _put(key: str, tag: str, body: bytes) -> None:
+    global _cache_bytes
+    budget = _budget()
+    if len(body) > budget // 4:
+        return  # troppo grande: solo ETag/304, niente copia in memoria
+    with _lock:
+        vecchio = _cache.pop(key, None)
+        if vecchio is not None:
+            _cache_bytes -= len(vecchio[1])
+        _cache[key] = (tag, body)
+        _cache_bytes += len(body)
+        while _cache_bytes > budget and _cache:
+            _, (_, scartato) = _cache.popitem(last=False)
+            _cache_bytes -= len(scartato)
+
+
+async def cached_json(
+    request,
+    db,
+    scope: str,
+    build: Callable[[], Awaitable[Any]],
+    *,
+    article_id: Optional[int] = None,
+) -> Response:
+    """Risposta JSON di `build()` con ETag, 304 e cache del corpo serializzato.
+
+    Se l'articolo non esiste (`article_id` senza riga) chiama comunque
+    `build`, che risponde con il suo errore (404).
+    """
+    tag = await etag(db, scope, article_id=article_id)
+    if tag is None:
+        return FastJSONResponse(await build())
+    headers = {"ETag": tag, "Cache-Control": CACHE_CONTROL}
+    if _matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers=headers)
+
+    key = request.url.path + "?" + "&".join(sorted(f"{k}={v}" for k, v in request.query_params.multi_items()))
+    body = _get(key, tag)
+    if body is None:
+        body = dumps(await build())
+        _put(key, tag, body)
+    return Response(content=body, media_type="application/json", headers=headers)
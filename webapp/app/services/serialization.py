@@ -0,0 +1,33 @@
+"""Serializzazione JSON veloce delle risposte (orjson).
+
+Il JSONResponse di FastAPI passa ogni risposta da `jsonable_encoder` (una
+visita ricorsiva in Python di tutto il payload) e poi da `json.dumps`; con
+gli elenchi di articoli, che portano Markdown e Typst completi, era una parte
+misurabile della latenza (vedi `python -m bench.serializzazione`).
+
+`dumps` serializza direttamente con orjson: datetime, enum e UUID sono
+nativi (i `*_to_response` non chiamano più `.isoformat()` campo per campo,
+l'output è identico), solo i tipi che orjson non conosce (modelli pydantic,
+Path, set...) passano da `jsonable_encoder`. `FastJSONResponse` è la
+response class di default dell'app; le route che restituiscono grandi
+elenchi la costruiscono direttamente, così FastAPI salta anche
+`jsonable_encoder`.
+"""
+
+from typing import Any
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+
+def dumps(content: Any) -> bytes:
+    """JSON compatto UTF-8, come il JSONResponse di FastAPI ma in orjson."""
+    return orjson.dumps(content, default=jsonable_encoder, option=orjson.OPT_NON_STR_KEYS)
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse che serializza con `dumps`."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
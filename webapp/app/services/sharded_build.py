@@ -0,0 +1,207 @@
+"""Build "a shard" di un numero: front matter, articoli e pagine finali
+compilati come documenti Typst separati su un pool di processi.
+
+Una singola `typst.compile` del numero intero usa un solo core. Qui ogni
+articolo è un documento a sé (stesso preambolo e stessa show rule
+`geko-magazine`), così i core disponibili lavorano in parallelo:
+
+  1. prima passata, tutti gli shard insieme e senza offset: si misurano le
+     pagine di ogni shard e si leggono i titoli degli articoli dai segnalibri
+     PDF che Typst emette per gli heading di livello 1;
+  2. seconda passata, di nuovo in parallelo: ogni shard riceve il numero della
+     sua prima pagina (`counter(page).update`) e il front matter il sommario
+     precalcolato (`sommario(voci: ...)`, l'outline nativo non vedrebbe gli
+     articoli). Se il sommario cambia il numero di pagine del front matter
+     gli offset si ricalcolano e la passata si ripete. Se dopo `_MAX_PASSATE`
+     passate non converge, gli shard hanno offset sbagliati: la build ripiega
+     sulla compilazione monolitica (con un avviso) invece di unirli.
+
+Infine i PDF vengono concatenati con pypdf. Il costo totale di CPU è circa il
+doppio della build monolitica, ma il tempo reale scala col numero di core.
+"""
+
+import io
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+from pypdf import PdfReader, PdfWriter
+
+logger = logging.getLogger(__name__)
+
+# Numero massimo di ricompilazioni della seconda passata se il front matter
+# cambia lunghezza (in pratica converge alla prima o alla seconda).
+_MAX_PASSATE = 3
+
+
+def _compile_shard(source: str) -> bytes:
+    """Compila uno shard in memoria (eseguito nel processo worker)."""
+    from .builder import compile_source
+
+    return compile_source(source)
+
+
+def _max_workers() -> int:
+    """Worker del pool: GEKO_BUILD_WORKERS, altrimenti un processo per core."""
+    try:
+        n = int(os.environ.get("GEKO_BUILD_WORKERS", "0"))
+    except ValueError:
+        n = 0
+    return n if n > 0 else (os.cpu_count() or 1)
+
+
+def _numerazione(prima_pagina: Optional[int]) -> str:
+    """Imposta il numero della prima pagina dello shard.
+
+    Va emesso PRIMA della show rule `geko-magazine`: dopo, l'header della
+    prima pagina sarebbe già valutato col contatore a 1.
+    """
+    if prima_pagina is None:
+        return ''
+    return f'#counter(page).update({prima_pagina})'
+
+
+def _titoli(reader: PdfReader) -> list[tuple[str, int]]:
+    """Titoli di livello 1 (segnalibri top-level) con la pagina 0-based."""
+    out = []
+    for entry in reader.outline:
+        if isinstance(entry, list):  # figli: heading di livello inferiore
+            continue
+        out.append((str(entry.title), reader.get_destination_page_number(entry)))
+    return out
+
+
+def build_sharded(
+    builder,
+    *,
+    numero: str,
+    mese: str,
+    anno: str,
+    articles: list[str],
+    editoriale: Optional[str] = None,
+    editoriale_autore: Optional[str] = None,
+    copertina_path: Optional[str] = None,
+    evidenze: Optional[list[dict]] = None,
+    team_membri: Optional[list[dict]] = None,
+    link_iscrizione: Optional[str] = None,
+    link_lista_distribuzione: Optional[str] = None,
+    link_donazione: Optional[str] = None,
+    immagine_frequenze: Optional[str] = None,
+    immagine_donazione: Optional[str] = None,
+    persist: bool = False,
+) -> bytes:
+    """Compila il numero a shard in parallelo e ritorna i byte del PDF unito.
+
+    `builder` è il MagazineBuilder chiamante: fornisce i generatori Typst di
+    front matter, show rule e pagine finali, così il risultato resta identico
+    nei contenuti a quello di `MagazineBuilder._generate_document`.
+    Con `persist` i sorgenti degli shard finiscono anche in typst/generated/.
+    """
+    from .builder import _PREAMBLE, persist_source
+
+    def front(voci: list[dict]) -> str:
+        return builder._front_matter(
+            numero=numero, mese=mese, anno=anno,
+            editoriale=editoriale, editoriale_autore=editoriale_autore,
+            copertina_path=copertina_path, evidenze=evidenze,
+            voci_sommario=voci,
+        )
+
+    setup = builder._main_setup(numero, mese, anno)
+
+    def article(idx: int, prima_pagina: Optional[int]) -> str:
+        return '\n'.join([_PREAMBLE, _numerazione(prima_pagina), setup, articles[idx]])
+
+    def back(prima_pagina: Optional[int]) -> str:
+        finale = builder._back_matter(
+            team_membri, link_iscrizione, link_lista_distribuzione,
+            link_donazione, immagine_frequenze, immagine_donazione,
+            leading_pagebreak=False,
+        )
+        return '\n'.join([_PREAMBLE, _numerazione(prima_pagina), setup, finale])
+
+    def write(sources: list[str]) -> list[str]:
+        if persist:
+            for i, src in enumerate(sources):
+                persist_source(f"geko{numero}_shard{i:03d}.typ", src)
+        return sources
+
+    n = len(articles)
+    # Sommario segnaposto per la prima passata: stesse righe, pagine finte.
+    segnaposto = [{"titolo": "—", "pagina": "000"} for _ in range(n)]
+
+    # spawn: la build gira in un thread di uvicorn, fork lì non è sicuro.
+    ctx = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=_max_workers(), mp_context=ctx) as pool:
+        # ── Prima passata: misura pagine e titoli ──
+        sources = [front(segnaposto)] + [article(i, None) for i in range(n)] + [back(None)]
+        pdfs = list(pool.map(_compile_shard, write(sources)))
+
+        readers = [PdfReader(io.BytesIO(p)) for p in pdfs]
+        pagine_articoli = [len(r.pages) for r in readers[1:-1]]
+        titoli_articoli = [_titoli(r) for r in readers[1:-1]]
+        # Ogni pagina del front matter termina con pagebreak(): l'ultima
+        # pagina dello shard è vuota e si scarta.
+        pagine_front = len(readers[0].pages) - 1
+
+        # ── Seconda passata: offset + sommario precalcolato ──
+        for _ in range(_MAX_PASSATE):
+            prime = []
+            pagina = pagine_front + 1
+            for count in pagine_articoli:
+                prime.append(pagina)
+                pagina += count
+            prima_back = pagina
+
+            voci = [
+                {"titolo": titolo, "pagina": str(prime[i] + pag)}
+                for i, titoli in enumerate(titoli_articoli)
+                for titolo, pag in titoli
+            ]
+            sources = (
+                [front(voci)]
+                + [article(i, prime[i]) for i in range(n)]
+                + [back(prima_back)]
+            )
+            pdfs = list(pool.map(_compile_shard, write(sources)))
+            front_reader = PdfReader(io.BytesIO(pdfs[0]))
+            if len(front_reader.pages) - 1 == pagine_front:
+                break
+            pagine_front = len(front_reader.pages) - 1
+        else:
+            front_reader = None
+
+    if front_reader is None:
+        # Numerazione e sommario non stabili: meglio la build monolitica
+        # che un PDF con pagine e sommario sbagliati.
+        from .builder import compile_source
+
+        logger.warning("Build a shard del numero %s: il front matter non converge "
+                       "dopo %d passate, ripiego sulla build monolitica", numero, _MAX_PASSATE)
+        document = builder._generate_document(
+            numero=numero, mese=mese, anno=anno, articles=articles,
+            editoriale=editoriale, editoriale_autore=editoriale_autore,
+            copertina_path=copertina_path, evidenze=evidenze,
+            team_membri=team_membri, link_iscrizione=link_iscrizione,
+            link_lista_distribuzione=link_lista_distribuzione,
+            link_donazione=link_donazione, immagine_frequenze=immagine_frequenze,
+            immagine_donazione=immagine_donazione,
+        )
+        if persist:
+            persist_source(f"geko{numero}.typ", document)
+        return compile_source(document)
+
+    # ── Unione ──
+    writer = PdfWriter()
+    writer.append(front_reader, pages=list(range(pagine_front)))
+    for pdf in pdfs[1:]:
+        writer.append(PdfReader(io.BytesIO(pdf)))
+    writer.add_metadata({
+        "/Title": f"Geko Radio Magazine - Nr. {numero}",
+        "/Author": "Mountain QRP Club",
+    })
+    buf = io.BytesIO()
+    writer.write(buf)
+    return buf.getvalue()
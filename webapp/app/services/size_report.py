@@ -0,0 +1,249 @@
+"""Attribuzione del peso del PDF: quali immagini e quali articoli costano.
+
+Dopo la build, ogni immagine incorporata nel master di stampa viene
+ricondotta al file sorgente (media library `data/uploads/articoli/<id>/`,
+copertina, foto del team, immagini della pagina finale, logo) e quindi
+all'articolo che la usa:
+
+  1. per impronta: Typst incorpora i JPEG così come sono, quindi lo sha256
+     dello stream coincide con quello del file;
+  2. per dimensioni in pixel (PNG, GIF, WEBP vengono ridecodificati),
+     preferendo tra più candidati il file dell'articolo che occupa la pagina
+     in cui l'immagine è disegnata (dai segnalibri di livello 1).
+
+I profili ricompressi (screen, mobile) hanno oggetti immagine diversi: si
+allineano al master per posizione del disegno (pagina, ordine nella pagina),
+che la ricompressione non cambia. Per ogni immagine e per ogni articolo il
+report dà byte, dimensioni e dpi effettivi prima (print) e dopo (screen,
+mobile) la compressione.
+"""
+
+import hashlib
+import logging
+import re
+from pathlib import Path
+from typing import Optional
+
+from pypdf import PdfReader
+
+from .pdf_compress import PROFILES, profile_path
+from .pdf_images import scan_images
+
+logger = logging.getLogger(__name__)
+
+# Riferimenti a immagini nel markdown, anche dentro la prosa.
+_IMG_RE = re.compile(r'!\[[^\]]*\]\(\s*<?([^)\s>]+)>?[^)]*\)')
+# Soglia dpi per lo scan: qui interessa solo la misura, non le candidate.
+_DPI_SCAN = 150
+
+
+def collect_sources(articles: list[dict], options: dict, root: Path) -> list[dict]:
+    """Elenca i file immagine che possono finire nel PDF del numero.
+
+    `articles`: dict con id, titolo, contenuto_md e image_base, nell'ordine
+    del numero; `options`: le opzioni di build di `article_ops.issue_options`;
+    `root` è la root Typst. Ritorna dict con `file` (relativo alla root Typst), `ruolo`,
+    `articolo_id` e `titolo`.
+    """
+    from .md_render import _remap_path
+
+    sources: list[dict] = []
+    visti: set = set()
+
+    def add(path: Optional[str], ruolo: str, articolo: Optional[dict] = None) -> None:
+        if not path:
+            return
+        file = path.lstrip("/")
+        chiave = (file, articolo["id"] if articolo else None)
+        if chiave in visti:
+            return
+        visti.add(chiave)
+        sources.append({
+            "file": file,
+            "ruolo": ruolo,
+            "articolo_id": articolo["id"] if articolo else None,
+            "titolo": articolo["titolo"] if articolo else None,
+        })
+
+    add(options.get("copertina_path"), "copertina")
+    add("/typst/assets/logo_rivista.jpg", "pagina-logo")
+    for art in articles:
+        for path in _IMG_RE.findall(art.get("contenuto_md") or ""):
+            add(_remap_path(path, art.get("image_base")), "articolo", art)
+        # Anche i file della media library non (più) referenziati: un
+        # riferimento scritto in modo diverso non deve lasciarli fuori.
+        base = (art.get("image_base") or "").lstrip("/")
+        if base and (root / base).is_dir():
+            for f in sorted((root / base).iterdir()):
+                if f.is_file():
+                    add(f"{base}/{f.name}", "articolo", art)
+    for membro in options.get("team_membri") or []:
+        add(membro.get("foto"), "pagina-team")
+    add(options.get("immagine_frequenze"), "pagina-finale")
+    add(options.get("immagine_donazione"), "pagina-finale")
+    return sources
+
+
+def _describe(root: Path, source: dict) -> Optional[dict]:
+    """Byte, sha256 e dimensioni in pixel del file sorgente (None se manca)."""
+    path = root / source["file"]
+    if not path.is_file():
+        return None
+    data = path.read_bytes()
+    info = {**source, "byte_sorgente": len(data),
+            "sha256": hashlib.sha256(data).hexdigest(),
+            "larghezza_sorgente": None, "altezza_sorgente": None}
+    try:
+        from PIL import Image
+
+        with Image.open(path) as img:
+            info["larghezza_sorgente"], info["altezza_sorgente"] = img.size
+    except Exception:  # noqa: BLE001 — SVG e formati non raster: niente pixel
+        pass
+    return info
+
+
+def _article_pages(reader: PdfReader, articles: list[dict]) -> dict[int, int]:
+    """Pagina (1-based) → id dell'articolo che la occupa.
+
+    I titoli degli articoli sono i segnalibri di livello 1: si abbinano in
+    ordine, così due articoli con lo stesso titolo non si confondono.
+    """
+    segnalibri = []
+    for entry in reader.outline:
+        if isinstance(entry, list):
+            continue
+        segnalibri.append((str(entry.title).strip(), reader.get_destination_page_number(entry) + 1))
+    inizi = []
+    cursore = 0
+    for art in articles:
+        for i in range(cursore, len(segnalibri)):
+            if segnalibri[i][0] == (art["titolo"] or "").strip():
+                inizi.append((segnalibri[i][1], art["id"]))
+                cursore = i + 1
+                break
+    pagine: dict[int, int] = {}
+    for k, (inizio, art_id) in enumerate(inizi):
+        fine = inizi[k + 1][0] if k + 1 < len(inizi) else len(reader.pages) + 1
+        for p in range(inizio, fine):
+            pagine[p] = art_id
+    return pagine
+
+
+def _match(img: dict, sources: list[dict], owner: Optional[int]) -> Optional[dict]:
+    """Sorgente dell'immagine del PDF: per impronta, poi per dimensioni."""
+    candidati = [s for s in sources if s["sha256"] == img.get("sha256")]
+    if not candidati:
+        dims = {(img["larghezza"], img["altezza"]), (img["altezza"], img["larghezza"])}
+        candidati = [s for s in sources
+                     if (s["larghezza_sorgente"], s["altezza_sorgente"]) in dims]
+    if not candidati:
+        return None
+    for s in candidati:
+        if owner is not None and s["articolo_id"] == owner:
+            return s
+    return candidati[0]
+
+
+def _misura(img: dict) -> dict:
+    return {
+        "byte": img["byte"] + img["byte_smask"],
+        "larghezza": img["larghezza"],
+        "altezza": img["altezza"],
+        "dpi": img["dpi"],
+        "filtro": img["filtro"],
+    }
+
+
+def size_report(numero: str, articles: list[dict], options: dict,
+                output_dir: Path, root: Path) -> dict:
+    """Report di attribuzione del peso per il numero già compilato.
+
+    `articles` e `options` come in `collect_sources`; `root` è la root Typst
+    (i percorsi dei sorgenti sono relativi a lei). Solleva FileNotFoundError
+    se il numero non è stato compilato.
+    """
+    file_profili = {p: profile_path(output_dir, numero, p) for p in PROFILES}
+    esistenti = [p for p in PROFILES if file_profili[p].exists()]
+    if not esistenti:
+        raise FileNotFoundError(f"PDF del numero {numero} non trovato: compilare prima il numero")
+    # Il master è il primo profilo disponibile (print, se la build lo ha salvato).
+    master = esistenti[0]
+
+    sources = [d for d in (_describe(root, s) for s in collect_sources(articles, options, root)) if d]
+    reader = PdfReader(file_profili[master])
+    pagine_articoli = _article_pages(reader, articles)
+
+    scan = {p: scan_images(file_profili[p], _DPI_SCAN, impronte=(p == master))
+            for p in esistenti}
+    per_posizione = {
+        p: {tuple(d): img for img in scan[p]["immagini"] for d in img["disegni"]}
+        for p in esistenti if p != master
+    }
+
+    immagini = []
+    non_attribuite = []
+    for img in scan[master]["immagini"]:
+        pagine = sorted({d[0] for d in img["disegni"]})
+        owner = pagine_articoli.get(pagine[0]) if pagine else None
+        profili = {master: _misura(img)}
+        for p, posizioni in per_posizione.items():
+            altra = posizioni.get(tuple(img["disegni"][0])) if img["disegni"] else None
+            if altra is not None:
+                profili[p] = _misura(altra)
+        source = _match(img, sources, owner)
+        if source is None:
+            non_attribuite.append({
+                "nome": img["nome"], "pagine": pagine, "articolo_id": owner,
+                "larghezza": img["larghezza"], "altezza": img["altezza"],
+                "profili": profili,
+            })
+            continue
+        immagini.append({
+            "file": source["file"],
+            "ruolo": source["ruolo"],
+            "articolo_id": source["articolo_id"],
+            "titolo": source["titolo"],
+            "byte_sorgente": source["byte_sorgente"],
+            "larghezza_sorgente": source["larghezza_sorgente"],
+            "altezza_sorgente": source["altezza_sorgente"],
+            "pagine": pagine,
+            "profili": profili,
+        })
+
+    titoli = {a["id"]: a["titolo"] for a in articles}
+    voci: dict = {}
+    for img in immagini:
+        chiave = img["articolo_id"] if img["articolo_id"] is not None else img["ruolo"]
+        voce = voci.setdefault(chiave, {
+            "articolo_id": img["articolo_id"],
+            "titolo": titoli.get(img["articolo_id"], img["ruolo"]),
+            "immagini": 0,
+            "byte_sorgente": 0,
+            "byte": {p: 0 for p in esistenti},
+            "dpi_max": 0.0,
+        })
+        voce["immagini"] += 1
+        voce["byte_sorgente"] += img["byte_sorgente"]
+        for p, misura in img["profili"].items():
+            voce["byte"][p] += misura["byte"]
+        voce["dpi_max"] = max(voce["dpi_max"], img["profili"][master]["dpi"])
+
+    def peso(v: dict) -> int:
+        return v["profili"][master]["byte"]
+
+    return {
+        "numero": numero,
+        "master": master,
+        "profili": {
+            p: {
+                "file": file_profili[p].name,
+                "byte": file_profili[p].stat().st_size,
+                "byte_immagini": sum(i["byte"] + i["byte_smask"] for i in scan[p]["immagini"]),
+            }
+            for p in esistenti
+        },
+        "articoli": sorted(voci.values(), key=lambda v: v["byte"][master], reverse=True),
+        "immagini": sorted(immagini, key=peso, reverse=True),
+        "non_attribuite": sorted(non_attribuite, key=peso, reverse=True),
+    }
@@ -0,0 +1,148 @@
+"""Indice in memoria dei file statici della build Svelte (catch-all SPA).
+
+`serve_spa` gestisce ogni caricamento di pagina e ogni deep link: prima
+faceva `exists()` + `is_file()` e costruiva un `FileResponse` (che rifà lo
+stat e rilegge il file) a ogni richiesta; `favicon` provava fino a quattro
+percorsi. Qui la directory è indicizzata una volta: percorso relativo →
+`Voce` con stat, ETag, `Last-Modified` e, per i file piccoli
+(`index.html`, favicon, manifest...), il contenuto.
+
+La build può cambiare sotto l'app (`npm run build` in sviluppo): al più una
+volta al secondo si confrontano l'mtime della directory e di `index.html`
+con quelli dell'ultima scansione, e se sono cambiati l'indice si rifà.
+Le varianti `.br`/`.gz` (vedi `compression.precompress`) non sono indicizzate.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from dataclasses import dataclass
+from email.utils import formatdate, parsedate_to_datetime
+from mimetypes import guess_type
+from pathlib import Path
+from typing import Iterable, Optional
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+
+logger = logging.getLogger(__name__)
+
+MAX_IN_MEMORIA = 64 * 1024  # file più piccoli di così: contenuto in memoria
+INTERVALLO_CONTROLLO = 1.0  # secondi tra due controlli di modifica della build
+CACHE_CONTROL = "no-cache"  # sempre rivalidati: un deploy si vede subito
+
+
+@dataclass(frozen=True)
+class Voce:
+    path: Path
+    stat: os.stat_result
+    media_type: str
+    etag: str
+    last_modified: str
+    contenuto: Optional[bytes] = None
+
+
+def _voce(path: Path, st: os.stat_result) -> Voce:
+    contenuto = path.read_bytes() if st.st_size <= MAX_IN_MEMORIA else None
+    return Voce(
+        path=path,
+        stat=st,
+        media_type=guess_type(path.name)[0] or "text/plain",
+        etag=f'"{st.st_mtime_ns:x}-{st.st_size:x}"',
+        last_modified=formatdate(st.st_mtime, usegmt=True),
+        contenuto=contenuto,
+    )
+
+
+def _non_modificato(voce: Voce, headers: Headers) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match:
+        return any(t.strip() in ("*", voce.etag) or t.strip().removeprefix("W/") == voce.etag
+                   for t in if_none_match.split(","))
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            return int(voce.stat.st_mtime) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+class SpaIndex:
+    """Indice dei file di `directory` (o solo dei `nomi` di primo livello)."""
+
+    def __init__(self, directory: Path, *, nomi: Optional[Iterable[str]] = None):
+        self.directory = Path(directory)
+        self.nomi = tuple(nomi) if nomi is not None else None
+        self._voci: dict[str, Voce] = {}
+        self._impronta = None
+        self._controllo = 0.0
+
+    def _firma(self):
+        """mtime della directory e di index.html: cambiano a ogni nuova build."""
+        firma = []
+        for path in (self.directory, self.directory / "index.html"):
+            try:
+                firma.append(path.stat().st_mtime_ns)
+            except OSError:
+                firma.append(None)
+        return tuple(firma)
+
+    def scan(self) -> int:
+        """Rifà l'indice da disco; ritorna il numero di file indicizzati."""
+        impronta = self._firma()
+        voci = {}
+        if self.nomi is not None:
+            candidati = (self.directory / nome for nome in self.nomi)
+        else:
+            candidati = self.directory.rglob("*") if self.directory.is_dir() else ()
+        for path in candidati:
+            if path.suffix in (".br", ".gz", ".tmp"):
+                continue
+            try:
+                st = path.stat()
+                if not path.is_file():
+                    continue
+                voci[path.relative_to(self.directory).as_posix()] = _voce(path, st)
+            except OSError:
+                continue
+        self._voci, self._impronta = voci, impronta
+        self._controllo = time.monotonic()
+        logger.debug("Indice SPA %s: %d file", self.directory, len(voci))
+        return len(voci)
+
+    async def _aggiorna(self) -> None:
+        if self._impronta is not None and time.monotonic() - self._controllo < INTERVALLO_CONTROLLO:
+            return
+        self._controllo = time.monotonic()
+        if self._impronta is None or self._firma() != self._impronta:
+            await asyncio.to_thread(self.scan)  # idempotente: due scansioni concorrenti non fanno danni
+
+    async def get(self, relativo: str) -> Optional[Voce]:
+        """La voce di `relativo` (percorso URL senza `/` iniziale), se esiste."""
+        await self._aggiorna()
+        return self._voci.get(relativo.strip("/"))
+
+    async def first(self, nomi: Iterable[str]) -> Optional[Voce]:
+        for nome in nomi:
+            voce = await self.get(nome)
+            if voce is not None:
+                return voce
+        return None
+
+
+def risposta(voce: Voce, request_headers: Headers) -> Response:
+    """Risposta per `voce`: 304 se i validatori coincidono, altrimenti il file."""
+    headers = {
+        "ETag": voce.etag,
+        "Last-Modified": voce.last_modified,
+        "Cache-Control": CACHE_CONTROL,
+    }
+    if _non_modificato(voce, request_headers):
+        return Response(status_code=304, headers=headers)
+    if voce.contenuto is not None:
+        return Response(voce.contenuto, media_type=voce.media_type, headers=headers)
+    response = FileResponse(voce.path, stat_result=voce.stat, media_type=voce.media_type)
+    response.headers.update(headers)  # il FileResponse calcola un suo ETag dallo stat
+    return response
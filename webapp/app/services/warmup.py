@@ -0,0 +1,72 @@
+"""Warm-up dei compilatori all'avvio dell'app.
+
+La prima build dopo un deploy pagava tutti i costi a freddo: scoperta dei
+font, caricamento del plugin WASM di cmarker, parsing di template.typ. Con
+GEKO_WARMUP attivo (default) ogni worker del compile_pool compila un documento
+canarino appena avviato (`builder.warm_up`) e il lifespan li avvia tutti in
+background. Finché il warm-up è in corso `/health` risponde 503, così Traefik
+instrada il traffico solo verso istanze già calde. Un warm-up fallito viene
+riportato ma non tiene l'istanza fuori servizio.
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Stati: "disattivo" (warm-up non richiesto), "in_corso", "pronto", "fallito".
+_state: dict = {"stato": "disattivo", "secondi": None, "canarino": None, "errore": None}
+
+
+def warmup_enabled() -> bool:
+    """GEKO_WARMUP: attivo salvo valori espliciti di disattivazione."""
+    return os.environ.get("GEKO_WARMUP", "1").strip().lower() not in {"0", "false", "no", "off"}
+
+
+def worker_initializer() -> Optional[Callable[[], float]]:
+    """Initializer per i worker del compile_pool (None se warm-up disattivo)."""
+    if not warmup_enabled():
+        return None
+    from .builder import warm_up
+
+    return warm_up
+
+
+def status() -> dict:
+    """Copia dello stato del warm-up, per `/health`."""
+    return dict(_state)
+
+
+def is_ready() -> bool:
+    """False solo mentre il warm-up è in corso."""
+    return _state["stato"] != "in_corso"
+
+
+def begin() -> None:
+    """Segna il warm-up come in corso (prima di avviare il task)."""
+    _state.update(stato="in_corso", secondi=None, canarino=None, errore=None)
+
+
+async def warm_up_pool(pool) -> dict:
+    """Avvia tutti i worker di `pool` e attende che abbiano compilato il
+    canarino. Ritorna lo stato finale."""
+    from .builder import warm_up
+
+    begin()
+    start = time.perf_counter()
+    try:
+        # Lavori concorrenti quanti i worker: ognuno occupa uno slot fino alla
+        # fine, quindi finisce su un worker diverso. Sui worker appena avviati
+        # warm_up ritorna la durata già misurata dall'initializer.
+        durate = await asyncio.gather(*(pool.run(warm_up) for _ in range(pool.workers)))
+    except Exception as e:  # noqa: BLE001 — riportato in /health, l'app resta su
+        logger.warning("Warm-up dei compilatori fallito: %s", e)
+        _state.update(stato="fallito", errore=str(e),
+                      secondi=round(time.perf_counter() - start, 3))
+    else:
+        _state.update(stato="pronto", secondi=round(time.perf_counter() - start, 3),
+                      canarino=round(max(durate), 3))
+    return status()
@@ -0,0 +1,5 @@
+"""Strumenti per misurare la webapp su un archivio di dimensioni reali.
+
+Non fanno parte dell'immagine Docker (il Dockerfile copia solo `app/`):
+si lanciano dalla directory `webapp/` con `python -m bench.<modulo>`.
+"""
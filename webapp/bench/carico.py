@@ -0,0 +1,579 @@
+"""Test di carico della webapp (API JSON) e del server MCP, con report SLO.
+
+Editori virtuali (API JSON) e agenti virtuali (tool MCP) eseguono in
+parallelo, per `--durata` secondi, un mix pesato di operazioni realistiche:
+elenchi e ricerca, lettura e salvataggio di articoli, upload di immagini,
+anteprima Typst e, a richiesta, build del PDF. Per ogni operazione il report
+dà richieste, errori, throughput, latenze p50/p95/p99/max e il ritardo
+dell'event loop osservato mentre la richiesta era in volo, confrontati con
+gli SLO (`SLO_DEFAULT`, modificabili con `--slo`).
+
+Modalità:
+
+  - `asgi` (default): app e server MCP nello stesso processo, via
+    `httpx.ASGITransport` e il trasporto in memoria di FastMCP, sul
+    database e sulla media library di `--dataset` (vedi `bench.dataset`);
+  - `uvicorn`: come sopra, ma l'app è servita da uvicorn su una porta
+    locale e il client passa dai socket veri. Il ritardo dell'event loop
+    comprende anche il lavoro del client;
+  - `--url`: un server già avviato (e `--mcp-url` per gli agenti); il
+    ritardo dell'event loop del server non è misurabile da qui.
+
+Il test scrive sul dataset (salvataggi, immagini caricate): va lanciato su
+una copia generata apposta. La build (`--pesi build=1`) trova le immagini
+solo se il dataset è `data/`, la root da cui Typst le legge.
+
+Uso (da `webapp/`):
+
+    python -m bench.dataset --out /tmp/geko-scala --numeri 500 --articoli 20000
+    python -m bench.carico --dataset /tmp/geko-scala --editori 8 --agenti 2 --durata 60
+
+Esce con codice 1 se un SLO non è rispettato.
+"""
+
+import argparse
+import asyncio
+import base64
+import io
+import json
+import random
+import sys
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+# SLO per operazione: (p95, p99) in millisecondi.
+SLO_DEFAULT = {
+    "numeri": (200, 500),
+    "sommario": (200, 500),
+    "articoli_numero": (300, 800),
+    "ricerca": (500, 1000),
+    "articoli": (2000, 5000),
+    "articolo": (150, 400),
+    "salva": (300, 800),
+    "upload": (500, 1500),
+    "config": (100, 300),
+    "build": (60000, 120000),
+    "mcp_lista": (300, 800),
+    "mcp_leggi": (200, 500),
+    "mcp_anteprima": (300, 800),
+    "mcp_modifica": (400, 1000),
+    "mcp_immagini": (150, 400),
+    "mcp_carica": (600, 1500),
+}
+
+_INTERVALLO_LAG = 0.01   # s tra due campioni del ritardo dell'event loop
+_CAMPIONE_NUMERI = 50    # numeri di cui leggere il sommario in preparazione
+
+
+class _Errore(Exception):
+    """Risposta HTTP >= 400 o errore di un tool MCP."""
+
+
+@dataclass
+class _Contesto:
+    """Stato condiviso dagli utenti virtuali."""
+
+    client: httpx.AsyncClient
+    numeri: list[int]
+    articoli: list[int]
+    bozza: Optional[int]
+    immagine: bytes
+    testi: dict[int, str] = field(default_factory=dict)
+    revisione: int = 0
+
+    async def richiesta(self, metodo: str, url: str, **kw) -> httpx.Response:
+        resp = await self.client.request(metodo, url, **kw)
+        if resp.status_code >= 400:
+            raise _Errore(f"{metodo} {url}: HTTP {resp.status_code}")
+        return resp
+
+    async def testo(self, article_id: int) -> str:
+        """Markdown corrente dell'articolo (letto una volta, fuori misura)."""
+        if article_id not in self.testi:
+            resp = await self.richiesta("GET", f"/api/articles/{article_id}")
+            self.testi[article_id] = resp.json()["contenuto_md"]
+        return self.testi[article_id]
+
+    def rivedi(self, md: str) -> str:
+        """Una modifica verosimile: l'ultimo paragrafo di revisione cambia."""
+        self.revisione += 1
+        return f"{md.split(chr(10) * 2 + 'Revisione ')[0]}\n\nRevisione {self.revisione}.\n"
+
+
+@dataclass(frozen=True)
+class Operazione:
+    chiave: str
+    descrizione: str
+    peso: float
+    esegui: Callable[..., Awaitable[None]]
+    mcp: bool = False
+
+
+# --- Operazioni degli editori (API JSON) ---
+
+async def _numeri(ctx, rng, mcp):
+    await ctx.richiesta("GET", "/api/magazines")
+
+
+async def _sommario(ctx, rng, mcp):
+    await ctx.richiesta("GET", f"/api/magazines/{rng.choice(ctx.numeri)}/articles")
+
+
+async def _articoli_numero(ctx, rng, mcp):
+    await ctx.richiesta("GET", "/api/articles", params={"magazine_id": rng.choice(ctx.numeri)})
+
+
+_TERMINI = ("QMX", "antenna", "contest", "SOTA", "rifugio", "Si5351", "FT8", "loop")
+
+
+async def _ricerca(ctx, rng, mcp):
+    await ctx.richiesta("GET", "/api/articles", params={"search": rng.choice(_TERMINI)})
+
+
+async def _articoli(ctx, rng, mcp):
+    await ctx.richiesta("GET", "/api/articles")
+
+
+async def _articolo(ctx, rng, mcp):
+    await ctx.richiesta("GET", f"/api/articles/{rng.choice(ctx.articoli)}")
+
+
+async def _salva(ctx, rng, mcp):
+    article_id = rng.choice(ctx.articoli)
+    md = ctx.rivedi(await ctx.testo(article_id))
+    await ctx.richiesta("PUT", f"/api/articles/{article_id}", json={"contenuto_md": md})
+    ctx.testi[article_id] = md
+
+
+async def _upload(ctx, rng, mcp):
+    await ctx.richiesta("POST", "/api/images",
+                        files={"file": ("carico.jpg", ctx.immagine, "image/jpeg")},
+                        data={"article_id": str(rng.choice(ctx.articoli))})
+
+
+async def _config(ctx, rng, mcp):
+    await ctx.richiesta("GET", "/api/config")
+
+
+async def _build(ctx, rng, mcp):
+    resp = await ctx.richiesta("POST", f"/api/magazines/{ctx.bozza}/build")
+    if resp.json().get("status") == "error":
+        raise _Errore(f"build: {resp.json().get('error')}")
+
+
+# --- Operazioni degli agenti (tool MCP) ---
+
+async def _tool(mcp, nome: str, argomenti: dict):
+    result = await mcp.call_tool(nome, argomenti, raise_on_error=False)
+    if result.is_error:
+        raise _Errore(f"{nome}: {result.content[0].text if result.content else 'errore'}")
+    return result
+
+
+async def _mcp_lista(ctx, rng, mcp):
+    await _tool(mcp, "lista_articoli", {"numero_id": rng.choice(ctx.numeri)})
+
+
+async def _mcp_leggi(ctx, rng, mcp):
+    await _tool(mcp, "leggi_articolo", {"id": rng.choice(ctx.articoli)})
+
+
+async def _mcp_anteprima(ctx, rng, mcp):
+    article_id = rng.choice(ctx.articoli)
+    await _tool(mcp, "anteprima_typst", {"contenuto_md": await ctx.testo(article_id),
+                                          "articolo_id": article_id})
+
+
+async def _mcp_modifica(ctx, rng, mcp):
+    article_id = rng.choice(ctx.articoli)
+    md = ctx.rivedi(await ctx.testo(article_id))
+    await _tool(mcp, "modifica_articolo", {"id": article_id, "contenuto_md": md})
+    ctx.testi[article_id] = md
+
+
+async def _mcp_immagini(ctx, rng, mcp):
+    await _tool(mcp, "lista_immagini", {"articolo_id": rng.choice(ctx.articoli)})
+
+
+async def _mcp_carica(ctx, rng, mcp):
+    await _tool(mcp, "carica_immagine", {
+        "articolo_id": rng.choice(ctx.articoli), "nome_file": "carico.jpg",
+        "contenuto_base64": base64.b64encode(ctx.immagine).decode(),
+    })
+
+
+OPERAZIONI = (
+    Operazione("numeri", "GET /api/magazines", 10, _numeri),
+    Operazione("sommario", "GET /api/magazines/{id}/articles", 8, _sommario),
+    Operazione("articoli_numero", "GET /api/articles?magazine_id=", 6, _articoli_numero),
+    Operazione("ricerca", "GET /api/articles?search=", 5, _ricerca),
+    Operazione("articoli", "GET /api/articles", 1, _articoli),
+    Operazione("articolo", "GET /api/articles/{id}", 12, _articolo),
+    Operazione("salva", "PUT /api/articles/{id}", 5, _salva),
+    Operazione("upload", "POST /api/images", 2, _upload),
+    Operazione("config", "GET /api/config", 3, _config),
+    Operazione("build", "POST /api/magazines/{id}/build", 0, _build),
+    Operazione("mcp_lista", "mcp lista_articoli", 4, _mcp_lista, mcp=True),
+    Operazione("mcp_leggi", "mcp leggi_articolo", 6, _mcp_leggi, mcp=True),
+    Operazione("mcp_anteprima", "mcp anteprima_typst", 4, _mcp_anteprima, mcp=True),
+    Operazione("mcp_modifica", "mcp modifica_articolo", 3, _mcp_modifica, mcp=True),
+    Operazione("mcp_immagini", "mcp lista_immagini", 2, _mcp_immagini, mcp=True),
+    Operazione("mcp_carica", "mcp carica_immagine", 1, _mcp_carica, mcp=True),
+)
+
+
+# --- Misura ---
+
+def percentile(valori: list[float], q: float) -> float:
+    """Percentile `q` (0-100) con il metodo nearest-rank; 0.0 se vuoto."""
+    if not valori:
+        return 0.0
+    ordinati = sorted(valori)
+    rank = max(1, -(-len(ordinati) * q // 100))  # ceil
+    return ordinati[int(rank) - 1]
+
+
+class _MonitorLag:
+    """Campiona il ritardo dell'event loop e lo attribuisce alle richieste in volo."""
+
+    def __init__(self):
+        self.campioni: list[float] = []
+        self._in_volo: dict[int, float] = {}
+        self._prossimo = 0
+
+    def inizia(self) -> int:
+        self._prossimo += 1
+        self._in_volo[self._prossimo] = 0.0
+        return self._prossimo
+
+    def finisci(self, token: int) -> float:
+        return self._in_volo.pop(token, 0.0)
+
+    async def run(self) -> None:
+        while True:
+            atteso = time.perf_counter() + _INTERVALLO_LAG
+            await asyncio.sleep(_INTERVALLO_LAG)
+            lag = max(time.perf_counter() - atteso, 0.0)
+            self.campioni.append(lag)
+            for token, massimo in self._in_volo.items():
+                if lag > massimo:
+                    self._in_volo[token] = lag
+
+
+@dataclass
+class _Misure:
+    latenze: list[float] = field(default_factory=list)
+    lag: list[float] = field(default_factory=list)
+    errori: int = 0
+    ultimo_errore: str = ""
+
+
+async def _utente(ctx, operazioni, pesi, misure, monitor, *, rng, fine, pausa, mcp=None):
+    while time.perf_counter() < fine:
+        op = rng.choices(operazioni, weights=pesi)[0]
+        token = monitor.inizia()
+        inizio = time.perf_counter()
+        try:
+            await op.esegui(ctx, rng, mcp)
+        except Exception as e:  # noqa: BLE001 — contato come errore dell'operazione
+            misure[op.chiave].errori += 1
+            misure[op.chiave].ultimo_errore = str(e)[:200]
+        else:
+            misure[op.chiave].latenze.append(time.perf_counter() - inizio)
+        misure[op.chiave].lag.append(monitor.finisci(token))
+        if pausa:
+            await asyncio.sleep(rng.expovariate(1 / pausa))
+
+
+async def esegui_carico(
+    ctx: _Contesto,
+    *,
+    editori: int,
+    agenti: int,
+    durata: float,
+    mcp_client: Optional[Callable] = None,
+    pesi: Optional[dict] = None,
+    pausa: float = 0.0,
+    seed: int = 0,
+) -> tuple[dict, list[float], float]:
+    """Esegue il carico. Ritorna ({chiave: _Misure}, campioni di lag, durata reale).
+
+    mcp_client: factory di un `fastmcp.Client` (uno per agente); senza, niente agenti.
+    """
+    pesi = {**{op.chiave: op.peso for op in OPERAZIONI}, **(pesi or {})}
+    misure = {op.chiave: _Misure() for op in OPERAZIONI}
+    monitor = _MonitorLag()
+    lag_task = asyncio.create_task(monitor.run())
+    inizio = time.perf_counter()
+    fine = inizio + durata
+
+    def _mix(mcp: bool):
+        ops = [op for op in OPERAZIONI if op.mcp == mcp and pesi[op.chiave] > 0]
+        return ops, [pesi[op.chiave] for op in ops]
+
+    async def _agente(i: int):
+        async with mcp_client() as client:
+            await _utente(ctx, *_mix(True), misure, monitor, rng=random.Random(seed + 1000 + i),
+                          fine=fine, pausa=pausa, mcp=client)
+
+    utenti = []
+    if _mix(False)[0]:
+        utenti += [_utente(ctx, *_mix(False), misure, monitor, rng=random.Random(seed + i),
+                           fine=fine, pausa=pausa) for i in range(editori)]
+    if mcp_client is not None and _mix(True)[0]:
+        utenti += [_agente(i) for i in range(agenti)]
+    try:
+        await asyncio.gather(*utenti)
+    finally:
+        lag_task.cancel()
+    return misure, monitor.campioni, time.perf_counter() - inizio
+
+
+def report(misure: dict, campioni_lag: list[float], durata: float,
+           slo: Optional[dict] = None, *, con_lag: bool = True) -> dict:
+    """Report JSON: per operazione conteggi, latenze (ms) e verifica degli SLO."""
+    slo = {**SLO_DEFAULT, **(slo or {})}
+    ms = 1000.0
+    operazioni = {}
+    for op in OPERAZIONI:
+        m = misure.get(op.chiave)
+        if m is None or not (m.latenze or m.errori):
+            continue
+        p95, p99 = percentile(m.latenze, 95) * ms, percentile(m.latenze, 99) * ms
+        obiettivo = slo.get(op.chiave)
+        operazioni[op.chiave] = {
+            "descrizione": op.descrizione,
+            "richieste": len(m.latenze) + m.errori,
+            "errori": m.errori,
+            "ultimo_errore": m.ultimo_errore,
+            "rps": round((len(m.latenze) + m.errori) / durata, 2),
+            "p50_ms": round(percentile(m.latenze, 50) * ms, 1),
+            "p95_ms": round(p95, 1),
+            "p99_ms": round(p99, 1),
+            "max_ms": round(max(m.latenze, default=0.0) * ms, 1),
+            "lag_p95_ms": round(percentile(m.lag, 95) * ms, 1) if con_lag else None,
+            "slo_ms": list(obiettivo) if obiettivo else None,
+            "ok": not m.errori and (obiettivo is None
+                                    or (p95 <= obiettivo[0] and p99 <= obiettivo[1])),
+        }
+    totale = sum(o["richieste"] for o in operazioni.values())
+    return {
+        "durata_s": round(durata, 2),
+        "richieste": totale,
+        "rps": round(totale / durata, 2) if durata else 0.0,
+        "lag_ms": {
+            "p50": round(percentile(campioni_lag, 50) * ms, 1),
+            "p99": round(percentile(campioni_lag, 99) * ms, 1),
+            "max": round(max(campioni_lag, default=0.0) * ms, 1),
+        } if con_lag else None,
+        "operazioni": operazioni,
+        "ok": all(o["ok"] for o in operazioni.values()),
+    }
+
+
+def formatta(rep: dict) -> str:
+    """Tabella leggibile del report."""
+    righe = [f"{'operazione':<36}{'n':>7}{'err':>5}{'rps':>8}{'p50':>9}{'p95':>9}"
+             f"{'p99':>9}{'lag95':>8}  SLO p95/p99"]
+    for o in rep["operazioni"].values():
+        lag = "-" if o["lag_p95_ms"] is None else f"{o['lag_p95_ms']:.0f}"
+        slo = "-" if not o["slo_ms"] else f"{o['slo_ms'][0]}/{o['slo_ms'][1]}"
+        righe.append(
+            f"{o['descrizione']:<36}{o['richieste']:>7}{o['errori']:>5}{o['rps']:>8.1f}"
+            f"{o['p50_ms']:>9.1f}{o['p95_ms']:>9.1f}{o['p99_ms']:>9.1f}{lag:>8}"
+            f"  {slo:<12}{'ok' if o['ok'] else 'KO'}"
+        )
+        if o["errori"]:
+            righe.append(f"    ultimo errore: {o['ultimo_errore']}")
+    righe.append(f"{rep['richieste']} richieste in {rep['durata_s']}s ({rep['rps']} rps)")
+    if rep["lag_ms"]:
+        righe.append("ritardo event loop: p50 {p50} ms, p99 {p99} ms, max {max} ms"
+                     .format(**rep["lag_ms"]))
+    return "\n".join(righe)
+
+
+# --- Preparazione ---
+
+@asynccontextmanager
+async def collega_dataset(dataset: Path):
+    """Fa usare all'app e ai tool MCP il database e la media library di `dataset`."""
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.database import get_db, run_migrations
+    from app.main import app
+    from app.mcp import server as server_mod
+    from app.models import Base
+    from app.routes.api import images
+    from app.services import article_ops, media_index
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{dataset / 'geko.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(run_migrations)
+    session = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+    async def _get_db():
+        async with session() as db:
+            yield db
+
+    originali = (server_mod.async_session, article_ops.UPLOADS_DIR, images.UPLOAD_DIR)
+    app.dependency_overrides[get_db] = _get_db
+    server_mod.async_session = session
+    article_ops.UPLOADS_DIR = dataset / "uploads"
+    images.UPLOAD_DIR = str(dataset / "uploads")
+    # Come all'avvio della webapp (lifespan): indice della media library.
+    await asyncio.to_thread(media_index.get_index(article_ops.UPLOADS_DIR).scan)
+    try:
+        yield app
+    finally:
+        app.dependency_overrides.pop(get_db, None)
+        server_mod.async_session, article_ops.UPLOADS_DIR, images.UPLOAD_DIR = originali
+        await engine.dispose()
+
+
+def _immagine(dataset: Optional[Path]) -> bytes:
+    """Payload degli upload: una foto già ridimensionata dai segnaposto del
+    dataset, altrimenti un JPEG generato di dimensioni simili."""
+    if dataset is not None:
+        for path in sorted((dataset / "segnaposto").glob("foto-2-*.jpg")):
+            return path.read_bytes()
+    from PIL import Image
+
+    buf = io.BytesIO()
+    rng = random.Random(0)
+    Image.frombytes("RGB", (400, 300), rng.randbytes(400 * 300 * 3)).resize(
+        (1600, 1200)).save(buf, "JPEG", quality=85)
+    return buf.getvalue()
+
+
+async def prepara(client: httpx.AsyncClient, dataset: Optional[Path] = None) -> _Contesto:
+    """Id di numeri e articoli letti dall'API (vale anche per un server remoto)."""
+    resp = await client.get("/api/magazines")
+    resp.raise_for_status()
+    numeri = resp.json()
+    if not numeri:
+        raise SystemExit("Nessun numero nel database: genera prima il dataset (bench.dataset)")
+    bozza = next((m["id"] for m in numeri if m["stato"] == "bozza"), numeri[0]["id"])
+    articoli = set()
+    for m in random.Random(0).sample(numeri, min(_CAMPIONE_NUMERI, len(numeri))):
+        resp = await client.get(f"/api/magazines/{m['id']}/articles")
+        articoli.update(a["id"] for a in resp.json())
+    if not articoli:
+        raise SystemExit("Nessun articolo assegnato ai numeri")
+    return _Contesto(client=client, numeri=[m["id"] for m in numeri],
+                     articoli=sorted(articoli), bozza=bozza, immagine=_immagine(dataset))
+
+
+@asynccontextmanager
+async def _uvicorn(app, porta: int):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=porta,
+                                           lifespan="off", log_level="warning"))
+    task = asyncio.create_task(server.serve())
+    while not server.started:
+        if task.done():
+            task.result()
+        await asyncio.sleep(0.05)
+    porta = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{porta}"
+    finally:
+        server.should_exit = True
+        await task
+
+
+def _coppie(valori: list[str], opzione: str) -> dict[str, str]:
+    coppie = {}
+    for v in valori:
+        chiave, sep, valore = v.partition("=")
+        if not sep or chiave not in SLO_DEFAULT:
+            raise SystemExit(f"{opzione} {v!r}: usa chiave=valore con chiave tra "
+                             f"{', '.join(SLO_DEFAULT)}")
+        coppie[chiave] = valore
+    return coppie
+
+
+async def _main(args) -> dict:
+    from fastmcp import Client
+
+    pesi = {k: float(v) for k, v in _coppie(args.pesi, "--pesi").items()}
+    slo = {}
+    for k, v in _coppie(args.slo, "--slo").items():
+        p95, _, p99 = v.partition(":")
+        slo[k] = (float(p95), float(p99 or p95))
+    timeout = httpx.Timeout(300.0)
+    opzioni = dict(editori=args.editori, agenti=args.agenti, durata=args.durata,
+                   pesi=pesi, pausa=args.pausa, seed=args.seed)
+
+    if args.url:
+        mcp_client = None
+        if args.mcp_url:
+            mcp_client = lambda: Client(args.mcp_url, auth=args.mcp_token)  # noqa: E731
+        async with httpx.AsyncClient(base_url=args.url, timeout=timeout) as client:
+            ctx = await prepara(client)
+            misure, lag, durata = await esegui_carico(ctx, mcp_client=mcp_client, **opzioni)
+        return report(misure, lag, durata, slo, con_lag=False)
+
+    from app.mcp.server import mcp
+
+    async with collega_dataset(args.dataset) as app:
+        if args.modo == "uvicorn":
+            async with _uvicorn(app, args.porta) as base_url:
+                async with httpx.AsyncClient(base_url=base_url, timeout=timeout) as client:
+                    ctx = await prepara(client, args.dataset)
+                    misure, lag, durata = await esegui_carico(
+                        ctx, mcp_client=lambda: Client(mcp), **opzioni)
+        else:
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://carico",
+                                         timeout=timeout) as client:
+                ctx = await prepara(client, args.dataset)
+                misure, lag, durata = await esegui_carico(
+                    ctx, mcp_client=lambda: Client(mcp), **opzioni)
+    return report(misure, lag, durata, slo)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.carico",
+        description="Test di carico dell'API JSON e del server MCP con report SLO.",
+    )
+    parser.add_argument("--dataset", type=Path,
+                        help="directory di bench.dataset (geko.db, uploads/)")
+    parser.add_argument("--modo", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--porta", type=int, default=0, help="porta di uvicorn (0: libera)")
+    parser.add_argument("--url", help="server già avviato (al posto di --dataset)")
+    parser.add_argument("--mcp-url", help="endpoint MCP del server remoto (es. .../mcp)")
+    parser.add_argument("--mcp-token", help="bearer token per --mcp-url")
+    parser.add_argument("--editori", type=int, default=4, help="editori virtuali (API)")
+    parser.add_argument("--agenti", type=int, default=1, help="agenti virtuali (MCP)")
+    parser.add_argument("--durata", type=float, default=30.0, help="secondi di carico")
+    parser.add_argument("--pausa", type=float, default=0.0,
+                        help="pausa media tra due operazioni di un utente (s)")
+    parser.add_argument("--pesi", action="append", default=[], metavar="CHIAVE=PESO",
+                        help="peso di un'operazione nel mix (build=1 per includere le build)")
+    parser.add_argument("--slo", action="append", default=[], metavar="CHIAVE=P95[:P99]",
+                        help="SLO di un'operazione in ms")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", type=Path, help="salva il report JSON")
+    args = parser.parse_args(argv)
+    if not args.url and not args.dataset:
+        parser.error("serve --dataset (in-process) oppure --url (server remoto)")
+    if args.dataset and not (args.dataset / "geko.db").is_file():
+        parser.error(f"{args.dataset / 'geko.db'} non esiste: genera il dataset con bench.dataset")
+
+    rep = asyncio.run(_main(args))
+    print(formatta(rep))
+    if args.json:
+        args.json.write_text(json.dumps(rep, indent=2, ensure_ascii=False))
+    sys.exit(0 if rep["ok"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+"""Benchmark della consegna dei file grandi: throughput e CPU per GB servito.
+
+Serve lo stesso file (un PDF finto da `--mb` MB) `--concorrenti` volte in
+parallelo, per `--giri` giri, attraverso lo stack di middleware dell'app
+(compressione e invalidazione della cache), con un server ASGI minimo
+che scrive i corpi su `/dev/null` e, se l'app gli passa un file
+(`zerocopysend`), usa `os.sendfile`. Così si misura il costo lato app, cioè
+quello del worker Python; il costo di rete è lo stesso in ogni modalità
+(per `zerocopy` il sendfile verso `/dev/null` è un limite superiore: su un
+socket il kernel copia comunque le pagine, ma fuori dal processo Python).
+
+Modalità:
+
+  - `prima`: `FileResponse` di Starlette (blocchi da 64 KB) dietro il
+    vecchio middleware `BaseHTTPMiddleware`, com'era prima di
+    `app.services.file_delivery`;
+  - `blocchi`: `SendfileResponse` su un server senza estensioni (1 MiB);
+  - `zerocopy`: `SendfileResponse` con `http.response.zerocopysend`;
+  - `offload`: `SendfileResponse` con `GEKO_SENDFILE_HEADER=X-Accel-Redirect`
+    (l'app manda solo gli header, il file lo invia il proxy).
+
+Uso (da `webapp/`):
+
+    python -m bench.consegna --mb 200 --concorrenti 8 --giri 3
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import tempfile
+import time
+from pathlib import Path
+from typing import Optional
+
+MODALITA = ("prima", "blocchi", "zerocopy", "offload")
+
+
+def _app(modalita: str, path: Path):
+    from starlette.applications import Starlette
+    from starlette.middleware.base import BaseHTTPMiddleware
+    from starlette.responses import FileResponse
+    from starlette.routing import Route
+
+    from app.services.compression import CompressionMiddleware
+    from app.services.file_delivery import SendfileResponse
+    from app.services.response_cache import InvalidateOnWriteMiddleware
+
+    async def _pdf(request):
+        if modalita == "prima":
+            return FileResponse(path, media_type="application/pdf")
+        return SendfileResponse(path, media_type="application/pdf")
+
+    app = Starlette(routes=[Route("/pdf", _pdf)])
+    if modalita == "prima":
+        async def _passa(request, call_next):
+            return await call_next(request)
+
+        app = BaseHTTPMiddleware(app, dispatch=_passa)
+    else:
+        app = InvalidateOnWriteMiddleware(app)
+    return CompressionMiddleware(app)
+
+
+async def _scarica(app, modalita: str, sink: int) -> int:
+    """Una richiesta GET servita dal server minimo; ritorna i byte inviati."""
+    inviati = 0
+    estensioni = {"http.response.zerocopysend": {}} if modalita == "zerocopy" else {}
+    scope = {
+        "type": "http", "asgi": {"version": "3.0", "spec_version": "2.4"},
+        "http_version": "1.1", "method": "GET", "scheme": "http", "path": "/pdf",
+        "raw_path": b"/pdf", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench"), (b"accept-encoding", b"gzip, br")],
+        "client": ("127.0.0.1", 1), "server": ("bench", 80), "extensions": estensioni,
+    }
+    richiesta_inviata = False
+
+    async def receive():
+        nonlocal richiesta_inviata
+        if not richiesta_inviata:
+            richiesta_inviata = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.Event().wait()  # nessuna disconnessione
+
+    async def send(message):
+        nonlocal inviati
+        if message["type"] == "http.response.body":
+            corpo = memoryview(message.get("body", b""))
+            while corpo:
+                corpo = corpo[os.write(sink, corpo):]
+            inviati += len(message.get("body", b""))
+        elif message["type"] == "http.response.zerocopysend":
+            fd, offset, resto = message["file"].fileno(), message["offset"], message["count"]
+            while resto:
+                n = os.sendfile(sink, fd, offset, resto)
+                offset, resto, inviati = offset + n, resto - n, inviati + n
+
+    await app(scope, receive, send)
+    return inviati
+
+
+async def _giro(app, modalita: str, concorrenti: int, sink: int) -> int:
+    return sum(await asyncio.gather(*(_scarica(app, modalita, sink) for _ in range(concorrenti))))
+
+
+def misura(path: Path, modalita: str, *, concorrenti: int = 4, giri: int = 3) -> dict:
+    """Throughput e CPU (processo, tutti i thread) per servire `path`."""
+    precedente = os.environ.get("GEKO_SENDFILE_HEADER")
+    if modalita == "offload":
+        os.environ["GEKO_SENDFILE_HEADER"] = "X-Accel-Redirect"
+        os.environ["GEKO_SENDFILE_ROOT"] = str(path.parent)
+    else:
+        os.environ.pop("GEKO_SENDFILE_HEADER", None)
+    sink = os.open(os.devnull, os.O_WRONLY)
+    try:
+        app = _app(modalita, path)
+        asyncio.run(_giro(app, modalita, 1, sink))  # riscaldamento (page cache)
+        cpu, parete = time.process_time(), time.perf_counter()
+        inviati = 0
+        for _ in range(giri):
+            inviati += asyncio.run(_giro(app, modalita, concorrenti, sink))
+        cpu, parete = time.process_time() - cpu, time.perf_counter() - parete
+    finally:
+        os.close(sink)
+        os.environ.pop("GEKO_SENDFILE_ROOT", None)
+        if precedente is None:
+            os.environ.pop("GEKO_SENDFILE_HEADER", None)
+        else:
+            os.environ["GEKO_SENDFILE_HEADER"] = precedente
+
+    gb_serviti = path.stat().st_size * concorrenti * giri / 1024 ** 3
+    return {
+        "richieste": concorrenti * giri,
+        "gb": round(gb_serviti, 3),
+        "byte_dall_app": inviati,
+        "secondi": round(parete, 3),
+        "mb_s": round(gb_serviti * 1024 / parete, 1) if parete else None,
+        "cpu_s_per_gb": round(cpu / gb_serviti, 3) if gb_serviti else None,
+    }
+
+
+def formatta(risultati: dict[str, dict]) -> str:
+    righe = [f"{'modalità':<10}{'richieste':>10}{'GB':>8}{'s':>8}{'MB/s':>10}{'CPU s/GB':>10}"]
+    for nome, r in risultati.items():
+        righe.append(f"{nome:<10}{r['richieste']:>10}{r['gb']:>8.2f}{r['secondi']:>8.2f}"
+                     f"{r['mb_s'] or 0:>10.0f}{r['cpu_s_per_gb'] or 0:>10.3f}")
+    return "\n".join(righe)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.consegna",
+        description="Throughput e CPU per GB della consegna di PDF e media.",
+    )
+    parser.add_argument("--mb", type=int, default=100, help="dimensione del file servito")
+    parser.add_argument("--concorrenti", type=int, default=4, help="download in parallelo")
+    parser.add_argument("--giri", type=int, default=3)
+    parser.add_argument("--modalita", nargs="+", choices=MODALITA, default=list(MODALITA))
+    parser.add_argument("--json", type=Path, help="salva i risultati in JSON")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory(prefix="geko-consegna-") as tmp:
+        path = Path(tmp) / "geko.pdf"
+        with open(path, "wb") as f:
+            for _ in range(args.mb):
+                f.write(os.urandom(1024 * 1024))
+        risultati = {m: misura(path, m, concorrenti=args.concorrenti, giri=args.giri)
+                     for m in args.modalita}
+    print(formatta(risultati))
+    if args.json:
+        args.json.write_text(json.dumps(risultati, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,515 @@
+"""Generatore di un archivio sintetico: `geko.db` + media library.
+
+I test usano una manciata di fixture; per sapere come si comportano
+elenchi, ricerca e build con dieci anni di numeri serve un archivio grande
+e verosimile:
+
+  - numeri mensili a ritroso fino a oggi, tutti pubblicati tranne l'ultimo;
+  - articoli distribuiti sui numeri (qualcuno ripreso in un secondo
+    numero, qualche bozza non assegnata) con Markdown modellato su
+    `tests/fixtures/articoli_reali`: titoli `##`, elenchi, tabelle di
+    nominativi, alert `> [!NOTE]`, griglie di immagini, note a piè di pagina;
+  - immagini nella media library `uploads/articoli/<id>/<nome>` con
+    dimensioni in pixel e in byte da foto di telefono, screenshot e schemi.
+    Sono hardlink a un piccolo insieme di segnaposto (`segnaposto/`), così
+    200k immagini non occupano 200k file su disco; le colonne dei metadati
+    (vedi `media_index.describe`) sono già popolate, il backfill non parte.
+
+Contenuti e distribuzioni dipendono solo da `--seed`.
+
+Uso (da `webapp/`):
+
+    python -m bench.dataset --out /tmp/geko-scala \\
+        --numeri 500 --articoli 20000 --immagini 200000
+
+Con `--out data` scrive `data/geko.db` e `data/uploads/` nel layout della
+webapp (path delle immagini relativi alla cwd, come `article_ops.UPLOADS_DIR`).
+Un `geko.db` esistente non viene sovrascritto senza `--sovrascrivi`.
+"""
+
+import argparse
+import os
+import random
+import shutil
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Optional
+
+from PIL import Image as PILImage, ImageDraw
+from sqlalchemy import create_engine, event
+
+from app.models import Article, Base, Image, Magazine, MagazineStatus, article_magazines
+from app.services.media_index import _EXIF_ORIENTATION, MediaEntry, describe
+
+MESI = ("Gennaio", "Febbraio", "Marzo", "Aprile", "Maggio", "Giugno", "Luglio",
+        "Agosto", "Settembre", "Ottobre", "Novembre", "Dicembre")
+
+_BATCH = 5000
+_QUOTA_BOZZE = 0.03      # articoli non ancora assegnati a un numero
+_QUOTA_RIPRESI = 0.02    # articoli ripresi in un secondo numero
+_QUOTA_SENZA_IMMAGINI = 0.3
+_QUOTA_ORFANE = 0.05     # immagini caricate ma non usate nel testo
+_QUOTA_COPERTINE = 0.7
+
+
+@dataclass(frozen=True)
+class Profilo:
+    """Un tipo di immagine dell'archivio."""
+
+    prefisso: str       # radice del nome file
+    larghezza: int      # px, prima dell'orientamento EXIF
+    altezza: int
+    formato: str        # "JPEG" | "PNG"
+    orientamento: int   # tag EXIF 1-8
+    peso: int           # frequenza relativa
+
+    @property
+    def estensione(self) -> str:
+        return ".jpg" if self.formato == "JPEG" else ".png"
+
+
+PROFILI = (
+    Profilo("foto", 4032, 3024, "JPEG", 1, 30),   # telefono, 12 MP
+    Profilo("foto", 4032, 3024, "JPEG", 6, 10),   # telefono tenuto in verticale
+    Profilo("foto", 1600, 1200, "JPEG", 1, 25),   # già ridimensionata
+    Profilo("foto", 1024, 768, "JPEG", 1, 10),
+    Profilo("schermata", 1920, 1080, "PNG", 1, 12),
+    Profilo("schema", 1200, 800, "PNG", 1, 10),
+    Profilo("logo", 400, 400, "PNG", 1, 3),
+)
+
+# --- Vocabolario (dal tono degli articoli reali) ---
+
+_PREFISSI = ("I", "IK", "IU", "IZ", "IW", "IV", "IT", "IN")
+_NOMI = ("Antonio", "Riccardo", "Alessandro", "Fabio", "Enzo", "Giuseppe", "Gianni",
+         "Carlo", "Marco", "Stefano", "Elio", "Francesco", "Roberto", "Vittorio",
+         "Graziano", "Silverio", "Raffaele", "Eliseo", "Sylvain", "Romano")
+_COGNOMI = ("Romanin", "Bolognesi", "Pellizzoni", "Ruggeri", "Giovanelli", "Sera",
+            "Rotondo", "Avallone", "Costanzo", "Maggio", "Russo", "Silli", "Armellini",
+            "Entradi", "Panchetti", "Cimolino", "Normanni", "Mazzei", "Rimi", "Sarra")
+_TEMI = ("QRP", "SOTA", "Antenne", "Autocostruzione", "Propagazione", "Contest", "DSP",
+         "Portatile", "Storia", "EME", "Digitale", "Strumenti")
+_OGGETTI = ("il QMX", "una verticale per i 40 metri", "il ricevitore a conversione diretta",
+            "l'antenna end-fed", "l'accordatore automatico", "la stazione portatile",
+            "il beacon WSPR", "il finale in classe E", "il filtro a quarzo",
+            "la batteria LiFePO4", "il tasto verticale", "il dipolo a V invertita",
+            "il Si5351", "la loop magnetica", "il preamplificatore a basso rumore")
+_AZIONI = ("si comporta sorprendentemente bene", "richiede qualche accorgimento",
+           "ha dato ottimi risultati", "va tarato con pazienza",
+           "merita un approfondimento", "è stato provato sul campo",
+           "non è magia ma un raffinato compromesso", "sembra troppo semplice per funzionare")
+_CONTESTI = ("durante il contest invernale", "in cima al rifugio", "con pochi watt",
+             "in condizioni di propagazione difficili", "dopo una notte di prove",
+             "anche con il vento forte", "su tutte le bande HF",
+             "con un SWR di circa 1:1", "in portatile a 2000 metri",
+             "rispetto a un amplificatore lineare")
+_CHIUSURE = ("e i QSO non sono mancati.", "come si vede nei grafici qui sotto.",
+             "e il log si è riempito in fretta.", "ma il rumore locale resta il vero limite.",
+             "a patto di conoscerne il funzionamento.", "e la differenza si sente in cuffia.",
+             "senza bisogno di strumenti costosi.", "come avevamo previsto sulla carta.")
+_SEZIONI = ("Introduzione", "Un po' di storia", "Lo schema", "La prova sul campo",
+            "I risultati", "Come funziona", "Il montaggio", "La stazione",
+            "Misure e grafici", "Conclusioni", "Fonti e approfondimenti")
+_ALERT = ("NOTE",) * 6 + ("TIP", "TIP", "WARNING", "IMPORTANT", "CAUTION")
+_BANDE = ("160m", "80m", "40m", "30m", "20m", "17m", "15m", "10m", "6m", "2m")
+_MODI = ("CW", "SSB", "FT8", "WSPR", "RTTY", "FM")
+
+
+class _Testo:
+    """Frasi, titoli e blocchi Markdown pseudo-casuali (da un `random.Random`)."""
+
+    def __init__(self, rng: random.Random):
+        self.rng = rng
+
+    def nominativo(self) -> str:
+        r = self.rng
+        lettere = "".join(r.choice("ABCDEFGHIJKLMNOPQRSTUVWXYZ") for _ in range(r.choice((2, 3, 3))))
+        return f"{r.choice(_PREFISSI)}{r.randint(0, 9)}{lettere}"
+
+    def nome(self) -> str:
+        return f"{self.rng.choice(_NOMI)} {self.rng.choice(_COGNOMI)}"
+
+    def frase(self) -> str:
+        r = self.rng
+        oggetto = r.choice(_OGGETTI)
+        oggetto = oggetto[0].upper() + oggetto[1:]
+        if r.random() < 0.15:
+            oggetto = f"*{oggetto}*"
+        frase = f"{oggetto} {r.choice(_AZIONI)} {r.choice(_CONTESTI)}, {r.choice(_CHIUSURE)}"
+        if r.random() < 0.05:
+            frase += f" **SNR = {r.randint(-24, 10)} dB** su {r.choice((100, 500, 2500))} Hz."
+        return frase
+
+    def paragrafo(self) -> str:
+        # Come negli articoli reali: a volte le frasi vanno a capo senza riga vuota.
+        sep = "\n" if self.rng.random() < 0.3 else " "
+        return sep.join(self.frase() for _ in range(self.rng.randint(2, 6)))
+
+    def titolo(self) -> str:
+        oggetto = self.rng.choice(_OGGETTI)
+        return f"{self.rng.choice(_TEMI)}: {oggetto[0].upper()}{oggetto[1:]}"
+
+    def sezione(self) -> str:
+        nome = self.rng.choice(_SEZIONI)
+        # Entrambe le forme compaiono nell'archivio.
+        return f"##{nome.upper()}" if self.rng.random() < 0.3 else f"## {nome}"
+
+    def elenco(self) -> str:
+        marca = self.rng.choice(("- ", "•\t", "1. "))
+        righe = []
+        for i in range(self.rng.randint(2, 6)):
+            voce = self.frase()
+            righe.append(f"{i + 1}. {voce}" if marca == "1. " else f"{marca}{voce}")
+        return "\n".join(righe)
+
+    def alert(self) -> str:
+        r = self.rng
+        titolo = r.choice(("", "", r.choice(_SEZIONI)))
+        testa = f"> [!{r.choice(_ALERT)}] {titolo}".rstrip()
+        corpo = "\n>\n".join(f"> {self.frase()}" for _ in range(r.randint(1, 3)))
+        return f"{testa}\n{corpo}"
+
+    def _cella(self, colonna: str) -> str:
+        r = self.rng
+        return {
+            "**Nominativo**": lambda: f"**{self.nominativo()}**",
+            "Nome": self.nome,
+            "Banda": lambda: r.choice(_BANDE),
+            "Modo": lambda: r.choice(_MODI),
+            "QSO": lambda: str(r.randint(1, 400)),
+            "Punti": lambda: str(r.randint(10, 9000)),
+            "Potenza": lambda: f"{r.choice((0.5, 1, 2, 5, 10))} W",
+            "SNR": lambda: f"{r.randint(-24, 10)} dB",
+        }[colonna]()
+
+    def tabella(self) -> str:
+        r = self.rng
+        colonne = ["**Nominativo**", "Nome"] + r.sample(
+            ["Banda", "Modo", "QSO", "Punti", "Potenza", "SNR"], r.randint(0, 4))
+        righe = ["| " + " | ".join(colonne) + " |",
+                 "|" + "|".join("-" * 12 for _ in colonne) + "|"]
+        for _ in range(r.randint(3, 15)):
+            righe.append("| " + " | ".join(self._cella(c) for c in colonne) + " |")
+        return "\n".join(righe)
+
+    def immagini(self, nomi: list[str]) -> str:
+        """Una figura, o una griglia (righe consecutive di sole immagini)."""
+        righe = []
+        for nome in nomi:
+            alt = nome.rsplit(".", 1)[0].replace("_", " ")
+            attrs = ""
+            if len(nomi) == 1 and self.rng.random() < 0.5:
+                attrs = "{width=%s}" % self.rng.choice(("50%", "70%", "100%"))
+            righe.append(f"![{alt}]({nome}){attrs}")
+        return "\n".join(righe)
+
+    def articolo(self, nomi_immagini: list[str]) -> str:
+        """Markdown di un articolo che usa (quasi) tutte le immagini date."""
+        r = self.rng
+        usate = [n for n in nomi_immagini if r.random() >= _QUOTA_ORFANE]
+        blocchi = [self.paragrafo() for _ in range(r.randint(1, 3))]
+        n_sezioni = r.randint(8, 12) if r.random() < 0.1 else r.randint(2, 6)
+        note = 0
+        for s in range(n_sezioni):
+            blocchi.append(self.sezione())
+            for _ in range(r.randint(1, 3)):
+                paragrafo = self.paragrafo()
+                if r.random() < 0.1:
+                    note += 1
+                    paragrafo += f"[^{note}]"
+                blocchi.append(paragrafo)
+            scelta = r.random()
+            if scelta < 0.2:
+                blocchi.append(self.elenco())
+            elif scelta < 0.32:
+                blocchi.append(self.tabella())
+            elif scelta < 0.45:
+                blocchi.append(self.alert())
+            if r.random() < 0.05:
+                blocchi.append("--")
+            # Immagini ripartite sulle sezioni; l'ultima prende il resto.
+            quante = len(usate) if s == n_sezioni - 1 else r.randint(0, (len(usate) + 1) // 2)
+            while quante > 0 and usate:
+                n = min(quante, r.choice((1, 1, 2, 3, 4)))
+                blocchi.append(self.immagini(usate[:n]))
+                del usate[:n]
+                quante -= n
+        for i in range(1, note + 1):
+            blocchi.append(f"[^{i}]: {self.nome()}, *{self.titolo()}*, {r.randint(1950, 2025)}.")
+        return "\n\n".join(blocchi) + "\n"
+
+
+# --- Immagini segnaposto ---
+
+def _disegna(profilo: Profilo, scala: float, rng: random.Random) -> PILImage.Image:
+    larghezza = max(int(profilo.larghezza * scala), 8)
+    altezza = max(int(profilo.altezza * scala), 8)
+    if profilo.prefisso == "foto":
+        # Macchie morbide (rumore a bassa risoluzione ingrandito) più grana:
+        # comprime come una foto vera, 2-3 MB a 12 MP.
+        piccola = (max(larghezza // 48, 2), max(altezza // 48, 2))
+        base = PILImage.frombytes("RGB", piccola, rng.randbytes(piccola[0] * piccola[1] * 3))
+        base = base.resize((larghezza, altezza), PILImage.BICUBIC)
+        grana = PILImage.frombytes("L", (larghezza, altezza), rng.randbytes(larghezza * altezza))
+        return PILImage.blend(base, grana.convert("RGB"), 0.12)
+    # Schermate e schemi: campiture piatte e linee, come le immagini reali.
+    sfondo = (255, 255, 255) if profilo.prefisso != "schermata" else (236, 239, 244)
+    img = PILImage.new("RGB", (larghezza, altezza), sfondo)
+    draw = ImageDraw.Draw(img)
+    for _ in range(rng.randint(20, 60)):
+        x0, y0 = rng.randrange(larghezza), rng.randrange(altezza)
+        x1 = min(x0 + rng.randint(4, larghezza // 3 + 4), larghezza - 1)
+        y1 = min(y0 + rng.randint(2, altezza // 6 + 2), altezza - 1)
+        colore = tuple(rng.randrange(256) for _ in range(3))
+        if profilo.prefisso == "schermata":
+            draw.rectangle((x0, y0, x1, y1), fill=colore)
+        else:
+            draw.line((x0, y0, x1, y1), fill=colore, width=max(1, int(3 * scala)))
+    return img
+
+
+def genera_segnaposto(dest: Path, rng: random.Random, *, varianti: int = 3,
+                      scala: float = 1.0) -> list[tuple[Profilo, Path, MediaEntry]]:
+    """Scrive `varianti` file per profilo in `dest`; ritorna (profilo, path, entry)."""
+    dest.mkdir(parents=True, exist_ok=True)
+    out = []
+    for i, profilo in enumerate(PROFILI):
+        for v in range(varianti):
+            path = dest / f"{profilo.prefisso}-{i}-{v}{profilo.estensione}"
+            img = _disegna(profilo, scala, rng)
+            opzioni = {}
+            if profilo.formato == "JPEG":
+                exif = PILImage.Exif()
+                if profilo.orientamento != 1:
+                    exif[_EXIF_ORIENTATION] = profilo.orientamento
+                opzioni = {"quality": 85, "exif": exif.tobytes()}
+            img.save(path, profilo.formato, **opzioni)
+            out.append((profilo, path, describe(path)))
+    return out
+
+
+def _deposita(sorgente: Path, dest: Path, media: str) -> str:
+    """Mette il segnaposto nella media library. Ritorna la modalità usata
+    ("link" ripiega su "copy" se il filesystem non supporta hardlink)."""
+    if dest.exists():
+        dest.unlink()
+    if media == "link":
+        try:
+            os.link(sorgente, dest)
+            return media
+        except OSError:
+            media = "copy"
+    shutil.copyfile(sorgente, dest)
+    return media
+
+
+# --- Archivio ---
+
+def _ripartisci(rng: random.Random, totale: int, contenitori: int) -> list[int]:
+    """Distribuisce `totale` elementi su `contenitori`: molti vuoti, coda lunga."""
+    if not contenitori:
+        return []
+    pesi = [0.0 if rng.random() < _QUOTA_SENZA_IMMAGINI else rng.expovariate(1.0)
+            for _ in range(contenitori)]
+    if not any(pesi):
+        pesi = [1.0] * contenitori
+    conteggi = [0] * contenitori
+    for i in rng.choices(range(contenitori), weights=pesi, k=totale):
+        conteggi[i] += 1
+    return conteggi
+
+
+class _Inserimenti:
+    """Righe accumulate e inserite a blocchi (executemany) per tabella."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._righe: dict = {}
+
+    def add(self, tabella, riga: dict) -> None:
+        righe = self._righe.setdefault(tabella, [])
+        righe.append(riga)
+        if len(righe) >= _BATCH:
+            self.flush(tabella)
+
+    def flush(self, tabella=None) -> None:
+        for t in [tabella] if tabella is not None else list(self._righe):
+            if self._righe.get(t):
+                self.conn.execute(t.insert(), self._righe[t])
+                self._righe[t] = []
+
+
+def genera(
+    out: Path,
+    *,
+    numeri: int = 500,
+    articoli: int = 20000,
+    immagini: int = 200000,
+    seed: int = 42,
+    media: str = "link",
+    scala: float = 1.0,
+    varianti: int = 3,
+    sovrascrivi: bool = False,
+    ora: Optional[datetime] = None,
+) -> dict:
+    """Genera `out/geko.db` e `out/uploads/articoli/`. Ritorna le statistiche.
+
+    media: "link" (hardlink ai segnaposto), "copy" o "none" (solo database).
+    scala: fattore sulle dimensioni in pixel dei segnaposto (1.0 = realistiche).
+    """
+    if media not in ("link", "copy", "none"):
+        raise ValueError(f"media non valido: {media!r} (link, copy, none)")
+    inizio = time.perf_counter()
+    out = Path(out)
+    db_path = out / "geko.db"
+    if db_path.exists():
+        if not sovrascrivi:
+            raise FileExistsError(f"{db_path} esiste già: usa sovrascrivi")
+        db_path.unlink()
+    out.mkdir(parents=True, exist_ok=True)
+    uploads = out / "uploads"
+    rng = random.Random(seed)
+    testo = _Testo(rng)
+    ora = ora or datetime.now(timezone.utc)
+
+    pool = genera_segnaposto(out / "segnaposto", rng, varianti=varianti, scala=scala)
+    pesi_pool = [p.peso for p, _, _ in pool]
+    autori = [(testo.nominativo(), testo.nome()) for _ in range(max(20, articoli // 100))]
+
+    # Numeri mensili, l'ultimo questo mese ed ancora in bozza.
+    date_numeri = [ora - timedelta(days=30.44 * (numeri - 1 - i)) for i in range(numeri)]
+    n_bozze = articoli if not numeri else round(articoli * _QUOTA_BOZZE)
+    assegnati = articoli - n_bozze
+    per_numero: list[list[int]] = [[] for _ in range(numeri)]
+    immagini_per_articolo = _ripartisci(rng, immagini, articoli)
+    prima_immagine: dict[int, int] = {}
+
+    engine = create_engine(f"sqlite:///{db_path}")
+
+    @event.listens_for(engine, "connect")
+    def _pragmas(dbapi_conn, _record):
+        # Solo per il caricamento: un archivio sintetico si rigenera.
+        dbapi_conn.execute("PRAGMA synchronous=OFF")
+        dbapi_conn.execute("PRAGMA journal_mode=MEMORY")
+
+    stats = {"numeri": numeri, "articoli": articoli, "immagini": immagini,
+             "byte_markdown": 0, "byte_immagini": 0, "media": media}
+    image_id = 0
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        ins = _Inserimenti(conn)
+        for k in range(articoli):
+            article_id = k + 1
+            if k < assegnati:
+                numero = k * numeri // assegnati
+                per_numero[numero].append(article_id)
+                creato = date_numeri[numero] - timedelta(days=rng.uniform(5, 60))
+                modificato = min(creato + timedelta(days=rng.uniform(0, 10)), date_numeri[numero])
+            else:
+                creato = ora - timedelta(days=rng.uniform(0, 30))
+                modificato = creato + (ora - creato) * rng.random()
+
+            nomi = []
+            for j in range(immagini_per_articolo[k]):
+                (profilo, sorgente, entry), = rng.choices(pool, weights=pesi_pool)
+                nome = f"{profilo.prefisso}_{j + 1}{profilo.estensione}"
+                dest = uploads / "articoli" / str(article_id) / nome
+                if media != "none":
+                    if j == 0:
+                        dest.parent.mkdir(parents=True, exist_ok=True)
+                    media = stats["media"] = _deposita(sorgente, dest, media)
+                image_id += 1
+                prima_immagine.setdefault(article_id, image_id)
+                nomi.append(nome)
+                stats["byte_immagini"] += entry.byte
+                ins.add(Image.__table__, {
+                    "id": image_id, "filename": nome, "original_filename": nome,
+                    "path": str(dest), "alt_text": "", "article_id": article_id,
+                    "uploaded_at": creato + timedelta(minutes=rng.randint(1, 600)),
+                    "size_bytes": entry.byte, "mime_type": entry.mime,
+                    "width": entry.larghezza, "height": entry.altezza,
+                    "orientation": entry.orientamento, "sha256": entry.sha256,
+                })
+
+            autore, nome_autore = rng.choice(autori)
+            md = testo.articolo(nomi)
+            stats["byte_markdown"] += len(md.encode())
+            ins.add(Article.__table__, {
+                "id": article_id, "titolo": testo.titolo(),
+                "sottotitolo": testo.frase() if rng.random() < 0.4 else "",
+                "autore": autore, "nome_autore": nome_autore,
+                "contenuto_md": md, "contenuto_typ": "", "sommario_llm": "", "ordine": 0,
+                "created_at": creato, "updated_at": modificato,
+            })
+
+        # Articoli ripresi in un numero successivo, in coda.
+        for numero in range(numeri - 1):
+            for article_id in list(per_numero[numero]):
+                if rng.random() < _QUOTA_RIPRESI:
+                    successivo = min(numero + rng.randint(1, 12), numeri - 1)
+                    per_numero[successivo].append(article_id)
+
+        for numero, articoli_numero in enumerate(per_numero):
+            for ordine, article_id in enumerate(dict.fromkeys(articoli_numero)):
+                ins.add(article_magazines, {"article_id": article_id,
+                                            "magazine_id": numero + 1, "ordine": ordine})
+            data = date_numeri[numero]
+            copertina = None
+            if rng.random() < _QUOTA_COPERTINE:
+                copertina = next((prima_immagine[a] for a in articoli_numero
+                                  if a in prima_immagine), None)
+            ins.add(Magazine.__table__, {
+                "id": numero + 1, "numero": str(numero + 1), "mese": MESI[data.month - 1],
+                "anno": str(data.year),
+                "stato": MagazineStatus.BOZZA if numero == numeri - 1 else MagazineStatus.PUBBLICATO,
+                "editoriale": "\n\n".join(testo.paragrafo() for _ in range(2)),
+                "editoriale_autore": rng.choice(autori)[0],
+                "copertina_id": copertina, "created_at": data - timedelta(days=60),
+                "updated_at": data,
+            })
+        ins.flush()
+    engine.dispose()
+
+    stats["secondi"] = round(time.perf_counter() - inizio, 1)
+    return stats
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.dataset",
+        description="Genera un geko.db sintetico e la sua media library.",
+    )
+    parser.add_argument("--out", type=Path, required=True,
+                        help="directory di destinazione (geko.db, uploads/, segnaposto/)")
+    parser.add_argument("--numeri", type=int, default=500)
+    parser.add_argument("--articoli", type=int, default=20000)
+    parser.add_argument("--immagini", type=int, default=200000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--media", choices=("link", "copy", "none"), default="link",
+                        help="hardlink ai segnaposto (default), copie, o nessun file")
+    parser.add_argument("--scala-immagini", type=float, default=1.0,
+                        help="fattore sulle dimensioni in pixel dei segnaposto")
+    parser.add_argument("--varianti", type=int, default=3,
+                        help="segnaposto distinti per tipo di immagine")
+    parser.add_argument("--sovrascrivi", action="store_true",
+                        help="rimpiazza un geko.db esistente")
+    args = parser.parse_args(argv)
+    try:
+        stats = genera(args.out, numeri=args.numeri, articoli=args.articoli,
+                       immagini=args.immagini, seed=args.seed, media=args.media,
+                       scala=args.scala_immagini, varianti=args.varianti,
+                       sovrascrivi=args.sovrascrivi)
+    except FileExistsError as e:
+        parser.error(str(e))
+    print(
+        f"{stats['numeri']} numeri, {stats['articoli']} articoli, {stats['immagini']} immagini "
+        f"({stats['byte_markdown'] / 2**20:.1f} MB di markdown, "
+        f"{stats['byte_immagini'] / 2**30:.2f} GB di immagini, media: {stats['media']}) "
+        f"in {stats['secondi']}s → {args.out / 'geko.db'}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""Benchmark della serializzazione JSON delle risposte grandi.
+
+Confronta, sugli stessi payload letti da un archivio di `bench.dataset`:
+
+  - `prima`: il percorso storico, cioè `.isoformat()` su ogni datetime (come
+    facevano i `*_to_response`), `jsonable_encoder` e il `JSONResponse` di
+    FastAPI (`json.dumps`);
+  - `dopo`: `app.services.serialization.dumps` (orjson, datetime nativi).
+
+Payload: l'elenco completo degli articoli (`GET /api/articles`), gli
+articoli del numero più ricco (`?magazine_id=`) e l'elenco delle immagini
+(`GET /api/images`). Per ciascuno: dimensione, miglior tempo su
+`--ripetizioni` giri, throughput e rapporto. I due corpi sono confrontati
+dopo il parsing, così il benchmark verifica anche che l'output non cambi.
+
+Uso (da `webapp/`):
+
+    python -m bench.dataset --out /tmp/geko-scala --articoli 20000
+    python -m bench.serializzazione --dataset /tmp/geko-scala
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+def _iso(valore: Any) -> Any:
+    """I datetime già convertiti in stringa, come nei vecchi `*_to_response`."""
+    if isinstance(valore, datetime):
+        return valore.isoformat()
+    if isinstance(valore, dict):
+        return {k: _iso(v) for k, v in valore.items()}
+    if isinstance(valore, list):
+        return [_iso(v) for v in valore]
+    return valore
+
+
+def prima(payload: Any) -> bytes:
+    from fastapi.encoders import jsonable_encoder
+    from fastapi.responses import JSONResponse
+
+    return JSONResponse(jsonable_encoder(_iso(payload))).body
+
+
+def dopo(payload: Any) -> bytes:
+    from app.services.serialization import dumps
+
+    return dumps(payload)
+
+
+def _migliore(funzione: Callable[[Any], bytes], payload: Any, ripetizioni: int) -> tuple[float, bytes]:
+    migliore, corpo = float("inf"), b""
+    for _ in range(max(1, ripetizioni)):
+        inizio = time.perf_counter()
+        corpo = funzione(payload)
+        migliore = min(migliore, time.perf_counter() - inizio)
+    return migliore, corpo
+
+
+async def carica_payload(dataset: Path, *, limite_immagini: Optional[int] = None) -> dict[str, Any]:
+    """I payload delle risposte più grandi, costruiti come nelle route."""
+    from sqlalchemy import func, select
+    from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+    from app.models import Image, article_magazines
+    from app.routes.api.images import image_to_response
+    from app.services import article_ops
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{dataset / 'geko.db'}")
+    try:
+        async with async_sessionmaker(engine, class_=AsyncSession)() as db:
+            payload = {"articoli": await article_ops.list_articles(db)}
+            numero = (await db.execute(
+                select(article_magazines.c.magazine_id)
+                .group_by(article_magazines.c.magazine_id)
+                .order_by(func.count().desc())
+                .limit(1)
+            )).scalar()
+            if numero is not None:
+                payload["articoli_numero"] = await article_ops.list_articles(db, magazine_id=numero)
+            immagini = (await db.execute(
+                select(Image).order_by(Image.id).limit(limite_immagini)
+            )).scalars().all()
+            payload["immagini"] = [image_to_response(img) for img in immagini]
+    finally:
+        await engine.dispose()
+    return payload
+
+
+def confronta(payload: dict[str, Any], *, ripetizioni: int = 5) -> dict[str, dict]:
+    """Tempi `prima`/`dopo` per ogni payload; AssertionError se i JSON differiscono."""
+    risultati = {}
+    for nome, dati in payload.items():
+        t_prima, corpo_prima = _migliore(prima, dati, ripetizioni)
+        t_dopo, corpo_dopo = _migliore(dopo, dati, ripetizioni)
+        assert json.loads(corpo_prima) == json.loads(corpo_dopo), f"{nome}: output diverso"
+        mb = len(corpo_dopo) / 1024 / 1024
+        risultati[nome] = {
+            "elementi": len(dati),
+            "mb": round(mb, 2),
+            "prima_ms": round(t_prima * 1000, 2),
+            "dopo_ms": round(t_dopo * 1000, 2),
+            "mb_s_prima": round(mb / t_prima, 1) if t_prima else None,
+            "mb_s_dopo": round(mb / t_dopo, 1) if t_dopo else None,
+            "rapporto": round(t_prima / t_dopo, 1) if t_dopo else None,
+        }
+    return risultati
+
+
+def formatta(risultati: dict[str, dict]) -> str:
+    righe = [f"{'payload':<18}{'elementi':>9}{'MB':>8}{'prima ms':>10}{'dopo ms':>10}"
+             f"{'MB/s prima':>12}{'MB/s dopo':>11}{'x':>7}"]
+    for nome, r in risultati.items():
+        righe.append(
+            f"{nome:<18}{r['elementi']:>9}{r['mb']:>8.2f}{r['prima_ms']:>10.1f}{r['dopo_ms']:>10.1f}"
+            f"{r['mb_s_prima'] or 0:>12.1f}{r['mb_s_dopo'] or 0:>11.1f}{r['rapporto'] or 0:>7.1f}"
+        )
+    return "\n".join(righe)
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(
+        prog="python -m bench.serializzazione",
+        description="Confronta la serializzazione JSON storica (jsonable_encoder + json) con orjson.",
+    )
+    parser.add_argument("--dataset", type=Path, required=True,
+                        help="directory di bench.dataset (geko.db)")
+    parser.add_argument("--ripetizioni", type=int, default=5)
+    parser.add_argument("--limite-immagini", type=int, default=None,
+                        help="immagini nel payload (default: tutte)")
+    parser.add_argument("--json", type=Path, help="salva i risultati in JSON")
+    args = parser.parse_args(argv)
+    if not (args.dataset / "geko.db").is_file():
+        parser.error(f"{args.dataset / 'geko.db'} non esiste: genera il dataset con bench.dataset")
+
+    payload = asyncio.run(carica_payload(args.dataset, limite_immagini=args.limite_immagini))
+    risultati = confronta(payload, ripetizioni=args.ripetizioni)
+    print(formatta(risultati))
+    if args.json:
+        args.json.write_text(json.dumps(risultati, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -37,6 +37,19 @@ export interface Magazine {
 	article_count?: number;
 }
 
+// Voce dell'elenco numeri: senza articoli, solo il loro conteggio
+export type MagazineSummary = Omit<Magazine, 'articles'> & { article_count: number };
+
+// Sommario di un numero (intestazioni degli articoli, nell'ordine del numero)
+export interface TocEntry {
+	id: number;
+	titolo: string;
+	sottotitolo: string;
+	autore: string;
+	nome_autore: string;
+	ordine: number;
+}
+
 export interface Image {
 	id: number;
 	filename: string;
@@ -116,15 +129,27 @@ export const articles = {
 		fetchJson<Article>(`${API_BASE}/articles/${id}/assign`, {
 			method: 'POST',
 			body: JSON.stringify({ magazine_ids: magazineIds })
+		}),
+
+	bulkAssign: (articleIds: number[], addMagazineIds: number[] = [], removeMagazineIds: number[] = []) =>
+		fetchJson<{ aggiunti: number; rimossi: number }>(`${API_BASE}/articles/bulk-assign`, {
+			method: 'POST',
+			body: JSON.stringify({
+				article_ids: articleIds,
+				add_magazine_ids: addMagazineIds,
+				remove_magazine_ids: removeMagazineIds
+			})
 		})
 };
 
 // Magazines API
 export const magazines = {
-	list: () => fetchJson<Magazine[]>(`${API_BASE}/magazines`),
+	list: () => fetchJson<MagazineSummary[]>(`${API_BASE}/magazines`),
 
 	get: (id: number) => fetchJson<Magazine>(`${API_BASE}/magazines/${id}`),
 
+	toc: (id: number) => fetchJson<TocEntry[]>(`${API_BASE}/magazines/${id}/articles`),
+
 	create: (data: Partial<Magazine>) =>
 		fetchJson<Magazine>(`${API_BASE}/magazines`, {
 			method: 'POST',
@@ -143,11 +168,17 @@ export const magazines = {
 		}),
 
 	build: (id: number) =>
-		fetchJson<{ status: string; pdf_url?: string; error?: string }>(`${API_BASE}/magazines/${id}/build`, {
+		fetchJson<{ status: string; pdf_url?: string; pdf_urls?: Record<string, string>; error?: string }>(`${API_BASE}/magazines/${id}/build`, {
 			method: 'POST'
 		}),
 
-	getPdfUrl: (id: number) => `${API_BASE}/magazines/${id}/pdf`,
+	getPdfUrl: (id: number, profile?: 'print' | 'screen' | 'mobile', inline = false) => {
+		const params = new URLSearchParams();
+		if (profile) params.set('profile', profile);
+		if (inline) params.set('inline', 'true');
+		const query = params.toString();
+		return `${API_BASE}/magazines/${id}/pdf${query ? `?${query}` : ''}`;
+	},
 
 	addArticle: (magazineId: number, articleId: number, ordine?: number) =>
 		fetchJson<{ status: string; ordine: number }>(`${API_BASE}/magazines/${magazineId}/articles/${articleId}`, {
@@ -161,7 +192,7 @@ export const magazines = {
 		}),
 
 	reorderArticles: (magazineId: number, articleIds: number[]) =>
-		fetchJson<{ status: string }>(`${API_BASE}/magazines/${magazineId}/articles/reorder`, {
+		fetchJson<{ status: string; updated: number }>(`${API_BASE}/magazines/${magazineId}/articles/reorder`, {
 			method: 'POST',
 			body: JSON.stringify({ article_ids: articleIds })
 		})
@@ -0,0 +1,41 @@
+"""Build data-driven: il numero viaggia come JSON in sys.inputs e il template
+(`geko-numero`) lo impagina; nessun testo utente diventa codice Typst."""
+
+from pypdf import PdfReader
+
+from app.services.builder import MagazineBuilder
+from app.services.md_render import article_data
+
+
+def test_article_data_segmenti():
+    art = article_data(
+        titolo="T", sottotitolo="", autore="IK2ABC", nome="Mario",
+        contenuto_md="Prosa.\n\n> [!TIP] Consiglio\n> corpo\n\n![Vetta](x.png){width=60%}",
+        image_base="/data/uploads/articoli/7",
+    )
+    assert art["sottotitolo"] is None and art["nome"] == "Mario"
+    tipi = [s["tipo"] for s in art["segmenti"]]
+    assert tipi == ["prosa", "box", "prosa", "immagini"]
+    img = art["segmenti"][-1]["immagini"][0]
+    assert img == {
+        "percorso": "/data/uploads/articoli/7/x.png", "didascalia": "Vetta", "larghezza": "60%",
+    }
+
+
+def test_build_data_testi_ostili_compilano():
+    # Virgolette, backslash e markup Typst nei metadati rompevano le f-string.
+    ostile = 'Il "QRP" \\ #let x = ] $5 [prova]'
+    art = article_data(
+        titolo=ostile, sottotitolo=ostile, autore='IK2"X', nome=ostile,
+        contenuto_md="Testo con 5$ e `codice`.\n\n![Cresta](/typst/assets/corno-grande-2.jpg)\n",
+    )
+    pdf = MagazineBuilder().build_magazine(
+        numero="95", mese="Luglio", anno="2026", articles_typst=[],
+        articles_data=[art],
+        copertina_path="typst/assets/corno-grande-1.jpg",
+        evidenze=[{"titolo": ostile, "descrizione": ostile}],
+        editoriale=ostile, editoriale_autore=ostile,
+        team_membri=[{"nominativo": ostile, "nome": "", "ruolo": ostile}],
+    )
+    testo = "\n".join(p.extract_text() for p in PdfReader(pdf).pages)
+    assert '"QRP"' in testo and "#let x" in testo
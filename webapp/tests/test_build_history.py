@@ -0,0 +1,146 @@
+"""Storico delle build: hash degli input, riuso degli artefatti, ripristino
+e retention."""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.database import get_db
+from app.main import app
+from app.services import article_ops, build_history, builder, compile_pool
+from app.services.pdf_compress import profile_path
+
+
+def test_input_hash(tmp_path):
+    img = tmp_path / "a.png"
+    img.write_bytes(b"uno")
+    base = build_history.input_hash({"articoli": ["x"]}, [img])
+    assert base == build_history.input_hash({"articoli": ["x"]}, [img])
+    assert base != build_history.input_hash({"articoli": ["y"]}, [img])
+    img.write_bytes(b"due")  # stessa immagine, byte diversi
+    assert base != build_history.input_hash({"articoli": ["x"]}, [img])
+
+
+def test_artefatti_content_addressed(tmp_path):
+    build_dir, out = tmp_path / "staging", tmp_path / "out"
+    build_dir.mkdir()
+    for p, contenuto in {"print": b"master", "screen": b"schermo"}.items():
+        profile_path(build_dir, "7", p).write_bytes(contenuto)
+    artefatti = build_history.store_artifacts(build_dir, "7", out)
+    assert set(artefatti) == {"print", "screen"}
+    assert build_history.artifact_path(out, artefatti["screen"]).read_bytes() == b"schermo"
+    # Stesso contenuto, stesso artefatto.
+    assert build_history.store_artifacts(build_dir, "7", out) == artefatti
+
+    nuova = tmp_path / "staging2"
+    nuova.mkdir()
+    assert build_history.stage_artifacts(artefatti, "7", nuova, out)
+    assert profile_path(nuova, "7", "print").read_bytes() == b"master"
+    build_history.artifact_path(out, artefatti["print"]).unlink()
+    assert not build_history.stage_artifacts(artefatti, "7", tmp_path / "staging3", out)
+
+
+class _InProcessPool:
+    """Pool che compila nel processo dei test (build reale, niente worker)."""
+
+    def __init__(self):
+        self.builds = 0
+
+    async def run(self, fn, *args, cancel=None, **kwargs):
+        self.builds += 1
+        return fn(*args, **kwargs)
+
+
+@pytest.fixture
+async def numero(db, sample_magazine):
+    art = await article_ops.create_article(db, titolo="Antenne", contenuto_md="Testo.")
+    await article_ops.assign_article(db, art["id"], [sample_magazine["id"]])
+    return {**sample_magazine, "articolo_id": art["id"]}
+
+
+@pytest.fixture
+def client(db, tmp_path, monkeypatch):
+    async def _override():
+        yield db
+
+    monkeypatch.setattr(builder, "OUTPUT_DIR", tmp_path)
+    app.dependency_overrides[get_db] = _override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+async def test_storico_riuso_e_ripristino(client, numero, db, tmp_path, monkeypatch):
+    pool = _InProcessPool()
+    monkeypatch.setattr(compile_pool, "get_pool", lambda: pool)
+    base = f"/api/magazines/{numero['id']}"
+    pubblicato = tmp_path / f"geko{numero['numero']}.pdf"
+    async with client as c:
+        prima = (await c.post(f"{base}/build")).json()
+        assert prima["status"] == "success" and prima["riuso_di"] is None
+        pdf_prima = pubblicato.read_bytes()
+
+        # Stessi input: nessuna ricompilazione, artefatti ripubblicati.
+        seconda = (await c.post(f"{base}/build")).json()
+        assert seconda["riuso_di"] == prima["build_id"]
+        assert pool.builds == 1
+        # Il build.json pubblicato descrive il riuso, non la build originale.
+        info = build_history.read_build_info(tmp_path, numero["numero"])
+        assert info["riuso_di"] == prima["build_id"] and info["fasi"] == {}
+
+        await article_ops.update_article(db, numero["articolo_id"], contenuto_md="Testo nuovo.")
+        terza = (await c.post(f"{base}/build")).json()
+        assert terza["riuso_di"] is None and pool.builds == 2
+
+        storico = (await c.get(f"{base}/builds")).json()
+        assert [b["esito"] for b in storico] == ["successo", "riuso", "successo"]
+        ultima = storico[0]
+        assert ultima["pagine"] >= 1
+        assert ultima["fasi"]["compilazione"] > 0 and "pubblicazione" in ultima["fasi"]
+        assert set(ultima["byte"]) == {"print", "screen", "mobile"}
+        assert ultima["byte_compilato"] > 0
+        assert ultima["renderer"].startswith("typst-py") and len(ultima["template"]) == 64
+        assert storico[0]["input_hash"] != storico[2]["input_hash"]
+
+        vecchio = await c.get(f"{base}/builds/{prima['build_id']}/pdf")
+        assert vecchio.status_code == 200 and vecchio.content == pdf_prima
+        assert "immutable" in vecchio.headers["cache-control"]
+
+        ripristino = (await c.post(f"{base}/builds/{prima['build_id']}/restore")).json()
+        assert ripristino["status"] == "restored"
+        assert ripristino["build"]["riuso_di"] == prima["build_id"]
+        assert build_history.read_build_info(tmp_path, numero["numero"])["riuso_di"] == prima["build_id"]
+        assert pubblicato.read_bytes() == pdf_prima
+        assert pool.builds == 2
+
+        assert (await c.get(f"{base}/builds/999/pdf")).status_code == 404
+
+
+async def test_retention(client, numero, db, tmp_path, monkeypatch):
+    monkeypatch.setattr(compile_pool, "get_pool", lambda: _InProcessPool())
+    monkeypatch.setenv("GEKO_BUILD_RETENTION", "1")
+    base = f"/api/magazines/{numero['id']}"
+    async with client as c:
+        prima = (await c.post(f"{base}/build")).json()
+        await article_ops.update_article(db, numero["articolo_id"], contenuto_md="Altro.")
+        await c.post(f"{base}/build")
+        # Artefatti della prima build eliminati, la riga resta.
+        assert (await c.get(f"{base}/builds/{prima['build_id']}/pdf")).status_code == 410
+        storico = (await c.get(f"{base}/builds")).json()
+        assert len(storico) == 2 and storico[1]["artefatti"] is None
+    restanti = {p.stem for p in (tmp_path / build_history.ARTIFACTS).glob("*.pdf")}
+    assert restanti == set(storico[0]["artefatti"].values())
+
+
+async def test_retention_non_tocca_artefatti_di_altri_numeri(client, numero, db, tmp_path, monkeypatch):
+    monkeypatch.setattr(compile_pool, "get_pool", lambda: _InProcessPool())
+    monkeypatch.setenv("GEKO_BUILD_RETENTION", "1")
+    # Artefatto appena scritto dalla build di un altro numero, non ancora
+    # registrato (tra store_artifacts e record_build).
+    altro = build_history.artifact_path(tmp_path, "f" * 64)
+    altro.parent.mkdir(parents=True, exist_ok=True)
+    altro.write_bytes(b"altro numero")
+    base = f"/api/magazines/{numero['id']}"
+    async with client as c:
+        await c.post(f"{base}/build")
+        await article_ops.update_article(db, numero["articolo_id"], contenuto_md="Altro.")
+        await c.post(f"{base}/build")
+    assert altro.exists()
@@ -0,0 +1,33 @@
+"""La build compila il sorgente in memoria: typst/generated/ si popola solo su
+richiesta esplicita (GEKO_PERSIST_TYP / `persist_typ`)."""
+
+from app.services import builder as builder_mod
+from app.services.builder import MagazineBuilder
+
+
+def _build(**kwargs):
+    return MagazineBuilder().build_magazine(
+        numero="96", mese="Luglio", anno="2026",
+        articles_typst=["= Titolo\n\nTesto."], **kwargs,
+    )
+
+
+def test_build_non_scrive_typ(tmp_path, monkeypatch):
+    monkeypatch.setattr(builder_mod, "GENERATED_DIR", tmp_path / "generated")
+    monkeypatch.delenv("GEKO_PERSIST_TYP", raising=False)
+    assert _build().exists()
+    assert not (tmp_path / "generated").exists()
+
+
+def test_build_persist_typ(tmp_path, monkeypatch):
+    monkeypatch.setattr(builder_mod, "GENERATED_DIR", tmp_path / "generated")
+    monkeypatch.setenv("GEKO_PERSIST_TYP", "1")
+    _build()
+    src = (tmp_path / "generated" / "geko96.typ").read_text(encoding="utf-8")
+    assert '#import "/typst/src/template.typ": *' in src
+
+
+def test_snippet_senza_file_probe(tmp_path, monkeypatch):
+    monkeypatch.setattr(builder_mod, "GENERATED_DIR", tmp_path / "generated")
+    assert MagazineBuilder().try_compile_snippet("Paragrafo *ok*.") is None
+    assert not (tmp_path / "generated").exists()
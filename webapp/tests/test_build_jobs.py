@@ -0,0 +1,107 @@
+"""Build dello stesso numero coalescenti: la più recente annulla le altre e
+l'output si pubblica con rename atomici solo se ancora attuale."""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.database import get_db
+from app.main import app
+from app.services import article_ops, build_jobs, builder, compile_pool
+from app.services.compile_pool import CompileCancelled
+
+
+def _scrivi(ticket, contenuto: bytes):
+    (ticket.staging_dir / f"geko{ticket.numero}.pdf").write_bytes(contenuto)
+
+
+def test_build_piu_recente_annulla_la_precedente(tmp_path):
+    vecchia = build_jobs.begin("50", tmp_path)
+    nuova = build_jobs.begin("50", tmp_path)
+    assert vecchia.superseded and not nuova.superseded
+    assert vecchia.staging_dir != nuova.staging_dir
+
+    _scrivi(vecchia, b"vecchia")
+    assert not build_jobs.publish(vecchia, tmp_path)
+    assert not (tmp_path / "geko50.pdf").exists()
+    build_jobs.finish(vecchia)
+    assert not vecchia.staging_dir.exists()
+
+    _scrivi(nuova, b"nuova")
+    assert build_jobs.publish(nuova, tmp_path)
+    assert (tmp_path / "geko50.pdf").read_bytes() == b"nuova"
+    build_jobs.finish(nuova)
+    assert not nuova.staging_dir.exists()
+    assert "50" not in build_jobs._latest
+
+
+def test_numeri_diversi_indipendenti(tmp_path):
+    a = build_jobs.begin("51", tmp_path)
+    b = build_jobs.begin("52", tmp_path)
+    assert not a.superseded and not b.superseded
+    build_jobs.finish(a)
+    build_jobs.finish(b)
+
+
+def test_clear_staging(tmp_path):
+    ticket = build_jobs.begin("53", tmp_path)
+    build_jobs.finish(ticket)
+    (tmp_path / ".staging" / "avanzo").mkdir(parents=True)
+    build_jobs.clear_staging(tmp_path)
+    assert not (tmp_path / ".staging").exists()
+
+
+class _FakePool:
+    """Pool finto: la "build" scrive nello staging; `durante` simula una
+    richiesta che arriva mentre la build è in corso."""
+
+    def __init__(self, durante=None):
+        self.durante = durante
+
+    async def run(self, fn, *args, output_dir=None, cancel=None, **kwargs):
+        (output_dir / f"geko{kwargs['numero']}.pdf").write_bytes(b"%PDF-1.4 nuova")
+        if self.durante:
+            self.durante(kwargs["numero"])
+        if cancel is not None and cancel.is_set():
+            raise CompileCancelled("compilazione annullata")
+        return output_dir / f"geko{kwargs['numero']}.pdf"
+
+
+@pytest.fixture
+async def numero_con_articolo(db, sample_magazine):
+    art = await article_ops.create_article(db, titolo="T", contenuto_md="Testo.")
+    await article_ops.assign_article(db, art["id"], [sample_magazine["id"]])
+    return sample_magazine
+
+
+@pytest.fixture
+def client(db, tmp_path, monkeypatch):
+    async def _override():
+        yield db
+
+    monkeypatch.setattr(builder, "OUTPUT_DIR", tmp_path)
+    app.dependency_overrides[get_db] = _override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+async def test_api_pubblica_dallo_staging(client, numero_con_articolo, tmp_path, monkeypatch):
+    monkeypatch.setattr(compile_pool, "get_pool", lambda: _FakePool())
+    async with client as c:
+        resp = await c.post(f"/api/magazines/{numero_con_articolo['id']}/build")
+    assert resp.json()["status"] == "success"
+    assert (tmp_path / f"geko{numero_con_articolo['numero']}.pdf").read_bytes() == b"%PDF-1.4 nuova"
+    assert not list((tmp_path / ".staging").iterdir())
+
+
+async def test_api_build_superata(client, numero_con_articolo, tmp_path, monkeypatch):
+    pdf = tmp_path / f"geko{numero_con_articolo['numero']}.pdf"
+    pdf.write_bytes(b"%PDF-1.4 pubblicata")
+    nuove = []
+    pool = _FakePool(durante=lambda numero: nuove.append(build_jobs.begin(numero, tmp_path)))
+    monkeypatch.setattr(compile_pool, "get_pool", lambda: pool)
+    async with client as c:
+        resp = await c.post(f"/api/magazines/{numero_con_articolo['id']}/build")
+    assert resp.json()["status"] == "superseded"
+    # Il PDF pubblicato non è stato toccato dalla build superata.
+    assert pdf.read_bytes() == b"%PDF-1.4 pubblicata"
+    build_jobs.finish(nuove[0])
@@ -0,0 +1,89 @@
+"""Build a shard: stesso numero di pagine e numerazione della build monolitica,
+sommario precalcolato con le pagine di inizio degli articoli."""
+
+from pypdf import PdfReader
+
+from app.services.builder import MagazineBuilder
+from app.services.md_render import generate_article_typst
+
+
+def _articoli(n: int) -> list[str]:
+    return [
+        generate_article_typst(
+            titolo=f"Articolo {i}", sottotitolo=None, autore="IK2XYZ", nome=None,
+            contenuto_md=("Testo di prova in vetta. " * 250 + "\n\n") * (i + 1),
+        )
+        for i in range(n)
+    ]
+
+
+def test_build_sharded_equivale_alla_monolitica(monkeypatch):
+    monkeypatch.setenv("GEKO_BUILD_WORKERS", "2")
+    b = MagazineBuilder()
+    kwargs = dict(
+        numero="94", mese="Luglio", anno="2026", articles_typst=_articoli(3),
+        team_membri=[{"nominativo": "IK2ABC", "nome": "Mario", "ruolo": "Presidente"}],
+    )
+    mono = [p.extract_text() for p in PdfReader(b.build_magazine(**kwargs, sharded=False)).pages]
+    shard = [p.extract_text() for p in PdfReader(b.build_magazine(**kwargs, sharded=True)).pages]
+
+    assert len(shard) == len(mono)
+    # Stesso box numero pagina in testata (pagina logo, articoli, team, finale)
+    for m, s in zip(mono[1:], shard[1:]):
+        assert m.split("\n")[0] == s.split("\n")[0]
+    # Sommario: ogni articolo col numero della sua prima pagina
+    sommario = shard[1]
+    for i in range(3):
+        pagina = next(n for n, t in enumerate(shard, 1) if f"ARTICOLO {i}" in t)
+        riga = next(r for r in sommario.split("\n") if r.startswith(f"Articolo {i}"))
+        assert riga.rstrip().endswith(str(pagina))
+
+
+def test_front_matter_che_non_converge_ripiega_sulla_monolitica(monkeypatch, caplog):
+    """Offset mai stabili: niente unione di shard sbagliati, build monolitica."""
+    import io
+    from concurrent.futures import ThreadPoolExecutor
+
+    from pypdf import PdfWriter
+
+    from app.services import builder as builder_mod, sharded_build
+
+    def _pdf(pagine: int) -> bytes:
+        writer = PdfWriter()
+        for _ in range(pagine):
+            writer.add_blank_page(width=100, height=100)
+        buf = io.BytesIO()
+        writer.write(buf)
+        return buf.getvalue()
+
+    compilazioni_front = []
+
+    def _compile(source: str) -> bytes:
+        if "FRONT" in source:
+            compilazioni_front.append(source)
+            return _pdf(2 + len(compilazioni_front))  # cresce a ogni passata
+        return _pdf(1)
+
+    class _Builder:
+        def _front_matter(self, **kwargs):
+            return "FRONT"
+
+        def _main_setup(self, *args):
+            return ""
+
+        def _back_matter(self, *args, **kwargs):
+            return "BACK"
+
+        def _generate_document(self, **kwargs):
+            return "MONOLITICO"
+
+    monkeypatch.setattr(sharded_build, "_compile_shard", _compile)
+    monkeypatch.setattr(sharded_build, "ProcessPoolExecutor",
+                        lambda max_workers, mp_context: ThreadPoolExecutor(max_workers))
+    monkeypatch.setattr(builder_mod, "compile_source", lambda source: source.encode())
+
+    pdf = sharded_build.build_sharded(
+        _Builder(), numero="94", mese="Luglio", anno="2026", articles=["a", "b"])
+    assert pdf == b"MONOLITICO"
+    assert len(compilazioni_front) == 1 + sharded_build._MAX_PASSATE
+    assert any(r.levelname == "WARNING" and "monolitica" in r.getMessage() for r in caplog.records)
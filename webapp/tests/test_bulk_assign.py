@@ -0,0 +1,129 @@
+"""Riordino con un solo UPDATE e assegnazioni in blocco articoli ↔ numeri."""
+
+import re
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, select
+
+from app.database import get_db
+from app.main import app
+from app.models import Magazine, MagazineStatus, article_magazines
+from app.services import article_ops
+
+
+async def _numeri(db, *numeri) -> list[int]:
+    mags = [Magazine(numero=n, mese="Marzo", anno="2026", stato=MagazineStatus.BOZZA)
+            for n in numeri]
+    db.add_all(mags)
+    await db.commit()
+    return [m.id for m in mags]
+
+
+async def _articoli(db, n: int) -> list[int]:
+    return [(await article_ops.create_article(db, titolo=f"A{i}", contenuto_md="x"))["id"]
+            for i in range(n)]
+
+
+async def _ordine(db, magazine_id: int) -> list[int]:
+    return list((await db.execute(
+        select(article_magazines.c.article_id)
+        .where(article_magazines.c.magazine_id == magazine_id)
+        .order_by(article_magazines.c.ordine)
+    )).scalars())
+
+
+@pytest.fixture
+def statements(db):
+    eseguite = []
+    engine = db.bind.sync_engine
+
+    def _count(conn, cursor, statement, *args):
+        eseguite.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    yield eseguite
+    event.remove(engine, "before_cursor_execute", _count)
+
+
+async def test_bulk_assign_e_sposta(db, statements):
+    uno, due = await _numeri(db, "1", "2")
+    arts = await _articoli(db, 30)
+
+    statements.clear()
+    assert await article_ops.bulk_assign(db, arts, aggiungi=[uno]) == {"aggiunti": 30, "rimossi": 0}
+    # Verifica id + esistenti + ordine massimo + un INSERT executemany.
+    assert sum(s.lstrip().upper().startswith("INSERT") for s in statements) == 1
+    assert await _ordine(db, uno) == arts
+
+    # Ripetere non duplica; spostare i primi 5 nel numero 2 in una transazione.
+    assert (await article_ops.bulk_assign(db, arts, aggiungi=[uno]))["aggiunti"] == 0
+    assert await article_ops.bulk_assign(db, arts[:5], aggiungi=[due], rimuovi=[uno]) == {
+        "aggiunti": 5, "rimossi": 5}
+    assert await _ordine(db, uno) == arts[5:]
+    assert await _ordine(db, due) == arts[:5]
+
+
+async def test_bulk_assign_id_inesistenti(db):
+    (uno,) = await _numeri(db, "1")
+    arts = await _articoli(db, 2)
+    with pytest.raises(ValueError, match="Numeri non trovati: 999"):
+        await article_ops.bulk_assign(db, arts, aggiungi=[uno, 999])
+    with pytest.raises(ValueError, match="Articoli non trovati"):
+        await article_ops.bulk_assign(db, arts + [12345], aggiungi=[uno])
+    assert await _ordine(db, uno) == []
+
+
+async def test_reorder_un_solo_update(db, statements):
+    (uno,) = await _numeri(db, "1")
+    arts = await _articoli(db, 20)
+    await article_ops.bulk_assign(db, arts, aggiungi=[uno])
+
+    statements.clear()
+    nuovo = list(reversed(arts)) + [99999]  # id estraneo: ignorato
+    assert await article_ops.reorder_articles(db, uno, nuovo) == 20
+    # Un solo UPDATE sulla tabella ponte (più quello di updated_at del numero).
+    assert sum(bool(re.match(r"\s*UPDATE\s+article_magazines", s)) for s in statements) == 1
+    assert await _ordine(db, uno) == list(reversed(arts))
+    assert await article_ops.reorder_articles(db, 424242, arts) is None
+
+
+async def test_assign_article_mantiene_posizione(db):
+    uno, due = await _numeri(db, "1", "2")
+    a, b = await _articoli(db, 2)
+    await article_ops.bulk_assign(db, [a, b], aggiungi=[uno])
+    await article_ops.reorder_articles(db, uno, [b, a])
+    # Aggiungere il numero 2 non sposta l'articolo nel numero 1.
+    art = await article_ops.assign_article(db, a, [uno, due])
+    assert sorted(m["id"] for m in art["magazines"]) == [uno, due]
+    assert await _ordine(db, uno) == [b, a]
+
+
+@pytest.fixture
+def client(db):
+    async def _override():
+        yield db
+
+    app.dependency_overrides[get_db] = _override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+async def test_api_bulk_assign_e_reorder(client, db):
+    uno, due = await _numeri(db, "1", "2")
+    arts = await _articoli(db, 3)
+    async with client as c:
+        resp = await c.post("/api/articles/bulk-assign", json={
+            "article_ids": arts, "add_magazine_ids": [uno, due]})
+        assert resp.json() == {"aggiunti": 6, "rimossi": 0}
+        resp = await c.post("/api/articles/bulk-assign", json={
+            "article_ids": arts, "add_magazine_ids": [777]})
+        assert resp.status_code == 400
+
+        resp = await c.post(f"/api/magazines/{uno}/articles/reorder",
+                            json={"article_ids": [arts[2], arts[0], arts[1]]})
+        assert resp.json() == {"status": "reordered", "updated": 3}
+        toc = (await c.get(f"/api/magazines/{uno}/articles")).json()
+        assert [a["id"] for a in toc] == [arts[2], arts[0], arts[1]]
+        assert (await c.post("/api/magazines/999/articles/reorder",
+                             json={"article_ids": arts})).status_code == 404
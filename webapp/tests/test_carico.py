@@ -0,0 +1,42 @@
+"""Harness di carico (bench.carico) su un archivio sintetico minimo."""
+
+import httpx
+from fastmcp import Client
+
+from app.database import get_db
+from app.main import app
+from app.mcp import server as server_mod
+from app.services import article_ops
+from bench.carico import collega_dataset, esegui_carico, formatta, percentile, prepara, report
+from bench.dataset import genera
+
+
+def test_percentile_nearest_rank():
+    valori = [float(v) for v in range(1, 101)]
+    assert (percentile(valori, 50), percentile(valori, 95), percentile(valori, 99)) == (50, 95, 99)
+    assert percentile([3.0], 99) == 3.0 and percentile([], 50) == 0.0
+
+
+async def test_carico_misto_in_process(tmp_path):
+    genera(tmp_path, numeri=3, articoli=12, immagini=20, scala=0.02, varianti=1)
+    uploads_prima = article_ops.UPLOADS_DIR
+
+    async with collega_dataset(tmp_path) as asgi_app:
+        transport = httpx.ASGITransport(app=asgi_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://carico") as client:
+            ctx = await prepara(client, tmp_path)
+            misure, lag, durata = await esegui_carico(
+                ctx, editori=2, agenti=1, durata=0.5,
+                mcp_client=lambda: Client(server_mod.mcp), pesi={"articoli": 2})
+
+    rep = report(misure, lag, durata, slo={"numeri": (1e6, 1e6)})
+    ops = rep["operazioni"]
+    assert {"numeri", "mcp_leggi"} & set(ops)
+    assert all(o["errori"] == 0 for o in ops.values()), formatta(rep)
+    assert ops.get("numeri", {"slo_ms": [1e6, 1e6]})["slo_ms"] == [1e6, 1e6]
+    assert rep["richieste"] == sum(o["richieste"] for o in ops.values()) > 0
+    assert rep["lag_ms"]["max"] >= rep["lag_ms"]["p50"]
+
+    # Lo stato dell'app torna quello di prima.
+    assert get_db not in app.dependency_overrides
+    assert article_ops.UPLOADS_DIR == uploads_prima
@@ -0,0 +1,98 @@
+"""Pool di worker di compilazione: timeout, tetto di memoria, crash e riciclo
+si traducono in errori puliti e il pool resta utilizzabile."""
+
+import os
+import threading
+import time
+
+import pytest
+
+from app.services.builder import MagazineBuilder, build_magazine_pdf
+from app.services.compile_pool import (
+    CompileCancelled,
+    CompileError,
+    CompilePool,
+    CompileTimeout,
+    CompileWorkerCrash,
+)
+
+
+@pytest.fixture
+def pool():
+    p = CompilePool(workers=1, timeout=5, mem_mb=512, max_jobs=50)
+    yield p
+    p.shutdown()
+
+
+def test_build_nel_worker(pool):
+    path = pool.call(build_magazine_pdf, numero="98", mese="Luglio", anno="2026",
+                     articles_typst=["= Titolo\n\nTesto."])
+    assert path.read_bytes().startswith(b"%PDF")
+
+
+def test_errore_typst_riportato(pool):
+    msg = pool.call(MagazineBuilder().try_compile_snippet, "#let x = ")
+    assert msg  # try_compile_snippet ritorna il messaggio, non solleva
+    with pytest.raises(CompileError):
+        pool.call(int, "non un numero")
+
+
+def test_timeout_uccide_il_worker(pool):
+    pool.timeout = 0.5
+    t = time.monotonic()
+    with pytest.raises(CompileTimeout):
+        pool.call(time.sleep, 30)
+    assert time.monotonic() - t < 10
+    pool.timeout = 5
+    assert pool.call(sum, [1, 2]) == 3  # worker nuovo al posto di quello ucciso
+
+
+def test_tetto_memoria(pool):
+    with pytest.raises(CompileError, match="MemoryError"):
+        pool.call(bytearray, 2 * 1024 ** 3)
+    assert pool.call(sum, [1]) == 1
+
+
+def test_crash_worker(pool):
+    with pytest.raises(CompileWorkerCrash):
+        pool.call(os._exit, 3)
+    assert pool.call(sum, [2]) == 2
+
+
+def test_riciclo_dopo_max_jobs():
+    p = CompilePool(workers=1, timeout=5, mem_mb=0, max_jobs=2)
+    try:
+        pids = [p.call(os.getpid) for _ in range(3)]
+    finally:
+        p.shutdown()
+    assert pids[0] == pids[1] != pids[2]
+    assert os.getpid() not in pids
+
+
+def test_annullamento_uccide_il_worker(pool):
+    cancel = threading.Event()
+    threading.Timer(0.3, cancel.set).start()
+    t = time.monotonic()
+    with pytest.raises(CompileCancelled):
+        pool.call(time.sleep, 30, cancel=cancel)
+    assert time.monotonic() - t < 10
+    # Già annullato: non parte nemmeno.
+    with pytest.raises(CompileCancelled):
+        pool.call(sum, [1], cancel=cancel)
+    assert pool.call(sum, [1, 2], cancel=threading.Event()) == 3
+
+
+def test_annullamento_in_coda(pool):
+    # L'unico worker è occupato: il lavoro in coda, annullato, esce subito
+    # senza aspettare lo slot e senza toccare il lavoro in corso.
+    occupato = threading.Thread(target=pool.call, args=(time.sleep, 1.5))
+    occupato.start()
+    time.sleep(0.3)
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    t = time.monotonic()
+    with pytest.raises(CompileCancelled):
+        pool.call(sum, [1], cancel=cancel)
+    assert time.monotonic() - t < 1.0
+    occupato.join()
+    assert pool.call(sum, [1, 2]) == 3
@@ -0,0 +1,119 @@
+"""Compressione brotli/gzip delle risposte e asset Svelte precompressi."""
+
+import brotli
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.responses import StreamingResponse
+from starlette.routing import Mount, Route
+
+from app.database import get_db
+from app.main import app
+from app.services import article_ops, response_cache
+from app.services.compression import (
+    IMMUTABLE, CompressionMiddleware, PrecompressedStaticFiles, precompress, scegli_codifica,
+)
+
+
+@pytest.fixture
+def client(db):
+    async def _override():
+        yield db
+
+    response_cache.invalidate()
+    app.dependency_overrides[get_db] = _override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+def test_negoziazione():
+    assert scegli_codifica("gzip, deflate, br") == "br"
+    assert scegli_codifica("gzip") == "gzip"
+    assert scegli_codifica("br;q=0.5, gzip;q=0.8") == "gzip"
+    assert scegli_codifica("*") == "br"
+    assert scegli_codifica("br;q=0, *;q=0.1") == "gzip"
+    assert scegli_codifica("identity") is None and scegli_codifica(None) is None
+
+
+async def test_api_compressa(client, db):
+    await article_ops.create_article(db, titolo="QMX", contenuto_md="## Antenna\n\n" + "testo " * 2000)
+    async with client as c:
+        for codifica in ("br", "gzip"):
+            resp = await c.get("/api/articles", headers={"Accept-Encoding": codifica})
+            assert resp.headers["content-encoding"] == codifica
+            assert "Accept-Encoding" in resp.headers["vary"]
+            assert int(resp.headers["content-length"]) * 5 < len(resp.content)
+            assert resp.json()[0]["titolo"] == "QMX"
+
+        tag = resp.headers["etag"]
+        resp = await c.get("/api/articles", headers={"Accept-Encoding": "br", "If-None-Match": tag})
+        assert resp.status_code == 304
+
+        resp = await c.get("/api/articles", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in resp.headers
+        # Sotto soglia: non compressa.
+        resp = await c.get("/api/config/nonesiste", headers={"Accept-Encoding": "br"})
+        assert "content-encoding" not in resp.headers
+
+
+async def test_streaming_compresso():
+    async def _righe():
+        for i in range(200):
+            yield f"riga {i} del log di build\n".encode()
+
+    async def _log(request):
+        return StreamingResponse(_righe(), media_type="text/plain")
+
+    mini = CompressionMiddleware(Starlette(routes=[Route("/log", _log)]))
+    async with AsyncClient(transport=ASGITransport(app=mini), base_url="http://test") as c:
+        resp = await c.get("/log", headers={"Accept-Encoding": "br"})
+    assert resp.headers["content-encoding"] == "br" and "content-length" not in resp.headers
+    assert resp.text.splitlines()[-1] == "riga 199 del log di build"
+
+
+async def test_asset_precompressi(tmp_path):
+    immutable = tmp_path / "immutable" / "chunks"
+    immutable.mkdir(parents=True)
+    js = "export const a = 1;\n" * 500
+    (immutable / "app.Ab12.js").write_text(js)
+    (tmp_path / "version.json").write_text('{"version": "1"}')
+    (tmp_path / "logo.png").write_bytes(b"\x89PNG" + b"\0" * 4000)
+
+    assert precompress(tmp_path) == 2  # .br e .gz del JS; il resto è piccolo o binario
+    assert brotli.decompress((immutable / "app.Ab12.js.br").read_bytes()).decode() == js
+    assert precompress(tmp_path) == 0  # già aggiornati
+
+    statici = Starlette(routes=[Mount("/_app", PrecompressedStaticFiles(directory=tmp_path))])
+    async with AsyncClient(transport=ASGITransport(app=statici), base_url="http://test") as c:
+        resp = await c.get("/_app/immutable/chunks/app.Ab12.js", headers={"Accept-Encoding": "gzip, br"})
+        assert resp.headers["content-encoding"] == "br"
+        assert resp.headers["content-type"].startswith(("text/javascript", "application/javascript"))
+        assert resp.headers["cache-control"] == IMMUTABLE and resp.text == js
+        tag = resp.headers["etag"]
+        resp = await c.get("/_app/immutable/chunks/app.Ab12.js",
+                           headers={"Accept-Encoding": "br", "If-None-Match": tag})
+        assert resp.status_code == 304
+
+        resp = await c.get("/_app/immutable/chunks/app.Ab12.js", headers={"Accept-Encoding": "identity"})
+        assert "content-encoding" not in resp.headers and resp.text == js
+
+        resp = await c.get("/_app/version.json", headers={"Accept-Encoding": "br"})
+        assert resp.headers["cache-control"] == "no-cache" and "content-encoding" not in resp.headers
+
+
+async def test_streaming_piccolo_non_compresso():
+    messaggi = []
+
+    async def _app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200,
+                    "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b'{"a":', "more_body": True})
+        await send({"type": "http.response.body", "body": b"1}"})
+
+    async def _send(message):
+        messaggi.append(message)
+
+    scope = {"type": "http", "method": "GET", "headers": [(b"accept-encoding", b"br")]}
+    await CompressionMiddleware(_app)(scope, None, _send)
+    assert [m["type"] for m in messaggi] == ["http.response.start", "http.response.body"]
+    assert messaggi[1] == {"type": "http.response.body", "body": b'{"a":1}'}
@@ -0,0 +1,59 @@
+"""Generatore dell'archivio sintetico (bench.dataset) in piccolo."""
+
+import sqlite3
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from app.services import article_ops
+from app.services.md_validate import has_errors, validate_markdown
+from app.services.media_index import MediaIndex
+from bench.dataset import genera
+
+
+def _piccolo(out, **kw):
+    return genera(out, numeri=4, articoli=30, immagini=60, scala=0.02, varianti=1, **kw)
+
+
+async def test_archivio_coerente(tmp_path):
+    stats = _piccolo(tmp_path)
+    assert (stats["numeri"], stats["articoli"], stats["immagini"]) == (4, 30, 60)
+
+    con = sqlite3.connect(tmp_path / "geko.db")
+    assert con.execute("SELECT count(*) FROM images WHERE size_bytes IS NULL").fetchone() == (0,)
+    assert con.execute("SELECT stato FROM magazines ORDER BY id").fetchall()[-1] == ("BOZZA",)
+    path, sha = con.execute("SELECT path, sha256 FROM images LIMIT 1").fetchone()
+    con.close()
+
+    # Media library reale, con hardlink ai segnaposto e metadati coerenti.
+    uploads = tmp_path / "uploads"
+    index = MediaIndex(uploads)
+    assert index.scan() == 60
+    assert index.digest(path) == sha
+
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'geko.db'}")
+    async with async_sessionmaker(engine, class_=AsyncSession)() as db:
+        articoli = await article_ops.list_articles(db)
+    await engine.dispose()
+    assert len(articoli) == 30
+    for art in articoli:
+        problemi = validate_markdown(art["contenuto_md"], article_ops.article_image_base(art["id"]),
+                                     uploads_dir=uploads)
+        assert not has_errors(problemi), problemi
+
+
+def test_deterministico_e_non_sovrascrive(tmp_path):
+    _piccolo(tmp_path / "a", media="none")
+    _piccolo(tmp_path / "b", media="none")
+    assert not (tmp_path / "a" / "uploads").exists()
+    testi = [
+        sqlite3.connect(tmp_path / d / "geko.db")
+        .execute("SELECT titolo, contenuto_md FROM articles ORDER BY id").fetchall()
+        for d in ("a", "b")
+    ]
+    assert testi[0] == testi[1]
+    assert any("> [!" in md for _, md in testi[0])
+
+    with pytest.raises(FileExistsError):
+        _piccolo(tmp_path / "a", media="none")
+    _piccolo(tmp_path / "a", media="none", seed=7, sovrascrivi=True)
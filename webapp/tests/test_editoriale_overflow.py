@@ -1,7 +1,6 @@
 """Regressione layout: un editoriale lungo non deve essere troncato in copertina,
 ma proseguire su una pagina dedicata (teaser + "continua a pag. N")."""
 
-import uuid
 from pathlib import Path
 
 import typst
@@ -9,15 +8,12 @@ import typst
 WEBAPP_DIR = Path(__file__).resolve().parent.parent
 REPO_DIR = WEBAPP_DIR.parent
 PKG_PATH = WEBAPP_DIR / "typst" / "packages"
-GEN_DIR = WEBAPP_DIR / "typst" / "generated"
 
 
 def _pagine_copertina(editoriale: str) -> int:
-    """Compila una copertina (seguita da una pagina segnaposto) col dato
-    editoriale e ritorna il numero di pagine renderizzate."""
-    GEN_DIR.mkdir(parents=True, exist_ok=True)
-    doc = GEN_DIR / f"_edit_{uuid.uuid4().hex}.typ"
-    doc.write_text(
+    """Compila in memoria una copertina (seguita da una pagina segnaposto) col
+    dato editoriale e ritorna il numero di pagine renderizzate."""
+    doc = (
         '#import "/template.typ": *\n'
         '#copertina(\n'
         '  numero: "1", mese: "Luglio", anno: "2026",\n'
@@ -27,17 +23,13 @@ def _pagine_copertina(editoriale: str) -> int:
         '  editoriale-autore: "IK2ABC",\n'
         ')\n'
         # pagina segnaposto: "consuma" il pagebreak finale della copertina
-        '#pagina-logo(numero: "1", mese: "Luglio", anno: "2026")\n',
-        encoding="utf-8",
+        '#pagina-logo(numero: "1", mese: "Luglio", anno: "2026")\n'
     )
-    try:
-        pages = typst.compile(
-            str(doc), root=str(REPO_DIR), package_path=str(PKG_PATH),
-            format="png", ppi=72,
-        )
-        return len(pages)
-    finally:
-        doc.unlink(missing_ok=True)
+    pages = typst.compile(
+        doc.encode("utf-8"), root=str(REPO_DIR), package_path=str(PKG_PATH),
+        format="png", ppi=72,
+    )
+    return len(pages)
 
 
 def test_editoriale_corto_non_aggiunge_pagine():
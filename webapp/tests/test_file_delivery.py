@@ -0,0 +1,87 @@
+"""Consegna di PDF e media: validatori, Range, zero-copy e offload (file_delivery)."""
+
+import os
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from starlette.applications import Starlette
+from starlette.routing import Mount, Route
+
+from app.services.file_delivery import SendfileResponse, SendfileStaticFiles
+from bench.consegna import misura
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "output" / "geko99.pdf"
+    path.parent.mkdir()
+    path.write_bytes(os.urandom(300_000))
+    return path
+
+
+def _client(path):
+    async def _pdf(request):
+        return SendfileResponse(path, media_type="application/pdf", filename=path.name)
+
+    app = Starlette(routes=[
+        Route("/pdf", _pdf),
+        Mount("/uploads", SendfileStaticFiles(directory=path.parent)),
+    ])
+    return AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+
+
+async def test_validatori_e_range(pdf):
+    dati = pdf.read_bytes()
+    async with _client(pdf) as c:
+        resp = await c.get("/pdf")
+        assert resp.content == dati and resp.headers["accept-ranges"] == "bytes"
+        tag = resp.headers["etag"]
+        assert (await c.get("/pdf", headers={"If-None-Match": tag})).status_code == 304
+        modificato = resp.headers["last-modified"]
+        assert (await c.get("/pdf", headers={"If-Modified-Since": modificato})).status_code == 304
+
+        parte = await c.get("/pdf", headers={"Range": "bytes=1000-1999"})
+        assert parte.status_code == 206 and parte.content == dati[1000:2000]
+
+        media = await c.get("/uploads/geko99.pdf", headers={"If-None-Match": tag})
+        assert media.status_code == 304
+
+
+async def test_zerocopysend(pdf):
+    dati = pdf.read_bytes()
+    for intervallo, atteso in ((None, (200, 0, len(dati))), ("bytes=10-99", (206, 10, 90))):
+        messaggi = []
+        headers = [(b"range", intervallo.encode())] if intervallo else []
+        scope = {"type": "http", "method": "GET", "headers": headers, "asgi": {"spec_version": "2.4"},
+                 "extensions": {"http.response.zerocopysend": {}}}
+
+        async def send(message):
+            if message["type"] == "http.response.zerocopysend":
+                message = {**message, "file": message["file"].fileno() > 0}
+            messaggi.append(message)
+
+        await SendfileResponse(pdf)(scope, None, send)
+        inizio, corpo = messaggi
+        assert (inizio["status"], corpo["offset"], corpo["count"]) == atteso
+        assert corpo["type"] == "http.response.zerocopysend" and corpo["file"]
+
+
+async def test_offload(pdf, monkeypatch):
+    monkeypatch.setenv("GEKO_SENDFILE_HEADER", "X-Accel-Redirect")
+    monkeypatch.setenv("GEKO_SENDFILE_ROOT", str(pdf.parent.parent))
+    async with _client(pdf) as c:
+        resp = await c.get("/pdf")
+        assert resp.headers["x-accel-redirect"] == "/_protected/output/geko99.pdf"
+        assert resp.content == b"" and "content-length" not in resp.headers
+        assert resp.headers["content-disposition"] == 'attachment; filename="geko99.pdf"'
+
+        monkeypatch.setenv("GEKO_SENDFILE_HEADER", "X-Sendfile")
+        resp = await c.get("/uploads/geko99.pdf")
+        assert resp.headers["x-sendfile"] == str(pdf.resolve())
+
+
+def test_benchmark_consegna(pdf):
+    for modalita in ("blocchi", "zerocopy"):
+        r = misura(pdf, modalita, concorrenti=2, giri=1)
+        assert r["byte_dall_app"] == 2 * pdf.stat().st_size and r["cpu_s_per_gb"] >= 0
+    assert misura(pdf, "offload", concorrenti=2, giri=1)["byte_dall_app"] == 0
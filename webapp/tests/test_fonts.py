@@ -0,0 +1,76 @@
+"""Font di progetto: manifest, esclusione dei font di sistema, ripieghi e
+build riproducibili."""
+
+import hashlib
+import json
+import shutil
+
+import pytest
+import typst
+
+from app.services import builder, fonts
+
+
+def _dejavu_serif():
+    for f in typst.Fonts().fonts():
+        if f.family == "DejaVu Serif" and f.style == "normal" and f.weight == 400 and f.path:
+            return f.path
+    pytest.skip("DejaVu Serif non installato (fonts-dejavu-core)")
+
+
+def _manifest(tmp_path, **kwargs):
+    path = tmp_path / "manifest.json"
+    path.write_text(json.dumps(kwargs), encoding="utf-8")
+    return path
+
+
+def test_font_dir_isolata(tmp_path, monkeypatch):
+    src = _dejavu_serif()
+    shutil.copy(src, tmp_path / "DejaVuSerif.ttf")
+    digest = hashlib.sha256((tmp_path / "DejaVuSerif.ttf").read_bytes()).hexdigest()
+    monkeypatch.setenv("GEKO_FONT_DIR", str(tmp_path))
+    monkeypatch.setenv("GEKO_IGNORE_SYSTEM_FONTS", "1")
+    manifest = _manifest(
+        tmp_path,
+        famiglie=[{"famiglia": "DejaVu Serif"}],
+        file=[{"nome": "DejaVuSerif.ttf", "sha256": digest}],
+        caratteri="àé€°",
+    )
+    report = fonts.check_fonts(manifest)
+    assert report["ok"], report
+    assert report["ignora_font_di_sistema"]
+
+
+def test_problemi_riportati(tmp_path, monkeypatch):
+    monkeypatch.setenv("GEKO_FONT_DIR", str(tmp_path))
+    monkeypatch.setenv("GEKO_IGNORE_SYSTEM_FONTS", "1")
+    (tmp_path / "Rotto.ttf").write_bytes(b"non un font")
+    manifest = _manifest(
+        tmp_path,
+        famiglie=[{"famiglia": "Font Inesistente"}],
+        file=[{"nome": "Assente.ttf"}, {"nome": "Rotto.ttf", "sha256": "00" * 32}],
+        caratteri="a",
+    )
+    report = fonts.check_fonts(manifest)
+    assert not report["ok"]
+    assert report["file_mancanti"] == ["Assente.ttf"]
+    assert report["checksum_errati"] == ["Rotto.ttf"]
+    assert report["famiglie_mancanti"] == ["Font Inesistente"]
+    # senza font di sistema "a" finisce su un font incorporato in typst
+    assert [r["carattere"] for r in report["ripieghi"]] == ["a"]
+
+
+def test_manifest_illeggibile_non_solleva(tmp_path):
+    report = fonts.check_fonts(tmp_path / "manca.json")
+    assert not report["ok"] and report["errore"]
+
+
+def test_manifest_versionato_valido():
+    manifest = fonts.load_manifest(fonts.DEFAULT_FONT_DIR / fonts.MANIFEST_NAME)
+    assert manifest["famiglie"] and manifest["file"] and manifest["caratteri"]
+
+
+def test_build_riproducibile(monkeypatch):
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1767225600")
+    doc = builder._PREAMBLE + "= Titolo\n\nTesto riproducibile."
+    assert builder.compile_source(doc) == builder.compile_source(doc)
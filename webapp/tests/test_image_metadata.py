@@ -0,0 +1,100 @@
+"""Metadati delle immagini estratti all'upload e migrazione di backfill."""
+
+import io
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from PIL import Image as PILImage
+from sqlalchemy import create_engine, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.database import backfill_image_metadata, get_db, run_migrations
+from app.main import app
+from app.services import article_ops
+from app.services.media_index import pixel_size
+
+
+def _jpeg(size=(40, 30), orientation=None) -> bytes:
+    buf = io.BytesIO()
+    img = PILImage.new("RGB", size, (200, 100, 0))
+    exif = PILImage.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    img.save(buf, "JPEG", exif=exif.tobytes())
+    return buf.getvalue()
+
+
+def test_pixel_size_con_orientamento_exif():
+    assert pixel_size(_jpeg()) == (40, 30, 1)
+    # Scattata in verticale: impaginata ruotata di 90°.
+    assert pixel_size(_jpeg(orientation=6)) == (30, 40, 6)
+    assert pixel_size(b"<svg xmlns='http://www.w3.org/2000/svg'/>") == (None, None, 1)
+
+
+async def test_upload_salva_metadati_e_lista_dal_db(db, tmp_path, monkeypatch):
+    monkeypatch.setattr(article_ops, "UPLOADS_DIR", tmp_path / "uploads")
+    art = await article_ops.create_article(db, titolo="QMX", contenuto_md="x")
+    data = _jpeg(orientation=8)
+    await article_ops.save_article_image(db, art["id"], "verticale.jpg", data)
+
+    (tmp_path / "uploads" / "articoli" / str(art["id"]) / "verticale.jpg").unlink()
+    (img,) = await article_ops.list_article_images(db, art["id"])
+    # Dal database: il file non serve più.
+    assert img["bytes"] == len(data)
+    assert (img["mime"], img["larghezza"], img["altezza"]) == ("image/jpeg", 30, 40)
+
+
+async def test_migrazione_aggiunge_colonne_e_backfill(tmp_path):
+    foto = tmp_path / "foto.jpg"
+    foto.write_bytes(_jpeg(size=(16, 8)))
+    engine = create_engine(f"sqlite:///{tmp_path / 'vecchio.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE images (id INTEGER PRIMARY KEY, filename VARCHAR(255),"
+            " original_filename VARCHAR(255), path VARCHAR(500), alt_text TEXT,"
+            " article_id INTEGER, uploaded_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO images (filename, original_filename, path) VALUES"
+            " ('persa.jpg', 'persa.jpg', :q), ('foto.jpg', 'foto.jpg', :p)"
+        ), {"p": str(foto), "q": str(tmp_path / "persa.jpg")})
+        run_migrations(conn)
+        # La migrazione aggiunge solo le colonne: i file li legge il backfill.
+        assert conn.execute(text("SELECT count(*) FROM images WHERE size_bytes IS NULL")).scalar() == 2
+
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'vecchio.db'}")
+    try:
+        # Lotti da una riga: la riga col file mancante non blocca le successive.
+        assert await backfill_image_metadata(batch_size=1, db_engine=async_engine) == 1
+    finally:
+        await async_engine.dispose()
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT filename, size_bytes, mime_type, width, height, orientation, sha256"
+            " FROM images ORDER BY id"
+        )).fetchall()
+    # File mancante: resta NULL e verrà ritentato al prossimo avvio.
+    assert rows[0][1:] == (None,) * 6
+    assert rows[1][1:6] == (foto.stat().st_size, "image/jpeg", 16, 8, 1)
+    assert len(rows[1][6]) == 64
+
+
+@pytest.fixture
+def client(db):
+    async def _override():
+        yield db
+
+    app.dependency_overrides[get_db] = _override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+async def test_api_upload_metadati(client, tmp_path, monkeypatch):
+    from app.routes.api import images
+
+    monkeypatch.setattr(images, "UPLOAD_DIR", str(tmp_path))
+    async with client as c:
+        resp = await c.post("/api/images", files={"file": ("a.jpg", _jpeg(), "image/jpeg")})
+    body = resp.json()
+    assert (body["width"], body["height"], body["orientation"]) == (40, 30, 1)
+    assert body["mime_type"] == "image/jpeg" and body["size_bytes"] > 0
@@ -0,0 +1,83 @@
+"""Elenco numeri con conteggio aggregato e sommario leggero di un numero."""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event, insert
+
+from app.database import get_db
+from app.main import app
+from app.models import Article, Magazine, MagazineStatus, article_magazines
+
+
+@pytest.fixture
+def client(db):
+    async def _override():
+        yield db
+
+    app.dependency_overrides[get_db] = _override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def statements(db):
+    """Conta le query SQL eseguite sulla connessione di test."""
+    eseguite = []
+    engine = db.bind.sync_engine
+
+    def _count(conn, cursor, statement, *args):
+        eseguite.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    yield eseguite
+    event.remove(engine, "before_cursor_execute", _count)
+
+
+async def _archivio(db, numeri: int, per_numero: int) -> list[int]:
+    ids = []
+    for n in range(numeri):
+        mag = Magazine(numero=str(100 + n), mese="Marzo", anno=str(2000 + n),
+                       stato=MagazineStatus.BOZZA)
+        db.add(mag)
+        await db.flush()
+        for k in range(per_numero):
+            art = Article(titolo=f"Articolo {n}.{k}", contenuto_md="x" * 1000)
+            db.add(art)
+            await db.flush()
+            await db.execute(insert(article_magazines).values(
+                article_id=art.id, magazine_id=mag.id, ordine=per_numero - k))
+        ids.append(mag.id)
+    await db.commit()
+    return ids
+
+
+async def test_elenco_numeri_una_query(client, db, statements):
+    ids = await _archivio(db, numeri=6, per_numero=4)
+    vuoto = Magazine(numero="1", mese="Aprile", anno="1999", stato=MagazineStatus.BOZZA)
+    db.add(vuoto)
+    await db.commit()
+    async with client as c:
+        statements.clear()
+        elenco = (await c.get("/api/magazines")).json()
+    # La filigrana dell'ETag (response_cache) più l'elenco.
+    assert len(statements) == 2
+    assert [m["id"] for m in elenco[:6]] == list(reversed(ids))
+    assert all(m["article_count"] == 4 for m in elenco[:6])
+    assert elenco[-1]["article_count"] == 0
+    assert "articles" not in elenco[0] and elenco[0]["copertina"] is None
+
+
+async def test_sommario_numero(client, db):
+    (mag_id,) = await _archivio(db, numeri=1, per_numero=3)
+    async with client as c:
+        toc = (await c.get(f"/api/magazines/{mag_id}/articles")).json()
+        # Nell'ordine del numero (ordine della tabella ponte), senza i corpi.
+        assert [a["titolo"] for a in toc] == ["Articolo 0.2", "Articolo 0.1", "Articolo 0.0"]
+        assert [a["ordine"] for a in toc] == [1, 2, 3]
+        assert "contenuto_md" not in toc[0]
+
+        vuoto = Magazine(numero="2", mese="Maggio", anno="2030", stato=MagazineStatus.BOZZA)
+        db.add(vuoto)
+        await db.commit()
+        assert (await c.get(f"/api/magazines/{vuoto.id}/articles")).json() == []
+        assert (await c.get("/api/magazines/9999/articles")).status_code == 404
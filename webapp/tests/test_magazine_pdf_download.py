@@ -46,3 +46,26 @@ async def test_download_pdf_sets_no_cache(client, sample_magazine):
         )
     finally:
         os.remove(pdf_path)
+
+
+async def test_download_pdf_profili(client, sample_magazine):
+    """?profile= sceglie il file del profilo; profili ignoti -> 400."""
+    out = Path("data") / "output"
+    out.mkdir(parents=True, exist_ok=True)
+    files = {
+        "screen": out / f"geko{sample_magazine['numero']}.pdf",
+        "mobile": out / f"geko{sample_magazine['numero']}-mobile.pdf",
+    }
+    for profilo, path in files.items():
+        path.write_bytes(f"%PDF-1.4 {profilo}".encode())
+    try:
+        async with client as c:
+            base = f"/api/magazines/{sample_magazine['id']}/pdf"
+            assert (await c.get(base)).content.endswith(b"screen")
+            resp = await c.get(base, params={"profile": "mobile"})
+            assert resp.status_code == 200 and resp.content.endswith(b"mobile")
+            assert "-mobile.pdf" in resp.headers["content-disposition"]
+            assert (await c.get(base, params={"profile": "poster"})).status_code == 400
+    finally:
+        for path in files.values():
+            os.remove(path)
@@ -125,3 +125,41 @@ async def test_elimina_numero_with_articles_then_forza(patch_session):
             "elimina_numero", {"id": num["id"], "forza": True}
         )).data
         assert res["eliminato"] == num["id"]
+
+
+async def test_report_peso_pdf_tool(patch_session, sample_magazine, tmp_path, monkeypatch):
+    import typst
+
+    from app.services import builder
+
+    monkeypatch.setattr(builder, "OUTPUT_DIR", tmp_path)
+    async with Client(server_mod.mcp) as client:
+        with pytest.raises(ToolError, match="compilare prima"):
+            await client.call_tool("report_peso_pdf", {"numero_id": sample_magazine["id"]})
+        (tmp_path / f"geko{sample_magazine['numero']}.pdf").write_bytes(typst.compile(b"= Testo"))
+        result = await client.call_tool("report_peso_pdf", {"numero_id": sample_magazine["id"]})
+        assert result.data["numero"] == sample_magazine["numero"]
+        assert result.data["immagini"] == []
+        with pytest.raises(ToolError, match="non trovato"):
+            await client.call_tool("report_peso_pdf", {"numero_id": 9999})
+
+
+async def test_assegna_in_blocco_e_riordina(patch_session):
+    async with Client(server_mod.mcp) as client:
+        num = (await client.call_tool(
+            "crea_numero", {"numero": "71", "mese": "Agosto", "anno": "2026"}
+        )).data
+        ids = [
+            (await client.call_tool("crea_articolo", {"titolo": t, "contenuto_md": "y"})).data["id"]
+            for t in ("A", "B", "C")
+        ]
+        res = (await client.call_tool(
+            "assegna_in_blocco", {"articoli_ids": ids, "aggiungi_numeri": [num["id"]]}
+        )).data
+        assert res == {"aggiunti": 3, "rimossi": 0}
+        res = (await client.call_tool(
+            "riordina_articoli", {"numero_id": num["id"], "articoli_ids": ids[::-1]}
+        )).data
+        assert res == {"aggiornati": 3}
+        with pytest.raises(ToolError):
+            await client.call_tool("riordina_articoli", {"numero_id": 9999, "articoli_ids": ids})
@@ -0,0 +1,130 @@
+"""Validazione statica del markdown (md_validate), prima di compilare."""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.database import get_db
+from app.main import app
+from app.mcp.conventions import markdown_preview
+from app.services import article_ops
+from app.services.builder import MagazineBuilder
+from app.services.md_render import render_article_body
+from app.services.md_validate import has_errors, validate_markdown
+
+LOGO = "/typst/assets/logo_rivista.jpg"
+
+
+@pytest.fixture
+def uploads(tmp_path, monkeypatch):
+    monkeypatch.setattr(article_ops, "UPLOADS_DIR", tmp_path / "uploads")
+    media = tmp_path / "uploads" / "articoli" / "3"
+    media.mkdir(parents=True)
+    (media / "foto.jpg").write_bytes(b"jpg")
+    return media
+
+
+def _codici(md: str, **kw) -> list[tuple[str, str, int]]:
+    problemi = validate_markdown(md, "/data/uploads/articoli/3", data_mode=False, **kw)
+    return [(p["livello"], p["codice"], p["righe"][0]) for p in problemi]
+
+
+def test_markdown_pulito(uploads):
+    md = f"# Sezione\n\nTesto **forte**.\n\n![Foto](foto.jpg){{width=60%}}\n\n![]({LOGO})\n"
+    assert validate_markdown(md, "/data/uploads/articoli/3") == []
+
+
+def test_immagini(uploads):
+    md = (
+        "![](manca.png)\n"
+        "\n"
+        "![](https://example.org/a.png)\n"
+        "\n"
+        "![](foto.bmp)\n"
+        "\n"
+        "Nel testo ![x](/uploads/articoli/3/foto.jpg) non viene rimappata.\n"
+    )
+    assert _codici(md) == [
+        ("errore", "immagine-mancante", 1),
+        ("errore", "immagine-remota", 3),
+        ("errore", "formato-immagine", 5),
+        ("errore", "immagine-in-prosa", 7),
+    ]
+
+
+def test_attributi(uploads):
+    assert _codici("![](foto.jpg){width=80 align=center}") == [
+        ("avviso", "attributo-sconosciuto", 1),
+        ("errore", "larghezza-senza-unita", 1),
+    ]
+    # In modalità data-driven un numero nudo è in punti: niente errore.
+    problemi = validate_markdown("![](foto.jpg){width=80}", "/data/uploads/articoli/3",
+                                data_mode=True)
+    assert not has_errors(problemi)
+    assert _codici("![](foto.jpg){width=150%}") == [("avviso", "larghezza-non-valida", 1)]
+
+
+def test_costrutti_sbilanciati(uploads):
+    md = "Prima <!--raw-typst #box[ -->\n\n![](foto.jpg)\n\nDopo <!--raw-typst ] -->"
+    assert _codici(md) == [("errore", "typst-sbilanciato", 1), ("errore", "typst-sbilanciato", 5)]
+    # Bilanciato dentro lo stesso tratto di prosa: ok.
+    assert _codici("<!--raw-typst #box[ -->\ntesto\n<!--raw-typst ] -->") == []
+
+    md = "```\ncodice\n![](foto.jpg)\n```"
+    assert ("avviso", "codice-spezzato", 1) in _codici(md)
+    # Dentro un blocco di codice le immagini non si controllano.
+    assert _codici("```\n![](manca.png) nel codice\n```") == []
+
+
+def test_tabelle_e_griglie(uploads):
+    colonne = 10
+    tabella = "|" + "|".join("c" * colonne) + "|\n|" + "|".join(["---"] * colonne) + "|"
+    assert _codici("Intro\n\n" + tabella) == [("avviso", "tabella-larga", 3)]
+    griglia = "\n".join(["![](foto.jpg)"] * 13)
+    assert _codici(griglia) == [("avviso", "griglia-grande", 1)]
+
+
+def test_errori_corrispondono_a_compilazione_fallita(uploads):
+    """Ciò che il validatore chiama errore non compila davvero."""
+    builder = MagazineBuilder()
+    for md in ("Testo ![x](/uploads/nope.jpg)", f"![a]({LOGO}){{width=80}}",
+               "<!--raw-typst #text([ -->"):
+        assert has_errors(validate_markdown(md, data_mode=False))
+        assert builder.try_compile_snippet(render_article_body(md)) is not None
+    assert builder.try_compile_snippet(render_article_body(f"![a]({LOGO}){{width=80%}}")) is None
+
+
+def test_anteprima_riporta_i_problemi(uploads):
+    out = markdown_preview("![](manca.png)", articolo_id=3)
+    assert out.startswith("// [errore] riga 1: Immagine non trovata")
+    assert "#figura(" in out
+    assert not markdown_preview("Solo testo").startswith("//")
+
+
+@pytest.fixture
+def client(db):
+    async def _override():
+        yield db
+
+    app.dependency_overrides[get_db] = _override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+async def test_salvataggio_e_build_rifiutata(client, sample_magazine, uploads):
+    async with client as c:
+        art = (await c.post("/api/articles", json={
+            "titolo": "Rotta", "contenuto_md": "![](manca.png)",
+        })).json()
+        assert [p["codice"] for p in art["validazione"]] == ["immagine-mancante"]
+        await c.post(f"/api/articles/{art['id']}/assign",
+                     json={"magazine_ids": [sample_magazine["id"]]})
+
+        resp = (await c.post(f"/api/magazines/{sample_magazine['id']}/build")).json()
+        assert resp["status"] == "error"
+        (errore,) = resp["errori"]
+        assert errore["articolo_id"] == art["id"] and errore["segmento"] == "validazione"
+        assert errore["righe"] == [1, 1]
+
+        art = (await c.put(f"/api/articles/{art['id']}",
+                           json={"contenuto_md": "Ora solo testo."})).json()
+        assert art["validazione"] == []
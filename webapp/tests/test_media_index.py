@@ -0,0 +1,108 @@
+"""Indice in memoria della media library (media_index)."""
+
+import os
+
+import pytest
+from PIL import Image
+
+from app.services import article_ops, build_history
+from app.services.md_validate import validate_markdown
+from app.services.media_index import MediaIndex, get_index
+
+
+@pytest.fixture
+def uploads_tmp(tmp_path, monkeypatch):
+    base = tmp_path / "uploads"
+    monkeypatch.setattr(article_ops, "UPLOADS_DIR", base)
+    return base
+
+
+def _png(path, size=(30, 20)):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    Image.new("RGB", size, (10, 20, 30)).save(path)
+    return path.read_bytes()
+
+
+def test_scan_e_lookup(tmp_path):
+    data = _png(tmp_path / "articoli" / "4" / "a.png")
+    (tmp_path / "articoli" / "non-un-id").mkdir()
+    index = MediaIndex(tmp_path)
+    assert index.scan() == 1
+
+    entry = index.lookup(4, "a.png")
+    assert (entry.byte, entry.mime, entry.larghezza, entry.altezza) == (len(data), "image/png", 30, 20)
+    assert index.lookup(4, "b.png") is None
+    # Copiato a mano dopo la scansione: scoperto al primo lookup mancato.
+    _png(tmp_path / "articoli" / "4" / "b.png")
+    assert index.lookup(4, "b.png").nome == "b.png"
+    assert [e.nome for e in index.list(4)] == ["a.png", "b.png"]
+
+    assert index.lookup_ref("/data/uploads/articoli/4/a.png") == (True, entry)
+    assert index.lookup_ref("/typst/assets/logo.jpg") == (False, None)
+
+
+def test_scan_solo_stat(tmp_path, monkeypatch):
+    data = _png(tmp_path / "articoli" / "4" / "a.png")
+    index = MediaIndex(tmp_path)
+    monkeypatch.setattr("app.services.media_index.describe",
+                        lambda *a, **k: pytest.fail("file letto durante la scansione"))
+    assert index.scan() == 1
+    monkeypatch.undo()
+    # sha256 e pixel al primo uso.
+    entry = index.lookup(4, "a.png")
+    assert entry.sha256 is not None and (entry.larghezza, entry.byte) == (30, len(data))
+
+
+def test_lookup_ref_non_legge_e_vede_le_cancellazioni(tmp_path, monkeypatch):
+    path = tmp_path / "articoli" / "4" / "a.png"
+    _png(path)
+    index = MediaIndex(tmp_path)
+    index.scan()
+    monkeypatch.setattr("app.services.media_index.describe",
+                        lambda *a, **k: pytest.fail("file letto dalla validazione"))
+    in_media, entry = index.lookup_ref("/data/uploads/articoli/4/a.png")
+    assert in_media and entry.sha256 is None
+    # Cancellato da un altro processo (server MCP): sparisce dall'indice.
+    path.unlink()
+    assert index.lookup_ref("/data/uploads/articoli/4/a.png") == (True, None)
+    assert index.lookup(4, "a.png") is None and index.list(4) == []
+
+
+def test_digest_senza_rileggere(tmp_path, monkeypatch):
+    path = tmp_path / "articoli" / "4" / "a.png"
+    _png(path)
+    index = MediaIndex(tmp_path)
+    index.scan()
+    sha = index.lookup(4, "a.png").sha256
+
+    letture = []
+    monkeypatch.setattr("app.services.media_index.describe",
+                        lambda *a, **k: letture.append(a) or pytest.fail("riletto"))
+    assert index.digest(path) == sha and not letture
+    assert index.digest(tmp_path / "altro.png") is None
+    monkeypatch.undo()
+
+    # File cambiato (stat diverso): si ricalcola.
+    _png(path, size=(8, 8))
+    os.utime(path, ns=(1, 1))
+    assert index.digest(path) != sha
+    assert index.lookup(4, "a.png").larghezza == 8
+
+
+async def test_save_e_delete_aggiornano_indice(db, uploads_tmp):
+    art = await article_ops.create_article(db, titolo="QMX", contenuto_md="![](x.png)")
+    index = get_index(uploads_tmp)
+    assert art["validazione"][0]["codice"] == "immagine-mancante"
+
+    data = _png(uploads_tmp.parent / "x.png", size=(64, 48))
+    await article_ops.save_article_image(db, art["id"], "x.png", data)
+    assert index.lookup(art["id"], "x.png").sha256 == build_history._sha256_file(
+        uploads_tmp / "articoli" / str(art["id"]) / "x.png")
+    (img,) = await article_ops.list_article_images(db, art["id"])
+    assert (img["bytes"], img["larghezza"], img["altezza"]) == (len(data), 64, 48)
+    assert validate_markdown("![](x.png)", article_ops.article_image_base(art["id"])) == []
+
+    await article_ops.delete_article_image(db, art["id"], "x.png")
+    assert index.list(art["id"]) == []
+    problemi = validate_markdown("![](x.png)", article_ops.article_image_base(art["id"]))
+    assert [p["codice"] for p in problemi] == ["immagine-mancante"]
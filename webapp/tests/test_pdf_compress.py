@@ -52,3 +52,32 @@ def test_compress_non_ingrandisce_mai(tmp_path):
     before = pdf.stat().st_size
     compress_pdf(pdf)
     assert pdf.stat().st_size <= before
+
+
+def test_profile_path():
+    out = Path("/x")
+    assert pdf_compress.profile_path(out, "70", "screen") == out / "geko70.pdf"
+    assert pdf_compress.profile_path(out, "70", "print") == out / "geko70-print.pdf"
+    assert pdf_compress.profile_path(out, "70", "mobile") == out / "geko70-mobile.pdf"
+
+
+def test_make_profiles_senza_gs(tmp_path, monkeypatch):
+    master = pdf_compress.profile_path(tmp_path, "70", "print")
+    _pdf_pesante(master, pagine=2)
+    monkeypatch.setattr(pdf_compress.shutil, "which", lambda _: None)
+    infos = pdf_compress.make_profiles(master, tmp_path, "70")
+    assert set(infos) == {"screen", "mobile"}
+    for p in ("screen", "mobile"):
+        assert infos[p]["compressed"] is False
+        assert pdf_compress.profile_path(tmp_path, "70", p).read_bytes() == master.read_bytes()
+    assert not list(tmp_path.glob(".*.tmp"))
+
+
+@pytest.mark.skipif(shutil.which("gs") is None, reason="Ghostscript non installato")
+def test_make_profiles_mobile_piu_leggero(tmp_path):
+    master = pdf_compress.profile_path(tmp_path, "70", "print")
+    _pdf_pesante(master)
+    pdf_compress.make_profiles(master, tmp_path, "70")
+    size = {p: pdf_compress.profile_path(tmp_path, "70", p).stat().st_size
+            for p in pdf_compress.PROFILES}
+    assert size["mobile"] < size["screen"] < size["print"]
@@ -0,0 +1,92 @@
+"""Pre-scan delle immagini del PDF e ricompressione mirata."""
+
+from pathlib import Path
+
+import typst
+from PIL import Image
+from pypdf import PdfReader
+
+from app.services import pdf_compress
+from app.services.pdf_compress import compress_pdf
+from app.services.pdf_images import recompress_images, scan_images
+
+WEBAPP_DIR = Path(__file__).resolve().parent.parent
+REPO_DIR = WEBAPP_DIR.parent
+ASSET = REPO_DIR / "assets" / "corno-grande-1.jpg"  # 1336x632 JPEG
+
+
+def _pdf_pillow(dst: Path, dpi: int = 300, pagine: int = 2):
+    img = Image.open(ASSET).convert("RGB")
+    img.save(dst, "PDF", save_all=True, append_images=[img] * (pagine - 1), resolution=dpi)
+
+
+def _pdf_typst(dst: Path, larghezza_in: float):
+    src = (
+        '#set page(width: 21cm, height: 29.7cm)\n'
+        f'#image("/assets/corno-grande-1.jpg", width: {larghezza_in}in)\n'
+        f'#box(image("/assets/corno-grande-1.jpg", width: {larghezza_in / 2}in))\n'
+    )
+    dst.write_bytes(typst.compile(src.encode(), root=str(REPO_DIR)))
+
+
+def test_scan_dpi_effettivi(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    _pdf_pillow(pdf, dpi=300)
+    scan = scan_images(pdf, 150)
+    assert scan["conviene"]
+    img = scan["immagini"][0]
+    assert (img["larghezza"], img["altezza"]) == (1336, 632)
+    assert img["filtro"] == "DCTDecode" and img["byte"] > 0
+    assert abs(img["dpi"] - 300) < 1
+    assert img["candidata"] == "sovradimensionata"
+    assert not scan_images(pdf, 300)["conviene"]
+
+
+def test_scan_segue_la_ctm_di_typst(tmp_path):
+    # Stessa immagine disegnata a 150 dpi e a 300 dpi: conta l'uso più fitto.
+    pdf = tmp_path / "t.pdf"
+    _pdf_typst(pdf, 1336 / 150)
+    scan = scan_images(pdf, 150)
+    (img,) = scan["immagini"]
+    assert img["usi"] == 2
+    assert abs(img["dpi"] - 300) < 2
+
+
+def test_compress_salta_gs_se_niente_da_guadagnare(tmp_path, monkeypatch):
+    pdf = tmp_path / "testo.pdf"
+    pdf.write_bytes(typst.compile(b"= Solo testo\n\nNessuna immagine."))
+    prima = pdf.read_bytes()
+
+    def _vietato(*a, **k):
+        raise AssertionError("Ghostscript non doveva partire")
+
+    monkeypatch.setattr(pdf_compress.subprocess, "run", _vietato)
+    info = compress_pdf(pdf)
+    assert info["compressed"] is False
+    assert info["reason"] == "immagini già ottimizzate"
+    assert pdf.read_bytes() == prima
+
+
+def test_ricompressione_mirata(tmp_path):
+    pdf = tmp_path / "b.pdf"
+    _pdf_pillow(pdf, dpi=300)
+    before = pdf.stat().st_size
+    info = recompress_images(pdf, 150)
+    assert info["compressed"] and info["after"] < before == info["before"]
+    assert pdf.stat().st_size == info["after"]
+    esito = info["immagini"][0]
+    assert esito["azione"] == "ricampionata"
+    assert (esito["nuova_larghezza"], esito["nuova_altezza"]) == (668, 316)
+    assert esito["byte_dopo"] < esito["byte"]
+    # PDF ancora valido, immagini alla nuova risoluzione
+    scan = scan_images(pdf, 150)
+    assert all(abs(i["dpi"] - 150) < 1 for i in scan["immagini"])
+    assert len(PdfReader(pdf).pages) == 2
+
+
+def test_compress_strategia_immagini(tmp_path):
+    pdf = tmp_path / "c.pdf"
+    _pdf_pillow(pdf, dpi=300)
+    info = compress_pdf(pdf, strategy="images")
+    assert info["compressed"] is True
+    assert info["immagini"] and all(i["azione"] == "ricampionata" for i in info["immagini"])
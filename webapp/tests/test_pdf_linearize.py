@@ -0,0 +1,130 @@
+"""Linearizzazione dei PDF (fast web view) e download a richieste Range."""
+
+import os
+import shutil
+import stat
+from pathlib import Path
+
+import pytest
+import typst
+from httpx import ASGITransport, AsyncClient
+
+from app.database import get_db
+from app.main import app
+from app.services import pdf_compress
+from app.services.pdf_compress import is_linearized, linearize_pdf
+
+
+def _pdf(path: Path) -> bytes:
+    data = typst.compile(b"= Uno\n#pagebreak()\n= Due")
+    path.write_bytes(data)
+    return data
+
+
+def _fake_qpdf(tmp_path: Path, exit_code: int = 0) -> Path:
+    """qpdf finto: registra gli argomenti e copia l'input nell'output."""
+    script = tmp_path / "qpdf"
+    script.write_text(
+        "#!/bin/sh\n"
+        f'echo "$@" > "{tmp_path}/args"\n'
+        'cp "$2" "$3"\n'
+        f"exit {exit_code}\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return script
+
+
+def test_linearize_senza_qpdf(tmp_path, monkeypatch):
+    pdf = tmp_path / "a.pdf"
+    prima = _pdf(pdf)
+    monkeypatch.setattr(pdf_compress.shutil, "which", lambda _: None)
+    assert linearize_pdf(pdf) == {"linearized": False, "reason": "qpdf non disponibile"}
+    assert pdf.read_bytes() == prima
+
+
+def test_linearize_disattivata(tmp_path, monkeypatch):
+    pdf = tmp_path / "a.pdf"
+    _pdf(pdf)
+    monkeypatch.setenv("GEKO_PDF_LINEARIZE", "0")
+    assert linearize_pdf(pdf)["reason"] == "disattivata"
+
+
+def test_linearize_invoca_qpdf(tmp_path, monkeypatch):
+    pdf = tmp_path / "a.pdf"
+    _pdf(pdf)
+    fake = _fake_qpdf(tmp_path)
+    monkeypatch.setattr(pdf_compress.shutil, "which", lambda _: str(fake))
+    assert linearize_pdf(pdf) == {"linearized": True}
+    args = (tmp_path / "args").read_text().split()
+    assert args[0] == "--linearize" and args[1] == str(pdf)
+    assert not list(tmp_path.glob("*.linearized.pdf"))
+
+
+def test_linearize_fallita_tiene_originale(tmp_path, monkeypatch):
+    pdf = tmp_path / "a.pdf"
+    prima = _pdf(pdf)
+    fake = _fake_qpdf(tmp_path, exit_code=2)
+    monkeypatch.setattr(pdf_compress.shutil, "which", lambda _: str(fake))
+    assert linearize_pdf(pdf)["reason"] == "qpdf ha fallito"
+    assert pdf.read_bytes() == prima
+    assert not list(tmp_path.glob("*.linearized.pdf"))
+
+
+@pytest.mark.skipif(shutil.which("qpdf") is None, reason="qpdf non installato")
+def test_linearize_reale(tmp_path):
+    pdf = tmp_path / "a.pdf"
+    _pdf(pdf)
+    assert not is_linearized(pdf)
+    assert linearize_pdf(pdf)["linearized"]
+    assert is_linearized(pdf)
+
+
+def test_make_profiles_linearizza(tmp_path, monkeypatch):
+    master = pdf_compress.profile_path(tmp_path, "70", "print")
+    _pdf(master)
+    fake = _fake_qpdf(tmp_path)
+    # gs assente, qpdf (finto) presente.
+    monkeypatch.setattr(pdf_compress.shutil, "which",
+                        lambda name: str(fake) if name == "qpdf" else None)
+    infos = pdf_compress.make_profiles(master, tmp_path, "70")
+    assert all(info["linearized"] for info in infos.values())
+
+
+@pytest.fixture
+def client(db):
+    async def _override():
+        yield db
+
+    app.dependency_overrides[get_db] = _override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+async def test_download_range_e_inline(client, sample_magazine):
+    pdf_path = Path("data") / "output" / f"geko{sample_magazine['numero']}.pdf"
+    pdf_path.parent.mkdir(parents=True, exist_ok=True)
+    data = _pdf(pdf_path)
+    url = f"/api/magazines/{sample_magazine['id']}/pdf"
+    try:
+        async with client as c:
+            full = await c.get(url)
+            assert full.headers["accept-ranges"] == "bytes"
+            assert full.headers["content-disposition"].startswith("attachment")
+
+            part = await c.get(url, headers={"Range": "bytes=0-1023"})
+            assert part.status_code == 206
+            assert part.content == data[:1024]
+            assert part.headers["content-range"] == f"bytes 0-1023/{len(data)}"
+
+            # If-Range con l'ETag corrente: 206; con uno vecchio (PDF
+            # ricompilato nel frattempo) il file intero.
+            etag = full.headers["etag"]
+            ok = await c.get(url, headers={"Range": "bytes=10-19", "If-Range": etag})
+            assert ok.status_code == 206 and ok.content == data[10:20]
+            stale = await c.get(url, headers={"Range": "bytes=10-19", "If-Range": '"vecchio"'})
+            assert stale.status_code == 200 and stale.content == data
+
+            inline = await c.get(url, params={"inline": "true"})
+            assert inline.headers["content-disposition"].startswith("inline")
+    finally:
+        os.remove(pdf_path)
@@ -0,0 +1,56 @@
+"""Profilazione della build per funzione del template e per articolo."""
+
+import json
+
+from app.services.builder import MagazineBuilder
+from app.services.profiling import to_folded
+
+ARTICOLI = [
+    dict(
+        titolo="Attivazione; in vetta", sottotitolo="Sotto", autore="IK2ABC", nome="Mario",
+        contenuto_md=(
+            "Prosa con *enfasi*.\n\n> [!TIP] Consiglio\n> corpo\n\n"
+            "![Cresta](/typst/assets/corno-grande-2.jpg)"
+        ),
+        image_base=None,
+    ),
+    dict(titolo="Breve", sottotitolo=None, autore=None, nome=None,
+         contenuto_md="Solo testo.", image_base=None),
+]
+
+
+def test_profilo_per_funzione_e_articolo(tmp_path):
+    b = MagazineBuilder()
+    b.output_dir = tmp_path
+    report = b.profile_magazine(
+        "99", "Luglio", "2026", ARTICOLI,
+        copertina_path="typst/assets/corno-grande-1.jpg",
+        evidenze=[{"titolo": "T", "descrizione": "d"}],
+        editoriale="Editoriale.", editoriale_autore="IK2ABC",
+        team_membri=[{"nominativo": "IK2ABC", "nome": "Mario", "ruolo": "Editor"}],
+    )
+    funzioni = {f["funzione"]: f for f in report["funzioni"]}
+    for attesa in ("copertina", "pagina-logo", "sommario", "geko-md-scope (cmarker)",
+                   "box-evidenza", "figura", "pagina-team", "pagina-finale"):
+        assert attesa in funzioni
+    assert funzioni["geko-md-scope (cmarker)"]["chiamate"] >= 2
+    assert report["build_s"] > 0
+    assert {a["titolo"] for a in report["articoli"]} == {"Attivazione; in vetta", "Breve"}
+    figura = next(u for u in report["unita"] if u["funzione"] == "figura")
+    assert figura["percorso"] == ["articoli", "Attivazione; in vetta"] and figura["righe"]
+
+    salvato = json.loads((tmp_path / "geko99.profile.json").read_text(encoding="utf-8"))
+    assert salvato["numero"] == "99"
+    folded = (tmp_path / "geko99.folded").read_text(encoding="utf-8")
+    assert folded == to_folded(report)
+
+
+def test_folded_formato():
+    report = {"numero": "1", "unita": [
+        {"percorso": ["articoli", "A;B"], "funzione": "figura", "secondi": 0.0125},
+        {"percorso": [], "funzione": "altro", "secondi": 0.5},
+    ]}
+    assert to_folded(report).splitlines() == [
+        "numero 1;articoli;A,B;figura 12500",
+        "numero 1;altro 500000",
+    ]
@@ -0,0 +1,132 @@
+"""ETag / If-None-Match e cache delle risposte delle GET più lette."""
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+from sqlalchemy import event
+
+from app.database import get_db
+from app.main import app
+from app.services import article_ops, response_cache
+
+
+@pytest.fixture
+def client(db):
+    async def _override():
+        yield db
+
+    response_cache.invalidate()
+    app.dependency_overrides[get_db] = _override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def statements(db):
+    eseguite = []
+    engine = db.bind.sync_engine
+
+    def _count(conn, cursor, statement, *args):
+        eseguite.append(statement)
+
+    event.listen(engine, "before_cursor_execute", _count)
+    yield eseguite
+    event.remove(engine, "before_cursor_execute", _count)
+
+
+async def test_elenco_articoli_304_e_cache(client, db, statements):
+    art = await article_ops.create_article(db, titolo="QMX", contenuto_md="x" * 5000)
+    async with client as c:
+        prima = await c.get("/api/articles")
+        tag = prima.headers["etag"]
+        assert prima.headers["cache-control"] == "private, no-cache"
+
+        statements.clear()
+        resp = await c.get("/api/articles", headers={"If-None-Match": tag})
+        assert resp.status_code == 304 and resp.content == b""
+        assert len(statements) == 1  # solo la filigrana
+
+        statements.clear()
+        resp = await c.get("/api/articles")
+        assert resp.content == prima.content and len(statements) == 1  # corpo in cache
+
+        await c.put(f"/api/articles/{art['id']}", json={"titolo": "QMX+"})
+        resp = await c.get("/api/articles", headers={"If-None-Match": tag})
+        assert resp.status_code == 200 and resp.headers["etag"] != tag
+        assert resp.json()[0]["titolo"] == "QMX+"
+
+
+async def test_articolo_etag_per_riga(client, db):
+    uno = await article_ops.create_article(db, titolo="Uno", contenuto_md="x")
+    due = await article_ops.create_article(db, titolo="Due", contenuto_md="y")
+    async with client as c:
+        tag = (await c.get(f"/api/articles/{uno['id']}")).headers["etag"]
+        # Scrittura da un altro processo (server MCP): nessuna invalidazione locale.
+        await article_ops.update_article(db, due["id"], titolo="Due bis")
+        resp = await c.get(f"/api/articles/{uno['id']}", headers={"If-None-Match": tag})
+        assert resp.status_code == 304
+
+        await article_ops.update_article(db, uno["id"], titolo="Uno bis")
+        resp = await c.get(f"/api/articles/{uno['id']}", headers={"If-None-Match": tag})
+        assert resp.status_code == 200 and resp.json()["titolo"] == "Uno bis"
+        assert (await c.get("/api/articles/999")).status_code == 404
+
+
+async def test_numeri_seguono_le_assegnazioni_esterne(client, db, sample_magazine):
+    art = await article_ops.create_article(db, titolo="QMX", contenuto_md="x")
+    async with client as c:
+        tag = (await c.get("/api/magazines")).headers["etag"]
+        # assign_article (come dal tool MCP) aggiorna updated_at del numero.
+        await article_ops.assign_article(db, art["id"], [sample_magazine["id"]])
+        resp = await c.get("/api/magazines", headers={"If-None-Match": tag})
+        assert resp.status_code == 200 and resp.json()[0]["article_count"] == 1
+
+        tag = resp.headers["etag"]
+        await article_ops.assign_article(db, art["id"], [])
+        resp = await c.get("/api/magazines", headers={"If-None-Match": tag})
+        assert resp.json()[0]["article_count"] == 0
+
+
+async def test_config_304(client):
+    async with client as c:
+        tag = (await c.get("/api/config")).headers["etag"]
+        assert (await c.get("/api/config", headers={"If-None-Match": f'W/{tag}, "x"'})).status_code == 304
+        await c.put("/api/config", json={"titolo_rivista": "GEKO"})
+        resp = await c.get("/api/config", headers={"If-None-Match": tag})
+        assert resp.status_code == 200 and resp.json()["titolo_rivista"]["value"] == "GEKO"
+
+
+async def test_immagini_modificate_da_altro_processo(client, db):
+    from app.models import Image
+
+    art = await article_ops.create_article(db, titolo="QMX", contenuto_md="x")
+    image = Image(filename="a.jpg", original_filename="a.jpg", path="data/uploads/a.jpg",
+                  article_id=art["id"])
+    db.add(image)
+    await db.commit()
+    async with client as c:
+        tag = (await c.get(f"/api/articles/{art['id']}")).headers["etag"]
+        # alt_text cambiato dal server MCP: nessuna invalidazione locale, né
+        # nuove righe; cambia solo images.updated_at.
+        image.alt_text = "Antenna"
+        await db.commit()
+        resp = await c.get(f"/api/articles/{art['id']}", headers={"If-None-Match": tag})
+        assert resp.status_code == 200
+        assert resp.json()["images"][0]["alt_text"] == "Antenna"
+
+
+async def test_aggiunta_e_rimozione_articolo_aggiornano_il_numero(client, db, sample_magazine, monkeypatch):
+    art = await article_ops.create_article(db, titolo="QMX", contenuto_md="x")
+    # Come per un secondo worker: la generazione del processo non cambia,
+    # conta solo la filigrana nel database.
+    monkeypatch.setattr(response_cache, "invalidate", lambda: None)
+    base = f"/api/magazines/{sample_magazine['id']}/articles/{art['id']}"
+    async with client as c:
+        tag = (await c.get("/api/magazines")).headers["etag"]
+        assert (await c.post(base)).json()["status"] == "added"
+        resp = await c.get("/api/magazines", headers={"If-None-Match": tag})
+        assert resp.status_code == 200 and resp.json()[0]["article_count"] == 1
+
+        tag = resp.headers["etag"]
+        assert (await c.delete(base)).json()["status"] == "removed"
+        resp = await c.get("/api/magazines", headers={"If-None-Match": tag})
+        assert resp.status_code == 200 and resp.json()[0]["article_count"] == 0
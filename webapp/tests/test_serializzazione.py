@@ -0,0 +1,71 @@
+"""Serializzazione JSON con orjson: stesso output del JSONResponse di FastAPI."""
+
+import json
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from httpx import ASGITransport, AsyncClient
+from pydantic import BaseModel
+
+from app.database import get_db
+from app.main import app
+from app.models import MagazineStatus
+from app.services import article_ops, response_cache
+from app.services.serialization import FastJSONResponse, dumps
+from bench.dataset import genera
+from bench.serializzazione import carica_payload, confronta
+
+
+@pytest.fixture
+def client(db):
+    async def _override():
+        yield db
+
+    response_cache.invalidate()
+    app.dependency_overrides[get_db] = _override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+class _Modello(BaseModel):
+    nome: str
+
+
+def test_dumps_come_jsonable_encoder():
+    payload = {
+        "quando": datetime(2026, 3, 1, 12, 30, 5, 123456),
+        "mezzanotte": datetime(2026, 3, 1),
+        "stato": MagazineStatus.BOZZA,
+        "modello": _Modello(nome="QMX"),
+        "percorso": Path("uploads/a.jpg"),
+        "testo": "àèì — ✓",
+        "nulla": None,
+        1: "chiave intera",
+    }
+    atteso = JSONResponse(jsonable_encoder(payload)).body
+    assert dumps(payload) == atteso
+    assert FastJSONResponse(payload).body == atteso
+
+
+async def test_route_usano_orjson(client, db, sample_magazine):
+    art = await article_ops.create_article(db, titolo="QMX", contenuto_md="x")
+    await article_ops.assign_article(db, art["id"], [sample_magazine["id"]])
+    async with client as c:
+        for url in ("/api/articles", f"/api/magazines/{sample_magazine['id']}",
+                    f"/api/magazines/{sample_magazine['id']}/articles", "/api/images"):
+            resp = await c.get(url)
+            assert resp.status_code == 200 and resp.headers["content-type"] == "application/json"
+        dettaglio = (await c.get(f"/api/articles/{art['id']}")).json()
+    assert dettaglio["updated_at"] == art["updated_at"].isoformat()
+
+
+async def test_benchmark_su_archivio_sintetico(tmp_path):
+    genera(tmp_path, numeri=2, articoli=6, immagini=10, media="none", varianti=1)
+    payload = await carica_payload(tmp_path)
+    risultati = confronta(payload, ripetizioni=1)
+    assert set(risultati) == {"articoli", "articoli_numero", "immagini"}
+    assert risultati["articoli"]["elementi"] == 6
+    json.dumps(risultati)
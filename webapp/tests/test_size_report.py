@@ -0,0 +1,124 @@
+"""Attribuzione del peso del PDF a immagini sorgente e articoli."""
+
+import shutil
+from pathlib import Path
+
+import pytest
+import typst
+from httpx import ASGITransport, AsyncClient
+from PIL import Image
+
+from app.database import get_db
+from app.main import app
+from app.services import builder
+from app.services.pdf_images import recompress_images
+from app.services.size_report import collect_sources, size_report
+
+REPO_DIR = Path(__file__).resolve().parent.parent.parent
+ASSET = REPO_DIR / "assets" / "corno-grande-1.jpg"  # 1336x632 JPEG
+
+
+def _numero(root: Path) -> list[dict]:
+    """Media library di due articoli e PDF "print" + "screen" del numero 5."""
+    foto = root / "data/uploads/articoli/7/foto.jpg"
+    foto.parent.mkdir(parents=True)
+    shutil.copy(ASSET, foto)
+    grafico = root / "data/uploads/articoli/8/grafico.png"
+    grafico.parent.mkdir(parents=True)
+    Image.new("RGB", (300, 200), (200, 30, 30)).save(grafico)
+    # Immagine nel PDF senza sorgente tra quelle del numero.
+    Image.new("RGB", (40, 40), (0, 0, 255)).save(root / "estranea.png")
+
+    src = (
+        '#set page(width: 21cm, height: 29.7cm)\n'
+        '#image("/estranea.png", width: 1cm)\n#pagebreak()\n'
+        '= Primo\n#image("/data/uploads/articoli/7/foto.jpg", width: 2in)\n#pagebreak()\n'
+        '= Secondo\n#image("/data/uploads/articoli/8/grafico.png", width: 3in)\n'
+    )
+    out = root / "output"
+    out.mkdir()
+    (out / "geko5-print.pdf").write_bytes(typst.compile(src.encode(), root=str(root)))
+    shutil.copy(out / "geko5-print.pdf", out / "geko5.pdf")
+    assert recompress_images(out / "geko5.pdf", 150)["compressed"]
+    return [
+        {"id": 7, "titolo": "Primo", "contenuto_md": "![](foto.jpg)",
+         "image_base": "/data/uploads/articoli/7"},
+        {"id": 8, "titolo": "Secondo", "contenuto_md": "Testo senza immagini.",
+         "image_base": "/data/uploads/articoli/8"},
+    ]
+
+
+def test_collect_sources_riferimenti_e_media_library(tmp_path):
+    articles = _numero(tmp_path)
+    options = {"copertina_path": "data/uploads/cover.jpg",
+               "team_membri": [{"foto": "data/uploads/team/a.png"}]}
+    sources = collect_sources(articles, options, tmp_path)
+    per_file = {s["file"]: s for s in sources}
+    assert per_file["data/uploads/articoli/7/foto.jpg"]["articolo_id"] == 7
+    # Non referenziata nel markdown, ma nella media library dell'articolo 8.
+    assert per_file["data/uploads/articoli/8/grafico.png"]["articolo_id"] == 8
+    assert per_file["data/uploads/cover.jpg"]["ruolo"] == "copertina"
+    assert per_file["data/uploads/team/a.png"]["ruolo"] == "pagina-team"
+    assert len(per_file) == len(sources)
+
+
+def test_report_per_immagine_e_per_articolo(tmp_path):
+    articles = _numero(tmp_path)
+    report = size_report("5", articles, {}, tmp_path / "output", tmp_path)
+
+    assert report["master"] == "print"
+    assert set(report["profili"]) == {"print", "screen"}
+    assert report["profili"]["screen"]["byte"] < report["profili"]["print"]["byte"]
+
+    per_file = {i["file"]: i for i in report["immagini"]}
+    foto = per_file["data/uploads/articoli/7/foto.jpg"]
+    assert foto["articolo_id"] == 7 and foto["pagine"] == [2]
+    assert foto["byte_sorgente"] == ASSET.stat().st_size
+    # JPEG incorporato così com'è nel master, ricampionato nel profilo screen.
+    assert foto["profili"]["print"]["byte"] == foto["byte_sorgente"]
+    assert abs(foto["profili"]["print"]["dpi"] - 1336 / 2) < 2
+    assert foto["profili"]["screen"]["larghezza"] < 1336
+    assert foto["profili"]["screen"]["byte"] < foto["profili"]["print"]["byte"]
+
+    grafico = per_file["data/uploads/articoli/8/grafico.png"]
+    assert grafico["articolo_id"] == 8
+    assert (grafico["larghezza_sorgente"], grafico["altezza_sorgente"]) == (300, 200)
+
+    articoli = {a["articolo_id"]: a for a in report["articoli"]}
+    assert articoli[7]["byte"]["print"] == foto["profili"]["print"]["byte"]
+    assert articoli[7]["byte"]["screen"] < articoli[7]["byte"]["print"]
+    # Ordinati dal più pesante nel master.
+    assert report["articoli"][0]["articolo_id"] == 7
+
+    (estranea,) = report["non_attribuite"]
+    assert estranea["pagine"] == [1] and estranea["articolo_id"] is None
+
+
+def test_report_senza_pdf(tmp_path):
+    with pytest.raises(FileNotFoundError):
+        size_report("9", [], {}, tmp_path, tmp_path)
+
+
+@pytest.fixture
+def client(db):
+    async def _override():
+        yield db
+
+    app.dependency_overrides[get_db] = _override
+    yield AsyncClient(transport=ASGITransport(app=app), base_url="http://test")
+    app.dependency_overrides.clear()
+
+
+async def test_api_size_report(client, sample_magazine, tmp_path, monkeypatch):
+    monkeypatch.setattr(builder, "OUTPUT_DIR", tmp_path)
+    url = f"/api/magazines/{sample_magazine['id']}/size-report"
+    async with client as c:
+        assert (await c.get(url)).status_code == 404  # non ancora compilato
+        (tmp_path / f"geko{sample_magazine['numero']}.pdf").write_bytes(
+            typst.compile(b"= Solo testo")
+        )
+        resp = await c.get(url)
+        assert resp.status_code == 200
+        assert resp.json()["master"] == "screen"
+        assert resp.json()["immagini"] == []
+        assert (await c.get("/api/magazines/9999/size-report")).status_code == 404
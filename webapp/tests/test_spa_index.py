@@ -0,0 +1,70 @@
+"""Catch-all SPA e favicon serviti dall'indice in memoria (spa_index)."""
+
+import os
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+import app.main as main_mod
+from app.services import spa_index
+
+
+@pytest.fixture
+def build(tmp_path, monkeypatch):
+    build = tmp_path / "build"
+    (build / "_app" / "immutable").mkdir(parents=True)
+    (build / "index.html").write_text("<html>GEKO</html>")
+    (build / "robots.txt").write_text("User-agent: *")
+    (build / "grande.js").write_bytes(b"x" * (spa_index.MAX_IN_MEMORIA + 1))
+    (build / "robots.txt.br").write_bytes(b"non servire")
+    static = tmp_path / "static"
+    static.mkdir()
+    (static / "favicon.ico").write_bytes(b"ICO")
+
+    monkeypatch.setattr(main_mod, "SPA_FILES", spa_index.SpaIndex(build))
+    monkeypatch.setattr(main_mod, "STATIC_FAVICONS",
+                        spa_index.SpaIndex(static, nomi=main_mod.FAVICON_NAMES))
+    return build
+
+
+@pytest.fixture
+def client():
+    return AsyncClient(transport=ASGITransport(app=main_mod.app), base_url="http://test")
+
+
+async def test_deep_link_e_validatori(build, client):
+    async with client as c:
+        resp = await c.get("/numeri/42/articoli")
+        assert resp.text == "<html>GEKO</html>" and resp.headers["content-type"].startswith("text/html")
+        assert resp.headers["cache-control"] == "no-cache"
+        tag, modificato = resp.headers["etag"], resp.headers["last-modified"]
+
+        assert (await c.get("/", headers={"If-None-Match": tag})).status_code == 304
+        assert (await c.get("/x", headers={"If-Modified-Since": modificato})).status_code == 304
+        assert (await c.get("/robots.txt")).text == "User-agent: *"
+        assert (await c.get("/robots.txt.br")).text == "<html>GEKO</html>"
+        assert (await c.get("/../index.html")).text == "<html>GEKO</html>"
+
+        resp = await c.get("/grande.js")
+        assert len(resp.content) == spa_index.MAX_IN_MEMORIA + 1
+        assert (await c.get("/grande.js", headers={"If-None-Match": resp.headers["etag"]})).status_code == 304
+
+
+async def test_nuova_build_rilevata(build, client, monkeypatch):
+    async with client as c:
+        tag = (await c.get("/")).headers["etag"]
+        monkeypatch.setattr(spa_index, "INTERVALLO_CONTROLLO", 0.0)
+        (build / "index.html").write_text("<html>GEKO 2</html>")
+        st = (build / "index.html").stat()
+        os.utime(build / "index.html", ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        resp = await c.get("/", headers={"If-None-Match": tag})
+        assert resp.status_code == 200 and resp.text == "<html>GEKO 2</html>"
+
+
+async def test_favicon(build, client):
+    async with client as c:
+        resp = await c.get("/favicon.png")
+        assert resp.content == b"ICO"  # ripiego su static/favicon.ico
+        (build / "favicon.png").write_bytes(b"PNG")
+        main_mod.SPA_FILES.scan()
+        assert (await c.get("/favicon.ico")).content == b"PNG"
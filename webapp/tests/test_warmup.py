@@ -0,0 +1,80 @@
+"""Warm-up dei compilatori e readiness di /health."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from httpx import ASGITransport, AsyncClient
+
+from app.main import app
+from app.services import builder, warmup
+from app.services.compile_pool import CompilePool
+
+
+@pytest.fixture(autouse=True)
+def stato_pulito(monkeypatch):
+    monkeypatch.setattr(warmup, "_state", dict(warmup._state))
+
+
+def test_warm_up_memoizzato():
+    durata = builder.warm_up()
+    assert durata > 0
+    assert builder.warm_up() == durata
+
+
+def test_compilatori_per_thread_non_si_serializzano(monkeypatch):
+    """Una build lunga in un thread non blocca una compilazione breve in un altro."""
+    sblocca, in_corso = threading.Event(), threading.Event()
+
+    class _Lento:
+        def __init__(self, **kwargs):
+            pass
+
+        def compile(self, source, **kwargs):
+            if source == b"lungo":
+                in_corso.set()
+                assert sblocca.wait(10)
+            return source
+
+    monkeypatch.setattr(builder.typst, "Compiler", _Lento)
+    monkeypatch.setattr(builder, "_local", threading.local())
+    lungo = threading.Thread(target=builder.compile_source, args=("lungo",))
+    lungo.start()
+    assert in_corso.wait(10)
+    try:
+        with ThreadPoolExecutor(1) as ex:
+            assert ex.submit(builder.compile_source, "breve").result(timeout=5) == b"breve"
+    finally:
+        sblocca.set()
+        lungo.join()
+
+
+async def test_health_503_durante_warmup():
+    warmup.begin()
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        r = await ac.get("/health")
+        assert r.status_code == 503
+        assert r.json()["status"] == "warming"
+
+        warmup._state["stato"] = "pronto"
+        r = await ac.get("/health")
+        assert r.status_code == 200
+        assert r.json()["warmup"]["stato"] == "pronto"
+
+
+async def test_warm_up_pool():
+    pool = CompilePool(workers=1, timeout=60, mem_mb=0, initializer=builder.warm_up)
+    try:
+        stato = await warmup.warm_up_pool(pool)
+    finally:
+        pool.shutdown()
+    assert stato["stato"] == "pronto"
+    assert stato["canarino"] > 0
+    assert warmup.is_ready()
+
+
+def test_initializer_disattivabile(monkeypatch):
+    monkeypatch.setenv("GEKO_WARMUP", "0")
+    assert warmup.worker_initializer() is None
+    monkeypatch.delenv("GEKO_WARMUP")
+    assert warmup.worker_initializer() is builder.warm_up